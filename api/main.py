@@ -1,13 +1,31 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from core.stats import registry
 from sql import parser, planner, executor
 import time
 
-app = FastAPI(title="BD2 Mini DBMS API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Las páginas dirty se escriben en segundo plano (fuera del request)
+    executor.catalog.storage.start_background_writer()
+    yield
+    # Shutdown: detener el writer y checkpoint final (nada queda solo en el WAL)
+    executor.catalog.storage.close()
+
+
+app = FastAPI(title="BD2 Mini DBMS API", lifespan=lifespan)
 
 class QueryIn(BaseModel):
     sql: str
 
+class BufferPoolConfig(BaseModel):
+    max_bytes: Optional[int] = None  # Presupuesto en bytes (prioridad sobre pool_size)
+    pool_size: Optional[int] = None  # Capacidad en páginas
+    adaptive: Optional[bool] = None  # Cuotas por tabla adaptativas
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "tables": list(executor.catalog.tables.keys())}
@@ -23,3 +41,30 @@ async def query(q: QueryIn):
     # Agregar tiempo de ejecución al resultado
     out['execution_time_ms'] = round(exec_time_ms, 3)
     return out
+
+@app.get("/admin/buffer_pool")
+async def buffer_pool_stats():
+    return executor.catalog.storage.buffer_pool.get_stats()
+
+@app.post("/admin/buffer_pool")
+async def resize_buffer_pool(config: BufferPoolConfig):
+    """Redimensiona el buffer pool en caliente (evicta lo que no entra)"""
+    pool = executor.catalog.storage.buffer_pool
+    try:
+        evicted = pool.resize(pool_size=config.pool_size, max_bytes=config.max_bytes, adaptive=config.adaptive)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**pool.get_stats(), "evicted": evicted}
+
+@app.get("/admin/stats")
+async def io_stats(name: Optional[str] = None):
+    """
+    Estadísticas de buffer/I/O por tabla e índice (solo lectura: no resetea nada).
+    name: una tabla o el archivo .dat de un índice
+    """
+    if name is not None:
+        stats = registry.snapshot(name)
+        if not stats:
+            raise HTTPException(status_code=404, detail=f"No stats for '{name}'")
+        return stats
+    return {**registry.snapshot(), "buffer_pool": executor.catalog.storage.buffer_pool.get_stats()}
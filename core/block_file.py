@@ -0,0 +1,218 @@
+"""
+Block File - Archivos de bloques de longitud variable con directorio de offsets
+Usado por los índices (Sequential, ISAM, Extendible Hash, B+ Tree) para sus .dat
+"""
+import mmap
+import os
+import time
+from array import array
+from typing import Iterable, List, Optional, Union
+
+from .disk_manager import pread
+from .prefetch import ReadAhead
+from .stats import INDEX_PREFIX, registry
+
+
+class BlockFile:
+    """
+    Archivo de bloques con prefijo de tamaño + directorio de offsets persistido.
+
+    Formato (compatible con los .dat anteriores):
+    - <archivo>.dat      [size_0 (4 bytes)][block_0][size_1 (4 bytes)][block_1]...
+    - <archivo>.dat.off  offsets de inicio de cada bloque + offset final (uint64)
+
+    El directorio se escribe en write_blocks() y se carga en RAM al abrir, así que
+    leer el bloque N es un único pread en un offset conocido (O(1) syscalls) en vez
+    de saltar los N prefijos anteriores.
+
+    Con use_mmap=True el archivo se mapea en memoria y read_block retorna un
+    memoryview sobre el mapeo (sin copia); se vuelve a mapear si el archivo crece.
+    
+    Las lecturas y escrituras reales se registran en core.stats como "index:<path>".
+    """
+
+    OFFSETS_SUFFIX = ".off"
+    SIZE_BYTES = 4
+
+    def __init__(self, path: str, use_mmap: bool = False):
+        self.path = path
+        self.offsets_path = path + self.OFFSETS_SUFFIX
+        self.use_mmap = use_mmap
+        self._map: Optional[mmap.mmap] = None
+
+        # Directorio en RAM: offsets[i] = inicio del bloque i, offsets[-1] = fin de archivo
+        self._offsets: Optional[array] = None
+        # Descriptor abierto de forma perezosa para pread
+        self._fd: Optional[int] = None
+
+    @property
+    def num_blocks(self) -> int:
+        """Número de bloques del archivo"""
+        return max(0, len(self._load_offsets()) - 1)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def write_blocks(self, blocks: Iterable[bytes]) -> int:
+        """
+        Reescribe el archivo completo con los bloques dados (ya serializados)
+        y persiste el directorio de offsets. Retorna el número de bloques escritos.
+
+        Se escribe a un archivo temporal y se reemplaza con os.replace, así otros
+        lectores con el archivo abierto/mapeado siguen viendo la versión anterior
+        completa en vez de un archivo truncado.
+        """
+        self.close()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        offsets = array('Q', [0])
+        tmp_path = self.path + ".tmp"
+        start_time = time.perf_counter()
+        with open(tmp_path, 'wb') as f:
+            for block_bytes in blocks:
+                f.write(len(block_bytes).to_bytes(self.SIZE_BYTES, 'little'))
+                f.write(block_bytes)
+                offsets.append(offsets[-1] + self.SIZE_BYTES + len(block_bytes))
+
+        self._save_offsets(offsets)
+        os.replace(tmp_path, self.path)
+        self._offsets = offsets
+        registry.get(INDEX_PREFIX + self.path).write(offsets[-1], time.perf_counter() - start_time, len(offsets) - 1)
+        return len(offsets) - 1
+
+    def read_block(self, block_no: int) -> Union[bytes, memoryview]:
+        """
+        Lee el bloque `block_no` con un único pread (I/O REAL).
+        En modo mmap retorna un memoryview sobre el archivo mapeado.
+        """
+        offsets = self._load_offsets()
+        if block_no < 0 or block_no >= len(offsets) - 1:
+            raise EOFError(f"Cannot read block {block_no}")
+
+        start = offsets[block_no] + self.SIZE_BYTES
+        end = offsets[block_no + 1]
+        stats = registry.get(INDEX_PREFIX + self.path)
+        if self.use_mmap:
+            mapped = self._get_map(end)
+            if mapped is not None:
+                stats.read(end - start)
+                return memoryview(mapped)[start:end]
+
+        size = end - start
+        start_time = time.perf_counter()
+        data = pread(self._get_fd(), size, start)
+        if len(data) < size:
+            raise EOFError(f"Unexpected EOF while reading block {block_no}")
+        stats.read(size, time.perf_counter() - start_time)
+        return data
+
+    def read_ahead(self) -> Optional[ReadAhead]:
+        """
+        ReadAhead sobre read_block para recorridos secuenciales (el descriptor y el
+        directorio se abren en este hilo). None con mmap: ahí el SO ya hace read-ahead.
+        """
+        if self.use_mmap:
+            return None
+        self._get_fd()
+        return ReadAhead(self.read_block, self.num_blocks, self._read_run)
+
+    def _read_run(self, start: int, count: int) -> List[memoryview]:
+        """Lee `count` bloques consecutivos con un único pread"""
+        offsets = self._load_offsets()
+        base = offsets[start]
+        start_time = time.perf_counter()
+        data = pread(self._get_fd(), offsets[start + count] - base, base)
+        registry.get(INDEX_PREFIX + self.path).read(len(data), time.perf_counter() - start_time, count)
+        view = memoryview(data)
+        return [view[offsets[i] - base + self.SIZE_BYTES:offsets[i + 1] - base] for i in range(start, start + count)]
+
+    def delete(self) -> None:
+        """Elimina el archivo de datos y su directorio de offsets"""
+        self.close()
+        for path in (self.path, self.offsets_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._offsets = None
+
+    def close(self) -> None:
+        """Cierra el descriptor y el mapeo (el directorio se vuelve a cargar al reabrir)"""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Aún hay memoryviews vivos: el GC liberará el mapeo
+                pass
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._offsets = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _get_fd(self) -> int:
+        if self._fd is None:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"Data file not found: {self.path}")
+            self._fd = os.open(self.path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        return self._fd
+
+    def _get_map(self, end: int) -> Optional[mmap.mmap]:
+        """Retorna el mapeo del archivo cubriendo `end` bytes (remapea si creció)"""
+        if self._map is not None and len(self._map) >= end:
+            return self._map
+
+        fd = self._get_fd()
+        if os.fstat(fd).st_size < end:
+            return None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+        self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _load_offsets(self) -> array:
+        """Carga el directorio desde el sidecar, o lo reconstruye si falta o está desfasado"""
+        if self._offsets is not None:
+            return self._offsets
+
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Data file not found: {self.path}")
+
+        file_size = os.path.getsize(self.path)
+        offsets = array('Q')
+        if os.path.exists(self.offsets_path):
+            with open(self.offsets_path, 'rb') as f:
+                offsets.frombytes(f.read())
+
+        # Sidecar ausente (archivo antiguo) o desfasado: escanear una sola vez y persistir
+        if not offsets or offsets[-1] != file_size:
+            offsets = self._scan_offsets(file_size)
+            self._save_offsets(offsets)
+
+        self._offsets = offsets
+        return offsets
+
+    def _scan_offsets(self, file_size: int) -> array:
+        offsets = array('Q', [0])
+        with open(self.path, 'rb') as f:
+            while offsets[-1] < file_size:
+                size_bytes = f.read(self.SIZE_BYTES)
+                if len(size_bytes) < self.SIZE_BYTES:
+                    break
+                size = int.from_bytes(size_bytes, 'little')
+                f.seek(size, 1)
+                offsets.append(offsets[-1] + self.SIZE_BYTES + size)
+        return offsets
+
+    def _save_offsets(self, offsets: array) -> None:
+        with open(self.offsets_path, 'wb') as f:
+            offsets.tofile(f)
@@ -1,60 +1,443 @@
 """
 Buffer Pool Manager - Gestión de caché de páginas en memoria
-Implementa política LRU (Least Recently Used) para evicción
+La política de evicción es intercambiable (LRU por defecto; ver core/replacement.py)
 """
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from collections import OrderedDict
+from contextlib import contextmanager
+import threading
+from .decoded_cache import estimate_size
 from .disk_manager import DiskManager, Page
+from .replacement import IReplacementPolicy, make_policy
+from .stats import registry
+
+
+class BufferPoolFullError(RuntimeError):
+    """Todas las páginas del pool están fijadas (pinned): no hay frame que evictar"""
+
+
+class PageLatch:
+    """Latch lector/escritor de un frame: varios lectores o un solo escritor"""
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+    
+    def acquire_read(self, blocking: bool = True) -> bool:
+        with self._cond:
+            while self._writer:
+                if not blocking:
+                    return False
+                self._cond.wait()
+            self._readers += 1
+            return True
+    
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+    
+    def acquire_write(self) -> None:
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+    
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class Frame:
+    """
+    Entrada del pool: la página, cuántos la tienen fijada y su latch.
+    Mientras un hilo lee la página de disco, page es None e io está pendiente
+    (los demás hilos que la piden esperan esa lectura en vez de repetirla).
+    """
+    __slots__ = ("page", "pin_count", "latch", "io", "size")
+    
+    def __init__(self, page: Optional[Page], pin_count: int = 0, size: int = 0):
+        self.page = page
+        self.pin_count = pin_count
+        self.latch = PageLatch()
+        self.io: Optional[threading.Event] = None
+        self.size = size  # Bytes que se le cobran al presupuesto del pool
+    
+    def wait_loaded(self) -> Optional[Page]:
+        """La página, esperando si se está leyendo (None si la lectura falló)"""
+        io = self.io
+        if io is not None:
+            io.wait()
+        return self.page
+
+
+class BufferRing:
+    """
+    Anillo privado de frames para lecturas masivas (como los buffer rings de
+    PostgreSQL): un full scan recicla unos pocos frames propios en vez de pasar
+    todas las páginas por el pool compartido y evictar las páginas calientes.
+    Solo guarda páginas leídas (limpias); vive lo que dura el recorrido.
+    """
+    
+    def __init__(self, size: int = 16):
+        self.size = size
+        self.frames: OrderedDict[Tuple[str, int], Page] = OrderedDict()
+    
+    def get(self, key: Tuple[str, int]) -> Optional[Page]:
+        return self.frames.get(key)
+    
+    def put(self, key: Tuple[str, int], page: Page) -> None:
+        if len(self.frames) >= self.size:
+            self.frames.popitem(last=False)  # Reusar el frame más antiguo del anillo
+        self.frames[key] = page
+
+
+class Partition:
+    """Frames de una partición del pool con su lock, su política de reemplazo y sus contadores"""
+    __slots__ = ("frames", "lock", "policy", "hits", "misses")
+    
+    def __init__(self, policy: IReplacementPolicy):
+        self.frames: Dict[Tuple[str, int], Frame] = {}
+        self.lock = threading.Lock()
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
 
 
 class BufferPool:
     """
     Pool de buffers que mantiene páginas en memoria.
-    Implementa LRU para decidir qué páginas evictar cuando se llena.
+    Una política de reemplazo (LRU, CLOCK, 2Q, LRU-K o ARC) decide qué página
+    evictar cuando se llena; el pool solo guarda las páginas y escribe las dirty.
+    
+    Cada tabla puede tener su propio tamaño de página (DiskManager.page_size);
+    la capacidad se cuenta en páginas (pool_size) o, con max_bytes, en bytes:
+    cada frame cuesta el page_size de su tabla y se evicta hasta que la página
+    nueva entra en el presupuesto. resize() cambia la capacidad en caliente.
+    
+    Cuotas por tabla (quotas, en bytes): topes opcionales; una tabla que llega
+    a su cuota evicta sus propias páginas. Con adaptive=True el pool las ajusta
+    solo: parten de partes iguales del presupuesto y cada tabla tiene una lista
+    fantasma con las claves que evictó recientemente (hasta 1/GHOST_SHARE del
+    presupuesto); un miss que aparece ahí habría sido un hit con más memoria.
+    Cada REBALANCE_MISSES misses, la tabla con más hits fantasma le quita un
+    paso (1/QUOTA_STEPS del presupuesto) a la que menos tuvo.
+    
+    Además del heap de las tablas, otros archivos direccionables por bloque (los
+    .dat de los índices) se registran con register_file(nombre, loader): sus
+    bloques se cachean decodificados en el mismo pool y compiten por los frames.
+    Un bloque de esos cuesta lo que ocupan sus filas decodificadas (estimate_size),
+    no el page_size por defecto; se recobra al terminar de leerlo.
+    
+    Concurrencia (varios hilos, p. ej. requests de FastAPI):
+    - La tabla de frames está particionada por hash de la clave. Cada partición
+      tiene su lock, su instancia de la política y sus contadores: un hit solo
+      toma el lock de su partición. Un pool de menos de MIN_PARTITION_FRAMES
+      frames por partición no se particiona (la política decide sobre pocas páginas).
+    - Un lock global protege la contabilidad de capacidad (páginas/bytes
+      residentes, cuotas, listas fantasma) y elige víctimas recorriendo las
+      particiones en ronda (orden de locks: global -> partición, nunca al revés).
+    - Una víctima dirty se fija y se escribe fuera de los locks; después se evicta
+      si nadie la fijó ni la modificó mientras tanto.
+    - get_page(pin=True) / unpin_page() fijan un frame: la evicción nunca elige
+      frames pinned. pinned() además toma el latch del frame (lectura o escritura).
+    - Las lecturas de disco de los misses se hacen fuera de los locks, sobre un
+      frame ya reservado (pinned) que los demás hilos esperan.
     """
     
-    def __init__(self, pool_size: int = 50, disk_manager: Optional[DiskManager] = None):
+    # Particiones de la tabla de frames (como máximo) y frames mínimos por partición
+    PARTITIONS = 16
+    MIN_PARTITION_FRAMES = 64
+    
+    # Espera máxima (s) por las víctimas dirty que escribe otro hilo antes de reintentar
+    WRITEBACK_WAIT = 0.05
+    
+    # Modo adaptativo: misses entre rebalanceos y pasos en que se divide el presupuesto
+    REBALANCE_MISSES = 256
+    QUOTA_STEPS = 16
+    GHOST_SHARE = 4
+    
+    def __init__(self, pool_size: int = 50, disk_manager: Optional[DiskManager] = None, policy: str = "lru",
+                 partitions: int = PARTITIONS, max_bytes: Optional[int] = None, adaptive: bool = False):
         """
         Args:
-            pool_size: Número máximo de páginas en memoria
+            pool_size: Número máximo de páginas en memoria (se ignora con max_bytes)
             disk_manager: Gestor de disco para I/O
+            policy: Política de reemplazo ('lru', 'clock', '2q', 'lru-k', 'arc')
+            partitions: Particiones (locks) de la tabla de frames, como máximo
+            max_bytes: Presupuesto del pool en bytes (None = contar páginas)
+            adaptive: Ajustar las cuotas por tabla según los hits fantasma
         """
-        self.pool_size = pool_size
         self.disk_manager = disk_manager or DiskManager()
+        self.policy_name = policy
+        self.max_bytes: Optional[int] = None
+        self.pool_size = pool_size
+        self._set_capacity(pool_size, max_bytes)
+        
+        # Tabla de frames particionada por hash de (table_name, page_id)
+        count = max(1, min(partitions, self.pool_size // self.MIN_PARTITION_FRAMES))
+        self._parts = [Partition(self._make_policy(count)) for _ in range(count)]
+        self._lock = threading.RLock()  # Capacidad, cuotas, fantasmas, elección de víctimas
+        self._written = threading.Condition(self._lock)  # Avisa cuando termina una escritura de víctimas
+        self._writebacks = 0  # Víctimas dirty fijadas mientras otro hilo las escribe
+        self._evict_cursor = 0
+        self._resident = 0
+        self._resident_bytes = 0
+        self._table_bytes: Dict[str, int] = {}
         
-        # Cache: (table_name, page_id) -> Page
-        # OrderedDict mantiene orden de inserción para LRU
-        self.cache: OrderedDict[Tuple[str, int], Page] = OrderedDict()
+        # Cuotas por tabla en bytes (sin entrada = sin tope) y estado del modo adaptativo
+        self.quotas: Dict[str, int] = {}
+        self.adaptive = adaptive
+        self._ghosts: Dict[str, "OrderedDict[Tuple[str, int], None]"] = {}
+        self._ghost_hits: Dict[str, int] = {}
+        self._misses_since_rebalance = 0
+        self.rebalances = 0
         
-        # Estadísticas
-        self.cache_hits = 0
-        self.cache_misses = 0
+        # Archivos registrados (no heap): nombre -> loader(page_id, data_bytes) -> Page
+        self._loaders: Dict[str, Callable[[int, Optional[bytes]], Optional[Page]]] = {}
+        
+        # Se llama antes de escribir una página dirty (p. ej. forzar el WAL; None = nada)
+        self.before_write: Optional[Callable[[], None]] = None
+        
+        # Traza de accesos para scripts/replay_buffer_trace.py (None = sin capturar)
+        self.trace: Optional[List[Tuple[str, int]]] = None
+        
+        # Estadísticas (hits y misses, por partición)
+        self.ring_reads = 0  # Misses servidos por un BufferRing (no entraron al pool)
+    
+    def _make_policy(self, partitions: int) -> IReplacementPolicy:
+        """Política de una partición (su capacidad es la parte del pool que le toca)"""
+        return make_policy(self.policy_name, max(1, self.pool_size // partitions))
+    
+    def _set_capacity(self, pool_size: Optional[int], max_bytes: Optional[int]) -> None:
+        """Fija la capacidad en bytes (max_bytes) o en páginas; pool_size queda como equivalente en páginas"""
+        if max_bytes is not None:
+            if max_bytes <= 0:
+                raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+            self.max_bytes = max_bytes
+            self.pool_size = max(1, max_bytes // Page.PAGE_SIZE)
+        elif pool_size is not None:
+            if pool_size <= 0:
+                raise ValueError(f"pool_size must be positive, got {pool_size}")
+            self.max_bytes = None
+            self.pool_size = pool_size
+    
+    @property
+    def budget_bytes(self) -> int:
+        """Presupuesto en bytes (en modo páginas, pool_size páginas del tamaño por defecto)"""
+        return self.max_bytes if self.max_bytes is not None else self.pool_size * Page.PAGE_SIZE
+    
+    @property
+    def cache_hits(self) -> int:
+        return sum(part.hits for part in self._parts)
+    
+    @property
+    def cache_misses(self) -> int:
+        return sum(part.misses for part in self._parts)
+    
+    @property
+    def cache(self) -> Dict[Tuple[str, int], Page]:
+        """Copia de las páginas en el pool: (table_name, page_id) -> Page"""
+        return {key: frame.page for key, frame in self._frames() if frame.page is not None}
+    
+    def _frames(self) -> List[Tuple[Tuple[str, int], Frame]]:
+        """Snapshot de los frames de todas las particiones"""
+        frames = []
+        for part in self._parts:
+            with part.lock:
+                frames.extend(part.frames.items())
+        return frames
+    
+    def _part(self, key: Tuple[str, int]) -> Partition:
+        return self._parts[hash(key) % len(self._parts)]
     
-    def get_page(self, table_name: str, page_id: int) -> Optional[Page]:
+    def _lookup(self, key: Tuple[str, int], pin: bool = False) -> Optional[Frame]:
+        """Busca el frame en su partición (y lo fija si pin=True)"""
+        part = self._part(key)
+        with part.lock:
+            frame = part.frames.get(key)
+            if frame is not None and pin:
+                frame.pin_count += 1
+        return frame
+    
+    def _release_pin(self, key: Tuple[str, int], frame: Frame) -> None:
+        with self._part(key).lock:
+            frame.pin_count -= 1
+    
+    def _wait_pinned(self, key: Tuple[str, int], frame: Frame, pinned: bool) -> Optional[Page]:
+        """
+        Página del frame (esperando su lectura). Si la lectura falló o la espera se
+        interrumpe, el pin tomado por este hilo se libera.
+        """
+        page = None
+        try:
+            page = frame.wait_loaded()
+        finally:
+            if pinned and page is None:
+                self._release_pin(key, frame)
+        return page
+    
+    def get_page(self, table_name: str, page_id: int, data_bytes: Optional[bytes] = None,
+                 ring: Optional[BufferRing] = None, pin: bool = False) -> Optional[Page]:
         """
         Obtiene una página del buffer pool o del disco.
-        Implementa LRU: mueve la página al final del OrderedDict.
+        Un hit se notifica a la política de reemplazo.
+        
+        data_bytes: contenido ya leído por el read-ahead (se usa solo si es un miss)
+        ring: estrategia de lectura masiva; un miss se guarda en el anillo y no en
+            el pool, y los accesos del recorrido no cuentan para la política
+        pin: fijar la página (no se evicta hasta unpin_page); no aplica con ring
         """
         key = (table_name, page_id)
+        if self.trace is not None:
+            self.trace.append(key)
         
-        # Cache hit
-        if key in self.cache:
-            self.cache_hits += 1
-            # Mover al final (más recientemente usado)
-            self.cache.move_to_end(key)
-            return self.cache[key]
+        # Cache hit: solo el lock de la partición (lookup, pin, contador y política)
+        part = self._part(key)
+        pinned = pin and ring is None
+        with part.lock:
+            frame = part.frames.get(key)
+            if frame is not None:
+                part.hits += 1
+                if ring is None:
+                    part.policy.hit(key)
+                if pinned:
+                    frame.pin_count += 1
+        if frame is not None:
+            stats = registry.get(table_name)
+            stats.logical_reads += 1
+            stats.cache_hits += 1
+            return self._wait_pinned(key, frame, pinned)
         
-        # Cache miss - leer del disco
-        self.cache_misses += 1
-        page = self.disk_manager.read_page(table_name, page_id)
+        if ring is not None:
+            page = ring.get(key)
+            with part.lock:
+                if page is not None:
+                    part.hits += 1
+                else:
+                    part.misses += 1
+            stats = registry.get(table_name)
+            stats.logical_reads += 1
+            if page is not None:
+                stats.cache_hits += 1
+                return page
+            page = self._read(key, data_bytes)
+            if page is not None:
+                with self._lock:
+                    self.ring_reads += 1
+                ring.put(key, page)
+            return page
         
-        if page is None:
-            return None
+        # Cache miss - leer del disco
+        return self._load(key, data_bytes, pin)
+    
+    def _load(self, key: Tuple[str, int], data_bytes: Optional[bytes], pin: bool) -> Optional[Page]:
+        """
+        Reserva un frame (pinned, con io pendiente) y lee la página de disco fuera de
+        los locks. Reservar antes de leer evita instalar una copia vieja: sin el frame,
+        otro hilo podría cargar, modificar y evictar la página mientras leemos.
+        """
+        part = self._part(key)
+        with part.lock:
+            part.misses += 1
+        registry.get(key[0]).logical_reads += 1
+        if self.adaptive:
+            dirty: List[Tuple[Tuple[str, int], Frame]] = []
+            try:
+                with self._lock:
+                    self._note_miss(key, dirty)
+            finally:
+                self._write_back(dirty)
+        frame, created = self._install(key, None, pin)
+        if not created:
+            return self._wait_pinned(key, frame, pin)  # Otro hilo la agregó mientras tanto
         
-        # Agregar al cache
-        self._add_to_cache(key, page)
+        page = None
+        try:
+            page = self._read(key, data_bytes)
+        finally:
+            io, frame.page = frame.io, page
+            with self._lock:
+                if page is None:
+                    self._remove(key)  # No existe (o falló la lectura): se libera el frame
+                else:
+                    self._recharge(key, frame)
+                    with part.lock:
+                        frame.io = None
+                        if not pin:
+                            frame.pin_count -= 1
+            io.set()
+        if page is not None and key[0] in self._loaders:
+            self._fit_budget(key[0])
         return page
     
+    def _read(self, key: Tuple[str, int], data_bytes: Optional[bytes]) -> Optional[Page]:
+        """Lee la página de disco: con el loader del archivo registrado, o del heap de la tabla"""
+        loader = self._loaders.get(key[0])
+        if loader is not None:
+            return loader(key[1], data_bytes)
+        return self.disk_manager.read_page(key[0], key[1], data_bytes)
+    
+    def register_file(self, name: str, loader: Callable[[int, Optional[bytes]], Optional[Page]]) -> None:
+        """
+        Registra un archivo de bloques (p. ej. el .dat de un índice) como direccionable
+        por página: get_page(name, n) cachea loader(n, data_bytes) en el pool.
+        """
+        self._loaders[name] = loader
+    
+    def discard_file(self, name: str) -> None:
+        """Descarta (sin flush) los bloques cacheados de un archivo reescrito y su registro"""
+        self._loaders.pop(name, None)
+        with self._lock:
+            for key, _ in self._frames():
+                if key[0] == name:
+                    self._remove(key)
+    
+    def unpin_page(self, table_name: str, page_id: int, is_dirty: bool = False) -> None:
+        """Libera un pin de get_page(pin=True); is_dirty marca la página modificada en su lugar"""
+        key = (table_name, page_id)
+        part = self._part(key)
+        with part.lock:
+            frame = part.frames.get(key)
+            if frame is None or frame.pin_count <= 0:
+                raise ValueError(f"Page {page_id} of '{table_name}' is not pinned")
+            frame.pin_count -= 1
+            if is_dirty:
+                frame.page.is_dirty = True
+    
+    @contextmanager
+    def pinned(self, table_name: str, page_id: int, write: bool = False) -> Iterator[Optional[Page]]:
+        """
+        Fija la página y toma su latch mientras dura el bloque:
+            with pool.pinned("t", 3) as page: ...              # lectura compartida
+            with pool.pinned("t", 3, write=True) as page: ...  # exclusivo; queda dirty
+        """
+        if self.get_page(table_name, page_id, pin=True) is None:
+            yield None
+            return
+        frame = self._lookup((table_name, page_id))  # Pinned: no puede haberse evictado
+        try:
+            if write:
+                frame.latch.acquire_write()
+            else:
+                frame.latch.acquire_read()
+            try:
+                yield frame.page
+            finally:
+                if write:
+                    frame.latch.release_write()
+                else:
+                    frame.latch.release_read()
+        finally:
+            self.unpin_page(table_name, page_id, is_dirty=write)
+    
+    def contains(self, table_name: str, page_id: int) -> bool:
+        """True si la página está en el pool (sin tocar la política ni las estadísticas)"""
+        return self._lookup((table_name, page_id)) is not None
+    
     def put_page(self, table_name: str, page: Page, write_through: bool = False) -> None:
         """
         Coloca una página en el buffer pool.
@@ -69,64 +452,286 @@ class BufferPool:
         # Marcar como dirty (necesita escribirse)
         page.is_dirty = True
         
-        # Agregar/actualizar en cache
-        self._add_to_cache(key, page)
-        
-        # Write-through: escribir inmediatamente a disco
-        if write_through:
-            self.flush_page(table_name, page.page_id)
+        # Agregar/actualizar en cache (fijada mientras se reemplaza y se escribe)
+        frame = self._lookup(key, pin=True) or self._install(key, page, pin=True)[0]
+        try:
+            if frame.page is not page and frame.wait_loaded() is None:
+                # Su lectura falló y el frame se liberó (sin él, el pin ya no cuenta)
+                frame = self._install(key, page, pin=True)[0]
+            if frame.page is not page:
+                # Reemplazar la versión cacheada: espera a que terminen sus lectores
+                frame.latch.acquire_write()
+                try:
+                    frame.page = page
+                finally:
+                    frame.latch.release_write()
+                part = self._part(key)
+                with self._lock:
+                    with part.lock:
+                        if part.frames.get(key) is frame:
+                            part.policy.hit(key)
+                            self._recharge(key, frame)
+            
+            # Write-through: escribir inmediatamente a disco
+            if write_through:
+                self._flush_frame(table_name, frame)
+        finally:
+            self._release_pin(key, frame)
     
-    def _add_to_cache(self, key: Tuple[str, int], page: Page) -> None:
-        """Agrega una página al cache, evictando si es necesario"""
-        # Si ya existe, moverla al final
-        if key in self.cache:
-            self.cache.move_to_end(key)
-            self.cache[key] = page
-            return
-        
-        # Si el cache está lleno, evictar la página LRU (la primera)
-        if len(self.cache) >= self.pool_size:
-            self._evict_page()
-        
-        # Agregar nueva página
-        self.cache[key] = page
+    def _install(self, key: Tuple[str, int], page: Optional[Page], pin: bool) -> Tuple[Frame, bool]:
+        """
+        Agrega la página al pool, evictando si es necesario; retorna (frame, creado).
+        Si ya estaba, retorna ese frame. page=None reserva un frame para leerla
+        (pinned y con io pendiente; ver _load).
+        """
+        part = self._part(key)
+        size = self._frame_size(key, page)
+        while True:
+            dirty: List[Tuple[Tuple[str, int], Frame]] = []
+            try:
+                with self._lock:
+                    with part.lock:
+                        frame = part.frames.get(key)
+                        if frame is not None:
+                            if pin:
+                                frame.pin_count += 1
+                            return frame, False
+                    
+                    # Si no entra (en la cuota de su tabla o en el pool), la política elige víctimas
+                    if self._make_room(key, size, dirty):
+                        frame = Frame(page, 1 if pin or page is None else 0, size)
+                        if page is None:
+                            frame.io = threading.Event()
+                        with part.lock:
+                            part.frames[key] = frame
+                            part.policy.admit(key)
+                        self._resident += 1
+                        self._charge(key[0], size)
+                        return frame, True
+                    if not dirty:
+                        # Las víctimas las está escribiendo otro hilo: esperarlas
+                        self._written.wait(self.WRITEBACK_WAIT)
+            finally:
+                # Víctimas dirty: se escriben sin los locks y se reintenta
+                self._write_back(dirty)
     
-    def _evict_page(self) -> None:
-        """Evicta la página menos recientemente usada (LRU)"""
-        if not self.cache:
-            return
+    def _frame_size(self, key: Tuple[str, int], page: Optional[Page]) -> int:
+        """
+        Bytes que cuesta el frame: el page_size de la tabla o, para un archivo
+        registrado, el tamaño estimado de su bloque decodificado (sin bloque todavía,
+        el page_size por defecto como reserva provisoria).
+        """
+        if page is not None and key[0] in self._loaders and isinstance(page.data, list):
+            return estimate_size(page.data)
+        return self.disk_manager.page_size(key[0])
+    
+    def _recharge(self, key: Tuple[str, int], frame: Frame) -> None:
+        """Ajusta lo cobrado por un frame a su página actual; requiere self._lock"""
+        size = self._frame_size(key, frame.page)
+        if size != frame.size:
+            self._charge(key[0], size - frame.size)
+            frame.size = size
+    
+    def _fit_budget(self, table_name: str) -> None:
+        """Evicta si un recobro dejó el pool (o la cuota de la tabla) por encima del presupuesto"""
+        if self.max_bytes is not None:
+            self._evict_while(lambda: self._resident > 1 and self._resident_bytes > self.max_bytes)
+        if table_name in self.quotas:
+            over_quota = lambda: self._table_bytes.get(table_name, 0) > self.quotas.get(table_name, float("inf"))
+            self._evict_while(over_quota, table_name)
+    
+    def _charge(self, table_name: str, size: int) -> None:
+        """Suma (o resta) bytes al total y a la tabla; requiere self._lock"""
+        self._resident_bytes += size
+        table_bytes = self._table_bytes.get(table_name, 0) + size
+        if table_bytes:
+            self._table_bytes[table_name] = table_bytes
+        else:
+            self._table_bytes.pop(table_name, None)
+    
+    def _over_budget(self, size: int, pages: int = 1) -> bool:
+        """True si agregar `pages` páginas de `size` bytes excede la capacidad"""
+        if self.max_bytes is not None:
+            return self._resident_bytes + size > self.max_bytes
+        return self._resident + pages > self.pool_size
+    
+    def _make_room(self, key: Tuple[str, int], size: int, dirty: List[Tuple[Tuple[str, int], Frame]]) -> bool:
+        """
+        Evicta hasta que la página entra en la cuota de su tabla y en el pool; requiere
+        self._lock. Retorna False si antes hay que escribir la víctima dirty de `dirty`
+        (o esperar las que escribe otro hilo).
+        """
+        table_name = key[0]
+        quota = self.quotas.get(table_name)
+        if quota is not None:
+            while self._table_bytes.get(table_name, 0) + size > quota:
+                if not self._evict_page(key, table_name, dirty):
+                    if dirty:
+                        return False
+                    break  # Todas las páginas de la tabla están pinned: manda solo el límite global
+        while self._resident and self._over_budget(size):
+            if not self._evict_page(key, None, dirty):
+                return False
+        return True
+    
+    def _evict_page(self, incoming: Optional[Tuple[str, int]] = None, table_name: Optional[str] = None,
+                    dirty: Optional[List[Tuple[Tuple[str, int], Frame]]] = None) -> bool:
+        """
+        Evicta la página que elige la política de alguna partición (en ronda desde
+        la última que evictó; nunca una pinned); requiere self._lock.
         
-        # Obtener la primera página (LRU)
-        lru_key, lru_page = self.cache.popitem(last=False)
+        Una víctima dirty no se escribe aquí: se fija y se agrega a `dirty` para que
+        el llamador la escriba fuera de los locks (_write_back la evicta después).
+        Retorna False si la víctima quedó pendiente de escritura, si no hay páginas
+        evictables de table_name o si solo quedan víctimas que otro hilo está
+        escribiendo; si todas están pinned lanza BufferPoolFullError.
+        """
+        if dirty is None:
+            dirty = []
+        count = len(self._parts)
+        for i in range(count):
+            index = (self._evict_cursor + i) % count
+            part = self._parts[index]
+            with part.lock:
+                victim_key = self._pick_victim(part, incoming, table_name)
+                if victim_key is None:
+                    continue
+                self._evict_cursor = (index + 1) % count
+                frame = part.frames[victim_key]
+                if frame.page.is_dirty:
+                    # Sigue en el pool mientras se escribe: un miss concurrente no lee la versión vieja del disco
+                    frame.pin_count += 1
+                    part.policy.admit(victim_key)
+                    dirty.append((victim_key, frame))
+                    self._writebacks += 1
+                    return False
+                self._drop(part, victim_key, frame)
+            return True
+        if table_name is not None or self._writebacks:
+            return False
+        raise BufferPoolFullError(f"All {self._resident} buffer pool pages are pinned")
+    
+    @staticmethod
+    def _pick_victim(part: Partition, incoming: Optional[Tuple[str, int]],
+                     table_name: Optional[str]) -> Optional[Tuple[str, int]]:
+        """Víctima de la partición según su política (None si no hay evictables); requiere part.lock"""
+        def can_evict(key: Tuple[str, int]) -> bool:
+            frame = part.frames.get(key)
+            return (frame is not None and frame.pin_count == 0
+                    and (table_name is None or key[0] == table_name))
         
-        # Si está dirty, escribir a disco antes de evictar
-        if lru_page.is_dirty:
-            table_name, page_id = lru_key
-            self.disk_manager.write_page(table_name, lru_page)
+        return part.policy.victim(incoming, can_evict)
+    
+    def _drop(self, part: Partition, key: Tuple[str, int], frame: Frame) -> None:
+        """Saca del pool una víctima ya elegida (fuera de la política); requiere self._lock y part.lock"""
+        del part.frames[key]
+        self._resident -= 1
+        self._charge(key[0], -frame.size)
+        registry.get(key[0]).evictions += 1
+        if self.adaptive:
+            self._remember_ghost(key, frame.size)
+    
+    def _write_back(self, dirty: List[Tuple[Tuple[str, int], Frame]]) -> int:
+        """
+        Escribe (sin los locks del pool) las víctimas dirty que fijó _evict_page y
+        las evicta si nadie las fijó ni modificó mientras tanto. Retorna cuántas evictó.
+        """
+        evicted = 0
+        for key, frame in dirty:
+            try:
+                self._flush_frame(key[0], frame)
+            finally:
+                part = self._part(key)
+                with self._written:
+                    with part.lock:
+                        frame.pin_count -= 1
+                        if part.frames.get(key) is frame and frame.pin_count == 0 and not frame.page.is_dirty:
+                            part.policy.remove(key)
+                            self._drop(part, key, frame)
+                            evicted += 1
+                    self._writebacks -= 1
+                    self._written.notify_all()
+        return evicted
+    
+    def _evict_while(self, over: Callable[[], bool], table_name: Optional[str] = None) -> int:
+        """
+        Evicta mientras over() (evaluado con self._lock); las víctimas dirty se escriben
+        fuera del lock y se reintenta. Se detiene si solo quedan páginas pinned.
+        Retorna cuántas páginas evictó.
+        """
+        evicted = 0
+        while True:
+            dirty: List[Tuple[Tuple[str, int], Frame]] = []
+            try:
+                with self._lock:
+                    while over():
+                        if not self._evict_page(None, table_name, dirty):
+                            break
+                        evicted += 1
+                    if not dirty:
+                        return evicted
+            except BufferPoolFullError:
+                return evicted
+            finally:
+                evicted += self._write_back(dirty)
+    
+    def _flush_frame(self, table_name: str, frame: Frame) -> None:
+        """Escribe la página del frame si está dirty (con su latch de lectura)"""
+        frame.latch.acquire_read()
+        try:
+            if frame.page is not None and frame.page.is_dirty:
+                if self.before_write is not None:
+                    self.before_write()
+                self.disk_manager.write_page(table_name, frame.page)
+                registry.get(table_name).dirty_flushes += 1
+        finally:
+            frame.latch.release_read()
     
     def flush_page(self, table_name: str, page_id: int) -> None:
         """Escribe una página específica a disco si está dirty"""
-        key = (table_name, page_id)
-        
-        if key in self.cache:
-            page = self.cache[key]
-            if page.is_dirty:
-                self.disk_manager.write_page(table_name, page)
+        frame = self._lookup((table_name, page_id))
+        if frame is not None:
+            self._flush_frame(table_name, frame)
     
     def flush_table(self, table_name: str) -> None:
         """Escribe todas las páginas dirty de una tabla a disco"""
-        keys_to_flush = [k for k in self.cache.keys() if k[0] == table_name]
-        
-        for key in keys_to_flush:
-            page = self.cache[key]
-            if page.is_dirty:
-                self.disk_manager.write_page(table_name, page)
+        for key, frame in self._frames():
+            if key[0] == table_name:
+                self._flush_frame(table_name, frame)
     
     def flush_all(self) -> None:
         """Escribe todas las páginas dirty a disco"""
-        for (table_name, page_id), page in self.cache.items():
-            if page.is_dirty:
-                self.disk_manager.write_page(table_name, page)
+        for (table_name, _), frame in self._frames():
+            self._flush_frame(table_name, frame)
+    
+    def dirty_pages(self) -> List[Tuple[str, int]]:
+        """Claves de las páginas dirty residentes en este momento"""
+        return [key for key, frame in self._frames() if frame.page is not None and frame.page.is_dirty]
+    
+    def flush_dirty(self, max_pages: Optional[int] = None) -> int:
+        """
+        Escribe hasta max_pages páginas dirty no fijadas (las fijadas se están
+        modificando: se escriben en otra ronda). Retorna cuántas escribió.
+        """
+        written = 0
+        for (table_name, _), frame in self._frames():
+            if max_pages is not None and written >= max_pages:
+                break
+            if frame.pin_count == 0 and frame.page is not None and frame.page.is_dirty:
+                self._flush_frame(table_name, frame)
+                written += 1
+        return written
+    
+    def _remove(self, key: Tuple[str, int]) -> None:
+        """Quita el frame del pool y de la política; requiere self._lock"""
+        part = self._part(key)
+        with part.lock:
+            frame = part.frames.pop(key, None)
+            if frame is None:
+                return
+            part.policy.remove(key)
+        self._resident -= 1
+        self._charge(key[0], -frame.size)
     
     def clear_table(self, table_name: str) -> None:
         """Elimina todas las páginas de una tabla del cache"""
@@ -134,32 +739,170 @@ class BufferPool:
         self.flush_table(table_name)
         
         # Eliminar del cache
-        keys_to_remove = [k for k in self.cache.keys() if k[0] == table_name]
-        for key in keys_to_remove:
-            del self.cache[key]
+        with self._lock:
+            for key, _ in self._frames():
+                if key[0] == table_name:
+                    self._remove(key)
+    
+    def discard_pages(self, table_name: str, page_ids) -> None:
+        """Descarta (sin flush) copias cacheadas de páginas reescritas directo en disco"""
+        with self._lock:
+            for page_id in page_ids:
+                self._remove((table_name, page_id))
     
     def clear_all(self) -> None:
         """Limpia todo el buffer pool (con flush)"""
         self.flush_all()
-        self.cache.clear()
+        with self._lock:
+            for part in self._parts:
+                with part.lock:
+                    part.frames.clear()
+                    part.policy = self._make_policy(len(self._parts))
+            self._resident = 0
+            self._resident_bytes = 0
+            self._table_bytes.clear()
+            self._ghosts.clear()
+            self._ghost_hits.clear()
+    
+    def resize(self, pool_size: Optional[int] = None, max_bytes: Optional[int] = None,
+               adaptive: Optional[bool] = None) -> int:
+        """
+        Cambia la capacidad en caliente (max_bytes tiene prioridad sobre pool_size)
+        y evicta lo que sobra. La política se recrea con la nueva capacidad y
+        readmite las páginas residentes. Las páginas pinned no se evictan: si
+        impiden achicar, el resto se evicta con los próximos misses.
+        Retorna cuántas páginas se evictaron.
+        """
+        with self._lock:
+            self._set_capacity(pool_size, max_bytes)
+            if adaptive is not None:
+                self.adaptive = adaptive
+                if not adaptive:
+                    self.quotas.clear()
+                    self._ghosts.clear()
+                    self._ghost_hits.clear()
+            budget = self.budget_bytes
+            self.quotas = {name: min(quota, budget) for name, quota in self.quotas.items()}
+            
+            for part in self._parts:
+                with part.lock:
+                    policy = self._make_policy(len(self._parts))
+                    for key in part.frames:
+                        policy.admit(key)
+                    part.policy = policy
+        
+        return self._evict_while(lambda: self._resident and self._over_budget(0, 0))
+    
+    def set_quota(self, table_name: str, quota_bytes: Optional[int]) -> None:
+        """Fija (o quita, con None) el tope en bytes de una tabla dentro del pool"""
+        with self._lock:
+            if quota_bytes is None:
+                self.quotas.pop(table_name, None)
+                return
+            self.quotas[table_name] = quota_bytes
+        self._evict_while(lambda: self._table_bytes.get(table_name, 0) > self.quotas.get(table_name, quota_bytes),
+                          table_name)
+    
+    def _remember_ghost(self, key: Tuple[str, int], size: int) -> None:
+        """Registra una clave evictada (de `size` bytes) en la lista fantasma de su tabla"""
+        ghosts = self._ghosts.setdefault(key[0], OrderedDict())
+        ghosts[key] = None
+        limit = max(1, self.budget_bytes // self.GHOST_SHARE // max(1, size))
+        while len(ghosts) > limit:
+            ghosts.popitem(last=False)
+    
+    def _note_miss(self, key: Tuple[str, int], dirty: List[Tuple[Tuple[str, int], Frame]]) -> None:
+        """Cuenta hits fantasma y rebalancea las cuotas cada REBALANCE_MISSES misses; requiere self._lock"""
+        ghosts = self._ghosts.get(key[0])
+        if ghosts is not None and key in ghosts:
+            del ghosts[key]
+            self._ghost_hits[key[0]] = self._ghost_hits.get(key[0], 0) + 1
+        self._misses_since_rebalance += 1
+        if self._misses_since_rebalance >= self.REBALANCE_MISSES:
+            self._rebalance(dirty)
+    
+    def _rebalance(self, dirty: List[Tuple[Tuple[str, int], Frame]]) -> None:
+        """Pasa un paso de cuota de la tabla con menos hits fantasma a la que tiene más"""
+        self._misses_since_rebalance = 0
+        gains, self._ghost_hits = self._ghost_hits, {}
+        budget = self.budget_bytes
+        step = max(1, budget // self.QUOTA_STEPS)
+        new = [name for name in set(self._table_bytes) | set(gains) if name not in self.quotas]
+        if not self.quotas:
+            # Primer rebalanceo: partes iguales del presupuesto
+            self.quotas = {name: max(step, budget // max(1, len(new))) for name in new}
+        else:
+            for name in new:
+                # Tabla nueva: un paso, tomado de la cuota más grande
+                richest = max(self.quotas, key=self.quotas.get)
+                if self.quotas[richest] - step >= step:
+                    self.quotas[richest] -= step
+                self.quotas[name] = step
+        if len(self.quotas) < 2:
+            return
+        
+        winner = max(self.quotas, key=lambda name: gains.get(name, 0))
+        donors = [name for name in self.quotas if name != winner and self.quotas[name] - step >= step]
+        if not donors:
+            return
+        donor = min(donors, key=lambda name: gains.get(name, 0))
+        if gains.get(winner, 0) <= gains.get(donor, 0):
+            return
+        self.quotas[winner] = min(budget, self.quotas[winner] + step)
+        self.quotas[donor] -= step
+        # Lo que la cuota nueva no alcance a evictar ahora (dirty) lo evictan los próximos misses del donante
+        while self._table_bytes.get(donor, 0) > self.quotas[donor] and self._evict_page(None, donor, dirty):
+            pass
+        self.rebalances += 1
+    
+    def start_trace(self) -> None:
+        """Empieza a registrar los accesos (table, page_id) de get_page"""
+        self.trace = []
+    
+    def stop_trace(self) -> List[Tuple[str, int]]:
+        """Deja de registrar y retorna la traza capturada"""
+        trace, self.trace = self.trace or [], None
+        return trace
+    
+    def get_cached_bytes(self) -> int:
+        """Bytes ocupados por las páginas en cache (page_size de cada tabla; bloques de índice por tamaño decodificado)"""
+        return self._resident_bytes
     
     def get_stats(self) -> Dict[str, any]:
         """Retorna estadísticas del buffer pool"""
-        total_accesses = self.cache_hits + self.cache_misses
-        hit_rate = (self.cache_hits / total_accesses * 100) if total_accesses > 0 else 0
+        cache_hits, cache_misses = self.cache_hits, self.cache_misses
+        total_accesses = cache_hits + cache_misses
+        hit_rate = (cache_hits / total_accesses * 100) if total_accesses > 0 else 0
         
         return {
-            "cache_hits": self.cache_hits,
-            "cache_misses": self.cache_misses,
+            "cache_hits": cache_hits,
+            "cache_misses": cache_misses,
             "hit_rate": f"{hit_rate:.2f}%",
-            "pages_in_cache": len(self.cache),
+            "pages_in_cache": self._resident,
+            "pinned_pages": sum(1 for _, frame in self._frames() if frame.pin_count),
+            "dirty_pages": len(self.dirty_pages()),
             "pool_size": self.pool_size,
+            "max_bytes": self.max_bytes,
+            "policy": self.policy_name,
+            "partitions": len(self._parts),
+            "ring_reads": self.ring_reads,
+            "cached_bytes": self.get_cached_bytes(),
+            "table_bytes": dict(self._table_bytes),
+            "quotas": dict(self.quotas),
+            "adaptive": self.adaptive,
+            "rebalances": self.rebalances,
             "disk_reads": self.disk_manager.disk_reads,
-            "disk_writes": self.disk_manager.disk_writes
+            "disk_writes": self.disk_manager.disk_writes,
+            "bytes_read": self.disk_manager.bytes_read,
+            "bytes_written": self.disk_manager.bytes_written
         }
     
     def reset_stats(self) -> None:
         """Resetea las estadísticas"""
-        self.cache_hits = 0
-        self.cache_misses = 0
+        for part in self._parts:
+            with part.lock:
+                part.hits = 0
+                part.misses = 0
+        with self._lock:
+            self.ring_reads = 0
         self.disk_manager.reset_counters()
@@ -0,0 +1,177 @@
+"""
+Catalog Store - Persistencia incremental del catálogo de tablas
+Un snapshot binario (reemplazo atómico) más un log de cambios append-only: un
+cambio de una tabla cuesta un append chico en vez de reescribir todo el catálogo.
+"""
+import json
+import os
+import pickle
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Set, Tuple
+
+
+class CatalogStore:
+    """
+    catalog.bin: [MAGIC][crc32 (uint32)][pickle de {tabla: metadata}]
+    catalog.log: por registro [longitud (uint32)][crc32 (uint32)][pickle (op, tabla, metadata)]
+
+    Operaciones del log:
+        "put": metadata completa de la tabla (reemplaza a la anterior)
+        "drop": la tabla se eliminó
+        "dirty": los contadores de la tabla cambiaron y todavía no se persistieron
+
+    Los contadores por fila (num_records, num_pages) se persisten de forma
+    diferida: mark_dirty() solo anota la tabla (y escribe un "dirty" la primera
+    vez desde el último flush) y flush() agrega un "put" por tabla sucia. Al
+    abrir, las tablas con un "dirty" sin "put" posterior quedan en `stale`
+    (el proceso terminó sin flush: hay que recontarlas).
+
+    snapshot() escribe el catálogo completo a un .tmp y lo renombra (atómico) y
+    recién después vacía el log; si se corta en el medio, reaplicar el log sobre
+    el snapshot nuevo es idempotente. Una cola rota del log (crash a mitad de un
+    append) se descarta.
+    """
+
+    MAGIC = b'CAT1'
+    HEADER = struct.Struct('<4sI')
+    RECORD_HEADER = struct.Struct('<II')
+
+    # Tamaño del log a partir del cual flush() compacta en un snapshot nuevo
+    COMPACT_BYTES = 1024 * 1024
+
+    def __init__(self, data_dir: Any, fsync: bool = True, compact_bytes: int = COMPACT_BYTES):
+        """
+        Args:
+            data_dir: Directorio del catálogo
+            fsync: Forzar a disco el snapshot antes de renombrarlo (False solo para tests/benchmarks)
+            compact_bytes: Tamaño del log que dispara un snapshot en flush()
+        """
+        self.data_dir = Path(data_dir)
+        self.snapshot_file = self.data_dir / "catalog.bin"
+        self.log_file = self.data_dir / "catalog.log"
+        self.legacy_file = self.data_dir / "catalog.json"
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+
+        self._dirty: Set[str] = set()
+        self._log_size = 0
+
+        # Estadísticas
+        self.appends = 0
+        self.snapshots = 0
+
+    def load(self) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Lee snapshot + log; retorna (tablas, stale). Sin catalog.bin migra el
+        catalog.json de versiones anteriores (se deja en su lugar, ya no se escribe).
+        """
+        tables: Dict[str, Dict[str, Any]] = {}
+        if self.snapshot_file.exists():
+            data = self.snapshot_file.read_bytes()
+            magic, crc = self.HEADER.unpack_from(data)
+            payload = data[self.HEADER.size:]
+            if magic != self.MAGIC or zlib.crc32(payload) != crc:
+                raise ValueError(f"Corrupt catalog snapshot: {self.snapshot_file}")
+            tables = pickle.loads(payload)
+        elif self.legacy_file.exists():
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                tables = json.load(f)
+            self.snapshot(tables)
+
+        stale: Set[str] = set()
+        valid_size = 0
+        for (op, name, meta), end in self._iter_log():
+            if op == "put":
+                tables[name] = meta
+                stale.discard(name)
+            elif op == "drop":
+                tables.pop(name, None)
+                stale.discard(name)
+            elif op == "dirty" and name in tables:
+                stale.add(name)
+            valid_size = end
+        if self.log_file.exists() and self.log_file.stat().st_size != valid_size:
+            os.truncate(self.log_file, valid_size)
+        self._log_size = valid_size
+        return tables, stale
+
+    def _iter_log(self) -> Iterator[Tuple[Tuple[str, str, Any], int]]:
+        """((op, tabla, metadata), offset final) de cada registro íntegro; se detiene en la cola rota"""
+        if not self.log_file.exists():
+            return
+        data = self.log_file.read_bytes()
+        offset = 0
+        while offset + self.RECORD_HEADER.size <= len(data):
+            length, crc = self.RECORD_HEADER.unpack_from(data, offset)
+            start = offset + self.RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            offset = start + length
+            yield pickle.loads(payload), offset
+
+    def _append(self, *records: Tuple[str, str, Any]) -> None:
+        buffer = bytearray()
+        for record in records:
+            payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+            buffer += self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_file, 'ab') as f:
+            f.write(buffer)
+        self._log_size += len(buffer)
+        self.appends += len(records)
+
+    def put(self, name: str, meta: Dict[str, Any]) -> None:
+        """Cambio estructural (crear, schema, opciones, vaciar): se persiste ya"""
+        self._append(("put", name, meta))
+        self._dirty.discard(name)
+
+    def drop(self, name: str) -> None:
+        self._append(("drop", name, None))
+        self._dirty.discard(name)
+
+    def mark_dirty(self, name: str, log: bool = True) -> None:
+        """
+        Contadores modificados en memoria (se persisten en flush()).
+        log=False cuando otro log ya los hace durables (p. ej. el WAL).
+        """
+        if name not in self._dirty:
+            self._dirty.add(name)
+            if log:
+                self._append(("dirty", name, None))
+
+    def flush(self, tables: Dict[str, Dict[str, Any]]) -> None:
+        """Persiste los contadores de las tablas sucias; compacta si el log creció de más"""
+        dirty = [name for name in self._dirty if name in tables]
+        if dirty:
+            self._append(*(("put", name, tables[name]) for name in dirty))
+        self._dirty.clear()
+        if self._log_size >= self.compact_bytes:
+            self.snapshot(tables)
+
+    def snapshot(self, tables: Dict[str, Dict[str, Any]]) -> None:
+        """Escribe el catálogo completo (tmp + rename atómico) y vacía el log"""
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        payload = pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_file = self.snapshot_file.with_name(self.snapshot_file.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, zlib.crc32(payload)) + payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        self._dirty.clear()  # El snapshot ya incluye los contadores actuales
+        if self.log_file.exists():
+            os.truncate(self.log_file, 0)
+        self._log_size = 0
+        self.snapshots += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "log_bytes": self._log_size,
+            "appends": self.appends,
+            "snapshots": self.snapshots,
+            "dirty_tables": len(self._dirty)
+        }
@@ -0,0 +1,124 @@
+"""
+Compression - Compresión transparente de páginas y bloques de índice
+Codecs intercambiables (zlib, lzma de la stdlib) con cabecera propia, así un
+mismo archivo puede mezclar páginas comprimidas y sin comprimir.
+"""
+import lzma
+import struct
+import zlib
+from typing import Any, Dict, Optional, Protocol, Type
+
+# Primer byte de un payload comprimido (codec binario = 0xC5, pickle = 0x80, overflow = 0xF1)
+COMPRESSED_MAGIC = b'\xcc'
+
+# Cabecera: [COMPRESSED_MAGIC][id del compresor][bytes sin comprimir (uint32)][bytes comprimidos (uint32)]
+COMPRESSED_HEADER = struct.Struct('<BII')
+HEADER_SIZE = len(COMPRESSED_MAGIC) + COMPRESSED_HEADER.size
+
+
+class ICompressor(Protocol):
+    name: str
+    codec_id: int
+
+    def compress(self, data: bytes) -> bytes: ...
+    def decompress(self, data: Any) -> bytes: ...
+
+
+class ZlibCompressor:
+    """DEFLATE (zlib): rápido, buena razón en texto repetitivo"""
+    name = "zlib"
+    codec_id = 1
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: Any) -> bytes:
+        return zlib.decompress(data)
+
+
+class LzmaCompressor:
+    """LZMA (xz): mejor razón que zlib a cambio de más CPU"""
+    name = "lzma"
+    codec_id = 2
+
+    def __init__(self, preset: int = 1):
+        self.preset = preset
+
+    def compress(self, data: bytes) -> bytes:
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=self._filters())
+
+    def decompress(self, data: Any) -> bytes:
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=self._filters())
+
+    def _filters(self):
+        # Formato RAW: sin la cabecera/footer de .xz (~60 bytes por página)
+        return [{"id": lzma.FILTER_LZMA2, "preset": self.preset}]
+
+
+# Registro de compresores por nombre (opción `compression` de la tabla) e id (cabecera)
+_COMPRESSORS: Dict[str, Type] = {}
+_BY_ID: Dict[int, ICompressor] = {}
+
+
+def register_compressor(compressor_cls: Type) -> Type:
+    """Registra un compresor; su codec_id debe ser único (se persiste en cada página)"""
+    if compressor_cls.codec_id in _BY_ID and _BY_ID[compressor_cls.codec_id].name != compressor_cls.name:
+        raise ValueError(f"Compressor id {compressor_cls.codec_id} already registered")
+    _COMPRESSORS[compressor_cls.name] = compressor_cls
+    _BY_ID[compressor_cls.codec_id] = compressor_cls()
+    return compressor_cls
+
+
+register_compressor(ZlibCompressor)
+register_compressor(LzmaCompressor)
+
+
+def get_compressor(name: Optional[str]) -> Optional[ICompressor]:
+    """Retorna el compresor registrado con ese nombre (None/'none' = sin compresión)"""
+    if not name or str(name).lower() == "none":
+        return None
+    try:
+        return _COMPRESSORS[str(name).lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown compression '{name}' (available: {sorted(_COMPRESSORS)})") from None
+
+
+def compress_payload(data: bytes, compressor: Optional[ICompressor]) -> bytes:
+    """
+    Comprime un payload y le antepone la cabecera. Si no hay compresor o la
+    compresión no reduce el tamaño, retorna el payload original sin cabecera.
+    """
+    if compressor is None or not data:
+        return data
+    compressed = compressor.compress(bytes(data))
+    if len(compressed) + HEADER_SIZE >= len(data):
+        return data
+    header = COMPRESSED_HEADER.pack(compressor.codec_id, len(data), len(compressed))
+    return COMPRESSED_MAGIC + header + compressed
+
+
+def is_compressed(buf: Any) -> bool:
+    return buf[:1] == COMPRESSED_MAGIC
+
+
+def compressed_sizes(buf: Any):
+    """(bytes sin comprimir, bytes almacenados) de un payload con cabecera"""
+    _, raw_size, stored_size = COMPRESSED_HEADER.unpack_from(buf, 1)
+    return raw_size, HEADER_SIZE + stored_size
+
+
+def decompress_payload(buf: Any) -> Any:
+    """Descomprime un payload con cabecera; sin cabecera lo retorna tal cual (ignora el padding)"""
+    if not is_compressed(buf):
+        return buf
+    codec_id, raw_size, stored_size = COMPRESSED_HEADER.unpack_from(buf, 1)
+    compressor = _BY_ID.get(codec_id)
+    if compressor is None:
+        raise ValueError(f"Unknown compressor id {codec_id}")
+    data = compressor.decompress(buf[HEADER_SIZE:HEADER_SIZE + stored_size])
+    if len(data) != raw_size:
+        raise ValueError("Corrupted compressed payload")
+    return data
@@ -0,0 +1,257 @@
+"""
+CSV Ingest - Parseo de CSV en paralelo con conversión por columna
+El archivo se parte en rangos de bytes que terminan en fin de registro; cada
+proceso parsea su rango y convierte columna por columna con el conversor del
+tipo inferido (sin probar int/float/str en cada celda como utils._convert_value).
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import io
+import mmap
+import multiprocessing
+import os
+import re
+from .record_codec import BOOL, FLOAT, INT, TEXT
+from .schema import BOOL_LITERALS, Column, parse_bool
+from .utils import _convert_value
+
+# Lote columnar: {columna: valores}, todas las listas del mismo largo
+ColumnBatch = Dict[str, List[Any]]
+
+# Bytes por rango (unidad de trabajo de un proceso)
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Conversor de un valor no vacío según el tipo de la columna
+_PARSERS = {INT: int, FLOAT: float, BOOL: parse_bool}
+
+# Literales exactos que infieren INT/FLOAT (int()/float() aceptan además nan, inf, 1_000 y espacios)
+_LITERALS = ((INT, re.compile(r'[+-]?\d+', re.ASCII)),
+             (FLOAT, re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?', re.ASCII)))
+
+
+def _read_header(path: str) -> Tuple[List[str], int]:
+    """(nombres de columnas, offset del primer registro)"""
+    with open(path, 'rb') as f:
+        data = f.read(64 * 1024)
+        while True:
+            end = _record_end(data, 0)
+            if end is not None:
+                break
+            more = f.read(64 * 1024)
+            if not more:
+                end = len(data)
+                break
+            data += more
+    text = data[:end].decode('utf-8-sig', errors='replace')
+    header = next(csv.reader(io.StringIO(text)), [])
+    return header, end
+
+
+def _record_end(data: bytes, start: int) -> Optional[int]:
+    """
+    Offset siguiente al primer fin de registro desde start: un \\n fuera de
+    comillas (con un número par de comillas desde start; "" escapado no altera la paridad).
+    """
+    pos = start
+    quotes = 0
+    while True:
+        newline = data.find(b'\n', pos)
+        if newline < 0:
+            return None
+        quotes += data.count(b'"', pos, newline)
+        if quotes % 2 == 0:
+            return newline + 1
+        pos = newline + 1
+
+
+def split_ranges(path: str, chunk_bytes: int = CHUNK_BYTES) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Header y rangos [inicio, fin) de ~chunk_bytes que empiezan y terminan en un
+    límite de registro. Un \\n dentro de un campo entre comillas no es límite:
+    se lleva la paridad de comillas desde el inicio de los datos.
+    """
+    header, offset = _read_header(path)
+    size = os.path.getsize(path)
+    ranges = []
+    if offset >= size:
+        return header, ranges
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = pos = offset
+        quotes = 0
+        while start < size:
+            target = start + chunk_bytes
+            if target >= size:
+                ranges.append((start, size))
+                break
+            quotes += data[pos:target].count(b'"')
+            pos = target
+            end = None
+            while end is None:
+                newline = data.find(b'\n', pos)
+                if newline < 0:
+                    end = size
+                    break
+                quotes += data[pos:newline].count(b'"')
+                pos = newline + 1
+                if quotes % 2 == 0:
+                    end = pos
+            ranges.append((start, end))
+            start = pos = end
+    return header, ranges
+
+
+def _infer_column(values: Iterable[str]) -> Tuple[Optional[str], bool]:
+    """
+    (tipo, nullable) de los valores de una columna en un rango. Se prueba el
+    literal de cada tipo sobre los valores distintos con un map() (sin
+    try/except por celda); sin valores no vacíos el tipo es None (no hay evidencia).
+    """
+    distinct = set(values)
+    nullable = '' in distinct
+    distinct.discard('')
+    if not distinct:
+        return None, nullable
+    for kind, literal in _LITERALS:
+        if all(map(literal.fullmatch, distinct)):
+            return kind, nullable
+    if {value.strip().lower() for value in distinct} <= BOOL_LITERALS.keys():
+        return BOOL, nullable
+    return TEXT, nullable
+
+
+def _merge_kind(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """Tipo que admite los valores de ambos rangos: INT+FLOAT -> FLOAT, cualquier otra mezcla -> TEXT"""
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if {a, b} == {INT, FLOAT}:
+        return FLOAT
+    return TEXT
+
+
+def _infer_range(path: str, start: int, end: int, header: List[str]) -> List[Tuple[Optional[str], bool]]:
+    return [_infer_column(values) for values in _read_columns(path, start, end, len(header))]
+
+
+def infer_columns(path: str, workers: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> List[Column]:
+    """
+    Columnas tipadas (INT/FLOAT/BOOL/TEXT) y su nullability según el archivo
+    entero: cada rango se infiere en paralelo y los resultados se combinan.
+    Una columna es nullable si tiene alguna celda vacía; sin ningún valor, TEXT.
+    """
+    header, ranges = split_ranges(path, chunk_bytes)
+    kinds: List[Optional[str]] = [None] * len(header)
+    nullable = [False] * len(header)
+    for result in _map_ranges(_infer_range, path, ranges, header, workers):
+        for i, (kind, has_nulls) in enumerate(result):
+            kinds[i] = _merge_kind(kinds[i], kind)
+            nullable[i] = nullable[i] or has_nulls
+    return [Column(name, kind or TEXT, has_nulls or kind is None)
+            for name, kind, has_nulls in zip(header, kinds, nullable)]
+
+
+def infer_types(path: str, workers: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> Dict[str, str]:
+    """Tipo de cada columna según el archivo entero (ver infer_columns)"""
+    return {col.name: col.type for col in infer_columns(path, workers, chunk_bytes)}
+
+
+def _fallback(parse: Callable[[str], Any]) -> Callable[[str], Any]:
+    """Conversor que no falla: un valor que no corresponde al tipo se convierte como load_csv"""
+    def convert(value: str) -> Any:
+        if not value:
+            return None
+        try:
+            return parse(value)
+        except ValueError:
+            return _convert_value(value)
+    return convert
+
+
+def _convert_column(values: List[str], kind: str) -> List[Any]:
+    """Convierte una columna entera; vacíos de columnas INT/FLOAT/BOOL -> None (TEXT queda igual)"""
+    parse = _PARSERS.get(str(kind).upper())
+    if parse is None:
+        return values
+    try:
+        # Camino rápido: sin try/except por celda
+        return [parse(value) if value else None for value in values]
+    except ValueError:
+        # Tipos dados por el llamador que no se ajustan a algún valor: celda por celda
+        return list(map(_fallback(parse), values))
+
+
+def _read_columns(path: str, start: int, end: int, width: int) -> List[Tuple[str, ...]]:
+    """Valores crudos (str) de cada columna en los registros de [start, end)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8', errors='replace')
+    # Se saltean líneas vacías y las filas cortas se completan con vacíos (como DictReader)
+    rows = [row if len(row) == width else (row + [''] * width)[:width]
+            for row in csv.reader(io.StringIO(text, newline='')) if row]
+    return list(zip(*rows)) if rows else [()] * width
+
+
+def parse_range(path: str, start: int, end: int, header: List[str], types: Dict[str, str]) -> ColumnBatch:
+    """Parsea los registros de [start, end) y retorna un lote columnar tipado"""
+    columns = _read_columns(path, start, end, len(header))
+    return {name: _convert_column(list(values), types.get(name, TEXT))
+            for name, values in zip(header, columns)}
+
+
+def batch_rows(batch: ColumnBatch) -> List[Dict[str, Any]]:
+    """Lote columnar -> lista de filas (dicts)"""
+    names = list(batch)
+    return [dict(zip(names, values)) for values in zip(*batch.values())]
+
+
+def iter_csv_columns(path: str, types: Optional[Dict[str, str]] = None, workers: Optional[int] = None,
+                     chunk_bytes: int = CHUNK_BYTES) -> Iterator[ColumnBatch]:
+    """
+    Lotes columnares tipados del CSV, en orden del archivo.
+
+    Con types=None el archivo se lee y tokeniza dos veces: infer_types lo
+    recorre entero antes del primer lote (el tipo de una columna puede cambiar
+    en el último rango) y después se parsea con esos tipos. Una sola pasada
+    obligaría a retener todo el archivo en memoria antes de convertir; quien ya
+    conozca los tipos (p. ej. de un schema) debe pasarlos.
+
+    Args:
+        types: Tipo por columna (None = infer_types sobre el archivo entero, una pasada extra)
+        workers: Procesos (None = os.cpu_count(); con 1 se parsea en este proceso)
+        chunk_bytes: Bytes por rango
+    """
+    header, ranges = split_ranges(path, chunk_bytes)
+    if types is None:
+        types = infer_types(path, workers, chunk_bytes)
+    yield from _map_ranges(parse_range, path, ranges, header, workers, types)
+
+
+def _map_ranges(fn: Callable[..., Any], path: str, ranges: List[Tuple[int, int]], header: List[str],
+                workers: Optional[int], *args: Any) -> Iterator[Any]:
+    """fn(path, inicio, fin, header, *args) por rango, en orden; en procesos si hay más de uno"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield fn(path, start, end, header, *args)
+        return
+    # spawn: el llamador puede tener hilos vivos (bgwriter, read-ahead) que un fork no copiaría
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as pool:
+        # A lo sumo 2 rangos por proceso en vuelo: memoria acotada si el consumidor es más lento
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(fn, path, start, end, header, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_csv_parallel(path: str, types: Optional[Dict[str, str]] = None, workers: Optional[int] = None,
+                      chunk_bytes: int = CHUNK_BYTES) -> Iterator[List[Dict[str, Any]]]:
+    """Como iter_csv_columns pero en chunks de filas (para Table.load_stream)"""
+    for batch in iter_csv_columns(path, types, workers, chunk_bytes):
+        yield batch_rows(batch)
@@ -0,0 +1,110 @@
+"""
+Decoded Cache - Cache de bloques ya decodificados acotado por bytes
+Evita repetir decode_rows/pickle.loads en lecturas calientes que no pasan por el
+buffer pool (índices sin pool asignado, registros reensamblados de overflow).
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import sys
+import threading
+
+# Filas muestreadas para estimar el tamaño en memoria de un bloque
+SIZE_SAMPLE_ROWS = 8
+
+
+def estimate_size(rows: List[Dict[str, Any]]) -> int:
+    """Bytes aproximados de una lista de filas decodificadas (extrapola una muestra)"""
+    size = sys.getsizeof(rows)
+    if not rows:
+        return size
+    sample = rows[:SIZE_SAMPLE_ROWS]
+    sample_size = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values()) for row in sample)
+    return size + sample_size * len(rows) // len(sample)
+
+
+class DecodedCache:
+    """
+    LRU de objetos decodificados con clave (archivo, bloque, versión).
+
+    Cada archivo tiene un número de versión: invalidate(archivo) lo incrementa
+    en O(1) y las entradas de versiones anteriores dejan de ser alcanzables
+    (salen por el extremo LRU). discard(archivo, bloque) borra un solo bloque
+    reescrito. La evicción se hace por bytes estimados (estimate_size) hasta
+    quedar bajo max_bytes; un objeto más grande que el presupuesto no se cachea.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Hashable, int, int], Tuple[Any, int]]" = OrderedDict()
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, file: Hashable) -> int:
+        return self._versions.get(file, 0)
+
+    def get(self, file: Hashable, block_no: int) -> Optional[Any]:
+        """Objeto cacheado de la versión actual del archivo (None = miss)"""
+        key = (file, block_no, self._versions.get(file, 0))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, file: Hashable, block_no: int, value: Any, size: Optional[int] = None) -> None:
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        key = (file, block_no, self._versions.get(file, 0))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, file: Hashable, block_no: int) -> None:
+        """Olvida un bloque reescrito"""
+        with self._lock:
+            entry = self._entries.pop((file, block_no, self._versions.get(file, 0)), None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def invalidate(self, file: Hashable) -> None:
+        """Invalida todos los bloques del archivo (nueva versión)"""
+        with self._lock:
+            self._versions[file] = self._versions.get(file, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": f"{(self.hits / total * 100) if total else 0:.2f}%",
+            "evictions": self.evictions
+        }
+
+
+# Cache compartido por los índices que no tienen buffer pool asignado
+shared_cache = DecodedCache()
@@ -2,124 +2,655 @@
 Disk Manager - Gestión de páginas en disco
 Simula el almacenamiento en memoria secundaria con archivos binarios
 """
+import mmap
 import os
 import pickle
-from typing import Any, Dict, Optional
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
 from pathlib import Path
+from .compression import (ICompressor, compress_payload, compressed_sizes, decompress_payload,
+                          get_compressor, is_compressed)
+from .prefetch import ReadAhead
+from .record_codec import CodecError, RecordCodec, decode_rows, encode_rows
+from .stats import registry
+
+
+def pread(fd: int, size: int, offset: int) -> bytes:
+    """Lee `size` bytes en `offset` sin mover el cursor (os.pread o seek+read)"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def pwrite(fd: int, data: bytes, offset: int) -> int:
+    """Escribe `data` en `offset` sin mover el cursor (os.pwrite o seek+write)"""
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, data, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, data)
+
+
+class PageOverflowError(ValueError):
+    """La página serializada no cabe en el tamaño de página de la tabla"""
+
 
 class Page:
-    """Representa una página de disco (4KB por defecto)"""
-    PAGE_SIZE = 4096  # 4KB - tamaño estándar
+    """
+    Representa una página de disco (4KB por defecto; cada tabla puede usar
+    otro tamaño con la opción page_size, ver DiskManager.configure_table).
     
-    def __init__(self, page_id: int, data: Any = None):
+    Tipos de página:
+    - DATA: lista de registros (contenedor del codec o pickle, sin cabecera)
+    - OVERFLOW_HEAD / OVERFLOW: cadena de páginas para un registro que no cabe
+      en una sola página; `data` es el fragmento de bytes y `next_page` enlaza
+      con la siguiente (-1 = fin de la cadena)
+    """
+    PAGE_SIZE = 4096  # 4KB - tamaño estándar (por defecto)
+    MIN_PAGE_SIZE = 512
+    MAX_PAGE_SIZE = 1024 * 1024
+    
+    DATA = 0
+    OVERFLOW_HEAD = 1
+    OVERFLOW = 2
+    
+    # Cabecera de páginas de overflow: [magic][tipo][next_page (int64)][bytes del fragmento (uint32)]
+    OVERFLOW_MAGIC = b'\xf1'
+    OVERFLOW_HEADER = struct.Struct('<BqI')
+    
+    def __init__(self, page_id: int, data: Any = None, kind: int = DATA, next_page: int = -1):
         self.page_id = page_id
         self.data = data if data is not None else []
+        self.kind = kind
+        self.next_page = next_page
         self.is_dirty = False  # Marca si necesita escribirse a disco
     
-    def get_size(self) -> int:
-        """Retorna el tamaño serializado de la página"""
-        return len(pickle.dumps(self.data))
+    def get_size(self, codec: Optional[RecordCodec] = None) -> int:
+        """Retorna el tamaño serializado de la página (con el codec de la tabla si hay)"""
+        if self.kind != Page.DATA:
+            return len(self.OVERFLOW_MAGIC) + self.OVERFLOW_HEADER.size + len(self.data)
+        return len(encode_rows(self.data, codec))
     
-    def is_full(self) -> bool:
+    def is_full(self, codec: Optional[RecordCodec] = None, page_size: Optional[int] = None) -> bool:
         """Verifica si la página está llena"""
-        return self.get_size() >= self.PAGE_SIZE
+        return self.get_size(codec) >= (page_size or self.PAGE_SIZE)
+    
+    @classmethod
+    def overflow_capacity(cls, page_size: Optional[int] = None) -> int:
+        """Bytes de registro que caben en una página de overflow"""
+        return (page_size or cls.PAGE_SIZE) - len(cls.OVERFLOW_MAGIC) - cls.OVERFLOW_HEADER.size
+    
+    @classmethod
+    def validate_size(cls, page_size: int) -> int:
+        """Valida un tamaño de página (potencia de 2 entre MIN_PAGE_SIZE y MAX_PAGE_SIZE)"""
+        if (isinstance(page_size, bool) or not isinstance(page_size, int)
+                or not cls.MIN_PAGE_SIZE <= page_size <= cls.MAX_PAGE_SIZE
+                or page_size & (page_size - 1)):
+            raise ValueError(
+                f"page_size must be a power of two between {cls.MIN_PAGE_SIZE} and {cls.MAX_PAGE_SIZE}, "
+                f"got {page_size!r}"
+            )
+        return page_size
 
 
 class DiskManager:
     """
     Gestiona la lectura/escritura de páginas en archivos binarios.
     Simula el comportamiento de un sistema de archivos con páginas fijas.
+    
+    Mantiene una caché LRU de descriptores abiertos por tabla: cada página se
+    lee/escribe con os.pread/os.pwrite sobre el descriptor cacheado en vez de
+    abrir y cerrar el archivo en cada llamada. El pread/pwrite corre fuera del
+    lock (misses concurrentes del buffer pool), así que cada uso reserva el
+    descriptor (_use_fd) y uno que sale del LRU en uso se cierra al soltarlo.
+    
+    Opciones por tabla (configure_table):
+    - mmap: las lecturas deserializan directamente desde un memoryview sobre el
+      archivo mapeado (sin copiar bytes), respaldado por el page cache del SO.
+    - page_size: tamaño de página en bytes (por defecto Page.PAGE_SIZE).
+    - compression: compresor de páginas ("zlib", "lzma" o uno registrado en
+      core.compression). Cada página comprimida lleva cabecera propia, así que
+      un archivo puede mezclar páginas comprimidas y sin comprimir.
+    
+    Las métricas de I/O se reportan en páginas y en bytes (bytes_read/bytes_written),
+    para comparar tablas con distinto tamaño de página. Además cada lectura/escritura
+    real se registra por tabla (con su latencia) en core.stats.registry.
+    
+    Free-space map (FSM): por cada página se guardan los bytes libres (uint32)
+    en <tabla>.fsm. Se actualiza en cada escritura y se persiste con
+    save_free_space(); si falta o está desfasado se reconstruye escaneando.
     """
     
-    def __init__(self, data_dir: str = "storage"):
+    FSM_SUFFIX = ".fsm"
+    
+    def __init__(self, data_dir: str = "storage", max_open_files: int = 32):
+        """
+        Args:
+            data_dir: Directorio para archivos de datos
+            max_open_files: Máximo de descriptores abiertos a la vez (LRU)
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
-        # Contadores de I/O real
+        # Caché de descriptores: table_name -> fd (orden LRU)
+        self.max_open_files = max_open_files
+        self._fds: OrderedDict[str, int] = OrderedDict()
+        self._fd_users: Dict[int, int] = {}  # fd -> lecturas/escrituras en curso
+        self._retired_fds: Set[int] = set()  # Fuera del LRU pero en uso: se cierran al soltarlos
+        self._fd_lock = threading.Lock()  # Varios hilos del buffer pool abren/reusan descriptores (y _maps)
+        
+        # Opciones de almacenamiento por tabla y mapeos activos (modo mmap; protegidos por _fd_lock)
+        self._table_options: Dict[str, Dict[str, Any]] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        
+        # Codec binario por tabla (derivado del schema); sin codec se usa pickle
+        self._codecs: Dict[str, RecordCodec] = {}
+        
+        # Free-space map por tabla: bytes libres de cada página (cargado perezosamente)
+        self._fsm: Dict[str, array] = {}
+        
+        # Compresor por tabla y bytes [sin comprimir, almacenados] de los payloads vistos
+        self._compressors: Dict[str, ICompressor] = {}
+        self._compression_bytes: Dict[str, List[int]] = {}
+        
+        # Contadores de I/O real (páginas y bytes)
         self.disk_reads = 0
         self.disk_writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        
+        # Contadores de la caché de descriptores
+        self.fd_hits = 0
+        self.fd_misses = 0
+        self.remaps = 0
     
     def get_table_file(self, table_name: str) -> Path:
         """Retorna la ruta del archivo de una tabla"""
         return self.data_dir / f"{table_name}.dat"
     
-    def read_page(self, table_name: str, page_id: int) -> Optional[Page]:
+    def _get_fd(self, table_name: str, create: bool = False) -> Optional[int]:
         """
-        Lee una página específica del disco.
-        Incrementa contador de disk_reads.
+        Retorna el descriptor abierto de la tabla (desde la caché LRU si existe).
+        Si el archivo no existe y create=False, retorna None. Se llama con
+        _fd_lock tomado; para usarlo fuera del lock, _use_fd.
         """
+        fd = self._fds.get(table_name)
+        if fd is not None:
+            self.fd_hits += 1
+            self._fds.move_to_end(table_name)
+            return fd
+        
         file_path = self.get_table_file(table_name)
+        if not create and not file_path.exists():
+            return None
+        
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        fd = os.open(file_path, flags, 0o644)
+        self.fd_misses += 1
+        self._fds[table_name] = fd
         
-        if not file_path.exists():
+        # Cerrar el descriptor menos recientemente usado si se excede el límite
+        while len(self._fds) > self.max_open_files:
+            _, old_fd = self._fds.popitem(last=False)
+            self._close_fd(old_fd)
+        
+        return fd
+    
+    def _close_fd(self, fd: int) -> None:
+        """Cierra un descriptor que salió del LRU, o lo deja para el último que lo suelte (con _fd_lock)"""
+        if self._fd_users.get(fd):
+            self._retired_fds.add(fd)
+        else:
+            os.close(fd)
+    
+    @contextmanager
+    def _use_fd(self, table_name: str, create: bool = False) -> Iterator[Optional[int]]:
+        """
+        Descriptor de la tabla reservado mientras dura el bloque: ni el LRU ni
+        close_table lo cierran (ni el SO reasigna su número) hasta soltarlo.
+        """
+        with self._fd_lock:
+            fd = self._get_fd(table_name, create)
+            if fd is not None:
+                self._fd_users[fd] = self._fd_users.get(fd, 0) + 1
+        try:
+            yield fd
+        finally:
+            if fd is not None:
+                with self._fd_lock:
+                    users = self._fd_users.pop(fd) - 1
+                    if users:
+                        self._fd_users[fd] = users
+                    elif fd in self._retired_fds:
+                        self._retired_fds.discard(fd)
+                        os.close(fd)
+    
+    def configure_table(self, table_name: str, **options: Any) -> None:
+        """Aplica opciones de almacenamiento a una tabla (p. ej. mmap=True, page_size=8192)"""
+        if "page_size" in options:
+            Page.validate_size(options["page_size"])
+        if "compression" in options:
+            compressor = get_compressor(options["compression"])
+            if compressor is None:
+                self._compressors.pop(table_name, None)
+            else:
+                self._compressors[table_name] = compressor
+        
+        table_options = self._table_options.setdefault(table_name, {})
+        table_options.update(options)
+        if not table_options.get("mmap"):
+            with self._fd_lock:
+                self._unmap(table_name)
+    
+    def set_codec(self, table_name: str, codec: Optional[RecordCodec]) -> None:
+        """Asocia el codec de registros de una tabla (None = pickle)"""
+        if codec is None:
+            self._codecs.pop(table_name, None)
+        else:
+            self._codecs[table_name] = codec
+    
+    def get_codec(self, table_name: str) -> Optional[RecordCodec]:
+        """Retorna el codec de registros de una tabla (o None)"""
+        return self._codecs.get(table_name)
+    
+    def get_compressor(self, table_name: str) -> Optional[ICompressor]:
+        """Retorna el compresor de páginas de una tabla (o None)"""
+        return self._compressors.get(table_name)
+    
+    def encode_payload(self, table_name: str, rows: List[Dict[str, Any]]) -> bytes:
+        """Serializa registros con el codec de la tabla y los comprime si corresponde"""
+        data = encode_rows(rows, self._codecs.get(table_name))
+        payload = compress_payload(data, self._compressors.get(table_name))
+        if payload is not data:
+            self._note_compression(table_name, len(data), len(payload))
+        return payload
+    
+    def decode_payload(self, table_name: str, buf: Any) -> List[Dict[str, Any]]:
+        """Descomprime (si tiene cabecera) y deserializa registros; ignora el padding"""
+        if is_compressed(buf):
+            self._note_compression(table_name, *compressed_sizes(buf))
+            buf = decompress_payload(buf)
+        return decode_rows(buf, self._codecs.get(table_name))
+    
+    def _note_compression(self, table_name: str, raw_size: int, stored_size: int) -> None:
+        totals = self._compression_bytes.setdefault(table_name, [0, 0])
+        totals[0] += raw_size
+        totals[1] += stored_size
+    
+    def compression_ratio(self, table_name: str) -> Optional[float]:
+        """Razón bytes sin comprimir / almacenados de las páginas comprimidas leídas o escritas"""
+        raw_size, stored_size = self._compression_bytes.get(table_name, (0, 0))
+        return raw_size / stored_size if stored_size else None
+    
+    def page_size(self, table_name: str) -> int:
+        """Tamaño de página de la tabla en bytes"""
+        return self._table_options.get(table_name, {}).get("page_size") or Page.PAGE_SIZE
+    
+    def uses_mmap(self, table_name: str) -> bool:
+        """Indica si la tabla lee páginas a través de mmap"""
+        return bool(self._table_options.get(table_name, {}).get("mmap"))
+    
+    def _get_map(self, table_name: str, end: int) -> Optional[mmap.mmap]:
+        """
+        Retorna el mapeo de la tabla cubriendo hasta `end` bytes.
+        Si el archivo creció desde el último mapeo, lo vuelve a mapear.
+        Se llama con _fd_lock tomado.
+        """
+        current = self._maps.get(table_name)
+        if current is not None and len(current) >= end:
+            return current
+        
+        fd = self._get_fd(table_name)
+        if fd is None:
             return None
         
+        size = os.fstat(fd).st_size
+        if size == 0 or (current is not None and size <= len(current)):
+            return current
+        
+        self._unmap(table_name)
+        current = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        self._maps[table_name] = current
+        self.remaps += 1
+        return current
+    
+    def _unmap(self, table_name: str) -> None:
+        """Cierra el mapeo de la tabla (con _fd_lock tomado)"""
+        current = self._maps.pop(table_name, None)
+        if current is not None:
+            try:
+                current.close()
+            except BufferError:
+                # Aún hay memoryviews vivos: el GC liberará el mapeo
+                pass
+    
+    def close_table(self, table_name: str) -> None:
+        """Cierra el descriptor cacheado (y el mapeo) de una tabla; si está en uso, al soltarlo"""
+        with self._fd_lock:
+            self._unmap(table_name)
+            fd = self._fds.pop(table_name, None)
+            if fd is not None:
+                self._close_fd(fd)
+    
+    def close_all(self) -> None:
+        """Cierra todos los descriptores cacheados (los que están en uso, al soltarlos)"""
+        with self._fd_lock:
+            for table_name in list(self._maps):
+                self._unmap(table_name)
+            while self._fds:
+                _, fd = self._fds.popitem()
+                self._close_fd(fd)
+    
+    def __del__(self):
         try:
-            with open(file_path, 'rb') as f:
-                # Buscar la página específica
-                f.seek(page_id * Page.PAGE_SIZE)
-                data_bytes = f.read(Page.PAGE_SIZE)
-                
-                if not data_bytes:
+            self.close_all()
+        except Exception:
+            pass
+    
+    def read_page(self, table_name: str, page_id: int, data_bytes: Optional[bytes] = None) -> Optional[Page]:
+        """
+        Lee una página específica del disco.
+        Incrementa contador de disk_reads.
+        
+        data_bytes: bytes de la página ya leídos por el read-ahead (read_ahead);
+        solo se decodifican, sin repetir el pread.
+        """
+        if data_bytes is None:
+            if self.uses_mmap(table_name):
+                return self._read_page_mmap(table_name, page_id)
+            
+            with self._use_fd(table_name) as fd:
+                if fd is None:
                     return None
-                
-                # Deserializar
-                data = pickle.loads(data_bytes.rstrip(b'\x00'))
-                
-                self.disk_reads += 1
-                return Page(page_id, data)
-                
+                data_bytes = self._pread_pages(table_name, fd, page_id, 1)
+        
+        if not data_bytes:
+            return None
+        try:
+            return self._decode_page(table_name, page_id, data_bytes)
+        except (EOFError, pickle.UnpicklingError):
+            return None
+    
+    def _pread_pages(self, table_name: str, fd: int, first_page: int, count: int) -> bytes:
+        """Un solo pread de `count` páginas consecutivas (menos si el archivo termina antes)"""
+        page_size = self.page_size(table_name)
+        start_time = time.perf_counter()
+        data_bytes = pread(fd, count * page_size, first_page * page_size)
+        if data_bytes:
+            pages = -(-len(data_bytes) // page_size)
+            self.disk_reads += pages
+            self.bytes_read += len(data_bytes)
+            registry.get(table_name).read(len(data_bytes), time.perf_counter() - start_time, pages)
+        return data_bytes
+    
+    def read_ahead(self, table_name: str, num_pages: int) -> Optional[ReadAhead]:
+        """
+        ReadAhead de páginas crudas para un scan; las corridas se leen con un pread
+        grande. Abre su propio descriptor (no usa el cache LRU, que puede cerrar o
+        reasignar el suyo mientras el hilo de fondo lee) y lo cierra con close().
+        None con mmap: ahí el SO ya hace read-ahead.
+        """
+        if self.uses_mmap(table_name):
+            return None
+        try:
+            fd = os.open(self.get_table_file(table_name), os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
+            return None
+        page_size = self.page_size(table_name)
+        
+        def fetch_run(first_page: int, count: int) -> List[memoryview]:
+            view = memoryview(self._pread_pages(table_name, fd, first_page, count))
+            return [view[i * page_size:(i + 1) * page_size] for i in range(count)]
+        
+        return ReadAhead(lambda page_id: self._pread_pages(table_name, fd, page_id, 1), num_pages, fetch_run,
+                         on_close=lambda: os.close(fd))
+    
+    def _read_page_mmap(self, table_name: str, page_id: int) -> Optional[Page]:
+        """Lee una página deserializando desde un memoryview sobre el archivo mapeado"""
+        page_size = self.page_size(table_name)
+        start = page_id * page_size
+        with self._fd_lock:
+            mapped = self._get_map(table_name, start + page_size)
+            if mapped is None or start >= len(mapped):
+                return None
+            # La vista se toma con el lock: un remap posterior ya no puede cerrar este mapeo (BufferError)
+            view = memoryview(mapped)[start:start + page_size]
+        
+        try:
+            # Zero-copy: se decodifica directamente sobre el mapeo
+            with view:
+                page = self._decode_page(table_name, page_id, view)
+                self.bytes_read += len(view)
+                registry.get(table_name).read(len(view))
         except (EOFError, pickle.UnpicklingError):
             return None
+        
+        self.disk_reads += 1
+        return page
+    
+    def _decode_page(self, table_name: str, page_id: int, buf: Any) -> Page:
+        """Deserializa una página: fragmento de overflow o registros (codec/pickle; el padding se ignora)"""
+        if buf[:1] == Page.OVERFLOW_MAGIC:
+            kind, next_page, size = Page.OVERFLOW_HEADER.unpack_from(buf, 1)
+            start = len(Page.OVERFLOW_MAGIC) + Page.OVERFLOW_HEADER.size
+            return Page(page_id, bytes(buf[start:start + size]), kind=kind, next_page=next_page)
+        return Page(page_id, self.decode_payload(table_name, buf))
+    
+    def _encode_page(self, table_name: str, page: Page) -> bytes:
+        """Serializa una página según su tipo (codec binario de la tabla o pickle, comprimido si aplica)"""
+        if page.kind != Page.DATA:
+            header = Page.OVERFLOW_HEADER.pack(page.kind, page.next_page, len(page.data))
+            return Page.OVERFLOW_MAGIC + header + bytes(page.data)
+        return self.encode_payload(table_name, page.data)
     
     def write_page(self, table_name: str, page: Page) -> None:
         """
         Escribe una página al disco.
         Incrementa contador de disk_writes.
+        Lanza PageOverflowError si la página serializada excede el tamaño de página
+        de la tabla (nunca se trunca: los registros grandes van a páginas de overflow).
         """
-        file_path = self.get_table_file(table_name)
+        page_size = self.page_size(table_name)
+        data_bytes = self._encode_page(table_name, page)
         
-        # Serializar datos
-        data_bytes = pickle.dumps(page.data)
+        if len(data_bytes) > page_size:
+            raise PageOverflowError(
+                f"Page {page.page_id} of '{table_name}' needs {len(data_bytes)} bytes "
+                f"(page_size={page_size})"
+            )
+        
+        free = self._free_bytes(page, len(data_bytes), page_size)
         
         # Padding para llenar la página completa
-        if len(data_bytes) < Page.PAGE_SIZE:
-            data_bytes += b'\x00' * (Page.PAGE_SIZE - len(data_bytes))
-        elif len(data_bytes) > Page.PAGE_SIZE:
-            # Si excede, truncar (en un sistema real esto sería un error)
-            data_bytes = data_bytes[:Page.PAGE_SIZE]
+        data_bytes += b'\x00' * (page_size - len(data_bytes))
+        
+        # Cargar el FSM antes de escribir (si hay que reconstruirlo, solo cubre las páginas previas)
+        self.get_free_space(table_name)
         
         # Escribir al archivo
-        mode = 'r+b' if file_path.exists() else 'wb'
-        with open(file_path, mode) as f:
-            f.seek(page.page_id * Page.PAGE_SIZE)
-            f.write(data_bytes)
+        start_time = time.perf_counter()
+        with self._use_fd(table_name, create=True) as fd:
+            pwrite(fd, data_bytes, page.page_id * page_size)
+        registry.get(table_name).write(page_size, time.perf_counter() - start_time)
+        self._set_free_space(table_name, page.page_id, free)
         
         page.is_dirty = False
         self.disk_writes += 1
+        self.bytes_written += page_size
     
-    def read_all_pages(self, table_name: str) -> list[Page]:
-        """Lee todas las páginas de una tabla"""
-        file_path = self.get_table_file(table_name)
+    def write_pages(self, table_name: str, pages: List[Page], max_write_bytes: int = 8 * 1024 * 1024) -> int:
+        """
+        Escritura masiva: serializa páginas consecutivas en un buffer y las escribe
+        con pocos pwrite grandes (uno por cada `max_write_bytes`) en vez de uno por página.
+        No pasa por el buffer pool. Retorna el número de pwrite emitidos.
+        """
+        if not pages:
+            return 0
+        
+        page_size = self.page_size(table_name)
+        self.get_free_space(table_name)
+        start_time = time.perf_counter()
+        buffer = bytearray()
+        start_page = pages[0].page_id
+        writes = 0
+        free_space = []
+        
+        with self._use_fd(table_name, create=True) as fd:
+            for i, page in enumerate(pages):
+                # Un hueco en los page_id corta la corrida: escribir lo acumulado
+                if buffer and page.page_id != start_page + len(buffer) // page_size:
+                    writes += self._flush_run(fd, buffer, start_page, page_size)
+                    start_page = page.page_id
+                
+                data_bytes = self._encode_page(table_name, page)
+                if len(data_bytes) > page_size:
+                    raise PageOverflowError(
+                        f"Page {page.page_id} of '{table_name}' needs {len(data_bytes)} bytes "
+                        f"(page_size={page_size})"
+                    )
+                buffer += data_bytes
+                buffer += b'\x00' * (page_size - len(data_bytes))
+                free_space.append((page.page_id, self._free_bytes(page, len(data_bytes), page_size)))
+                page.is_dirty = False
+                
+                if len(buffer) >= max_write_bytes:
+                    writes += self._flush_run(fd, buffer, start_page, page_size)
+                    start_page = page.page_id + 1
+            
+            writes += self._flush_run(fd, buffer, start_page, page_size)
+        for page_id, free in free_space:
+            self._set_free_space(table_name, page_id, free)
+        
+        self.disk_writes += len(pages)
+        self.bytes_written += len(pages) * page_size
+        # Una muestra de latencia por escritura masiva (incluye serializar)
+        registry.get(table_name).write(len(pages) * page_size, time.perf_counter() - start_time, len(pages))
+        return writes
+    
+    @staticmethod
+    def _flush_run(fd: int, buffer: bytearray, start_page: int, page_size: int) -> int:
+        """Escribe una corrida de páginas consecutivas con pwrite y vacía el buffer"""
+        if not buffer:
+            return 0
+        view = memoryview(buffer)
+        offset = start_page * page_size
+        written = 0
+        # pwrite puede escribir parcialmente: reintentar con el resto
+        while written < len(view):
+            written += pwrite(fd, view[written:], offset + written)
+        view.release()
+        buffer.clear()
+        return 1
+    
+    @staticmethod
+    def _free_bytes(page: Page, used: int, page_size: int) -> int:
+        """Bytes reutilizables de una página (las de overflow no admiten registros)"""
+        return page_size - used if page.kind == Page.DATA else 0
+    
+    def get_fsm_file(self, table_name: str) -> Path:
+        """Retorna la ruta del free-space map de una tabla"""
+        return self.data_dir / f"{table_name}{self.FSM_SUFFIX}"
+    
+    def get_free_space(self, table_name: str) -> array:
+        """
+        Retorna el free-space map de la tabla (bytes libres por página).
+        Se carga desde <tabla>.fsm o se reconstruye si falta o no cubre todas las páginas.
+        """
+        fsm = self._fsm.get(table_name)
+        if fsm is not None:
+            return fsm
         
-        if not file_path.exists():
-            return []
+        num_pages = self.get_num_pages(table_name)
+        fsm = array('I')
+        fsm_file = self.get_fsm_file(table_name)
+        if fsm_file.exists():
+            fsm.frombytes(fsm_file.read_bytes())
+        if len(fsm) != num_pages:
+            fsm = self._scan_free_space(table_name, num_pages)
         
+        self._fsm[table_name] = fsm
+        return fsm
+    
+    def _scan_free_space(self, table_name: str, num_pages: int) -> array:
+        """
+        Reconstruye el FSM leyendo cada página: el espacio usado es el largo del
+        payload (ver _payload_size), no el de los bytes antes del padding, porque
+        los payloads del codec y los comprimidos pueden terminar en ceros.
+        """
+        page_size = self.page_size(table_name)
+        fsm = array('I')
+        with self._use_fd(table_name) as fd:
+            for page_id in range(num_pages):
+                raw = pread(fd, page_size, page_id * page_size)
+                if raw[:1] == Page.OVERFLOW_MAGIC:
+                    fsm.append(0)
+                else:
+                    fsm.append(max(0, page_size - self._payload_size(table_name, raw)))
+        return fsm
+    
+    def _payload_size(self, table_name: str, raw: bytes) -> int:
+        """
+        Bytes que ocupa el payload de una página de datos: la cabecera de compresión
+        trae su largo; un contenedor del codec o un pickle se decodifican y se vuelven
+        a serializar (el resultado es el que escribiría write_page). Una página que
+        no se puede decodificar se considera llena.
+        """
+        if not raw.rstrip(b'\x00'):
+            return 0
+        if is_compressed(raw):
+            return compressed_sizes(raw)[1]
+        codec = self._codecs.get(table_name)
+        try:
+            return len(encode_rows(decode_rows(raw, codec), codec))
+        except (EOFError, pickle.UnpicklingError, CodecError, struct.error):
+            return len(raw)
+    
+    def _set_free_space(self, table_name: str, page_id: int, free: int) -> None:
+        fsm = self.get_free_space(table_name)
+        while len(fsm) <= page_id:
+            fsm.append(0)
+        fsm[page_id] = free
+    
+    def find_free_page(self, table_name: str, needed: int) -> Optional[int]:
+        """Primera página con al menos `needed` bytes libres (first-fit), o None"""
+        for page_id, free in enumerate(self.get_free_space(table_name)):
+            if free >= needed:
+                return page_id
+        return None
+    
+    def save_free_space(self, table_name: str) -> None:
+        """Persiste el FSM de la tabla en <tabla>.fsm (escritura atómica)"""
+        fsm = self._fsm.get(table_name)
+        if fsm is None:
+            return
+        fsm_file = self.get_fsm_file(table_name)
+        tmp_file = fsm_file.with_name(fsm_file.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            fsm.tofile(f)
+        os.replace(tmp_file, fsm_file)
+    
+    def _drop_free_space(self, table_name: str) -> None:
+        self._fsm.pop(table_name, None)
+        fsm_file = self.get_fsm_file(table_name)
+        if fsm_file.exists():
+            fsm_file.unlink()
+    
+    def read_all_pages(self, table_name: str) -> list[Page]:
+        """Lee todas las páginas de una tabla"""
         pages = []
         page_id = 0
         
-        with open(file_path, 'rb') as f:
-            while True:
-                data_bytes = f.read(Page.PAGE_SIZE)
-                if not data_bytes:
-                    break
-                
-                try:
-                    data = pickle.loads(data_bytes.rstrip(b'\x00'))
-                    pages.append(Page(page_id, data))
-                    page_id += 1
-                    self.disk_reads += 1
-                except (EOFError, pickle.UnpicklingError):
-                    break
+        while True:
+            page = self.read_page(table_name, page_id)
+            if page is None:
+                break
+            pages.append(page)
+            page_id += 1
         
         return pages
     
@@ -130,14 +661,22 @@ class DiskManager:
         # Determinar el ID de la nueva página
         if file_path.exists():
             file_size = file_path.stat().st_size
-            page_id = file_size // Page.PAGE_SIZE
+            page_id = file_size // self.page_size(table_name)
         else:
             page_id = 0
         
         return Page(page_id)
     
+    def clear_table(self, table_name: str) -> None:
+        """Vacía el archivo de una tabla y cierra su descriptor cacheado"""
+        self.close_table(table_name)
+        self._drop_free_space(table_name)
+        self.get_table_file(table_name).write_bytes(b'')
+    
     def delete_table(self, table_name: str) -> None:
-        """Elimina el archivo de una tabla"""
+        """Elimina el archivo de una tabla (cerrando antes su descriptor)"""
+        self.close_table(table_name)
+        self._drop_free_space(table_name)
         file_path = self.get_table_file(table_name)
         if file_path.exists():
             file_path.unlink()
@@ -150,17 +689,36 @@ class DiskManager:
     def get_num_pages(self, table_name: str) -> int:
         """Retorna el número de páginas de una tabla"""
         size = self.get_table_size(table_name)
-        return size // Page.PAGE_SIZE if size > 0 else 0
+        return size // self.page_size(table_name) if size > 0 else 0
     
     def reset_counters(self) -> None:
         """Resetea los contadores de I/O"""
         self.disk_reads = 0
         self.disk_writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.fd_hits = 0
+        self.fd_misses = 0
+        self.remaps = 0
     
     def get_io_stats(self) -> Dict[str, int]:
         """Retorna estadísticas de I/O"""
         return {
             "disk_reads": self.disk_reads,
             "disk_writes": self.disk_writes,
-            "total_ios": self.disk_reads + self.disk_writes
+            "total_ios": self.disk_reads + self.disk_writes,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "total_bytes": self.bytes_read + self.bytes_written,
+            "fd_hits": self.fd_hits,
+            "fd_misses": self.fd_misses,
+            "open_files": len(self._fds),
+            "mapped_files": len(self._maps),
+            "remaps": self.remaps,
+            "compression_ratio": self._overall_compression_ratio()
         }
+    
+    def _overall_compression_ratio(self) -> Optional[float]:
+        raw_size = sum(totals[0] for totals in self._compression_bytes.values())
+        stored_size = sum(totals[1] for totals in self._compression_bytes.values())
+        return round(raw_size / stored_size, 2) if stored_size else None
@@ -2,80 +2,234 @@
 Disk Storage - Almacenamiento en disco con buffer pool
 Versión mejorada de Storage que usa memoria secundaria real
 """
-from typing import Any, Dict, List, Optional
-import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from contextlib import contextmanager
+import pickle
+import threading
 from pathlib import Path
 from .disk_manager import DiskManager, Page
-from .buffer_pool import BufferPool
+from .buffer_pool import BufferPool, BufferRing
 from .io_metrics import IOMetrics
+from .record_codec import RecordCodec, encode_rows
+from .wal import WriteAheadLog
+from .bgwriter import BackgroundWriter
+from .decoded_cache import DecodedCache, estimate_size
+from .catalog_store import CatalogStore
 
 
 class DiskStorage:
     """
     Almacenamiento con persistencia en disco.
     Usa buffer pool para optimizar accesos y simular comportamiento real de DBMS.
+    
+    Las páginas se llenan por tamaño serializado hasta el page_size de la tabla
+    (Page.PAGE_SIZE por defecto); un registro que no cabe en una página se
+    reparte en una cadena de páginas de overflow.
+    
+    DELETE compacta la página afectada (los índices guardan registros completos,
+    no RIDs, así que no hace falta mantener slots estables) y el free-space map
+    del DiskManager registra el espacio liberado; los INSERT lo reutilizan antes
+    de agregar páginas nuevas.
+    
+    El catálogo se persiste con CatalogStore (snapshot binario + log de cambios):
+    crear tablas o cambiar schema/opciones agrega un registro al log, y los
+    contadores de INSERT/DELETE (num_records, num_pages) se escriben recién en
+    el checkpoint. Sin WAL, las tablas que quedaron sucias tras un crash se
+    recuentan al abrir.
+    
+    Con use_wal=True, INSERT/DELETE registran en el write-ahead log las imágenes
+    de las páginas modificadas y los contadores de la tabla; el catálogo, el FSM
+    y los índices se persisten recién en el checkpoint. Al abrir, el log se
+    reaplica (las imágenes son idempotentes) y las tablas afectadas quedan en
+    recovered_tables para que se reconstruyan sus índices.
+    
+    Con WAL, las páginas de INSERT/DELETE quedan dirty en el buffer pool (el log
+    ya las hace durables); las escribe el BackgroundWriter (start_background_writer),
+    la evicción o el checkpoint. `lock` serializa las mutaciones con el hilo de fondo.
     """
     
-    def __init__(self, records_per_page: int = 10, pool_size: int = 50, data_dir: str = "storage"):
+    # Tamaño del log que dispara un checkpoint (maybe_checkpoint)
+    CHECKPOINT_BYTES = 16 * 1024 * 1024
+    
+    # Full scans de tablas con más de pool_size / SCAN_RING_THRESHOLD páginas usan
+    # un anillo privado de SCAN_RING_PAGES frames (ver BufferRing)
+    SCAN_RING_THRESHOLD = 4
+    SCAN_RING_PAGES = 16
+    
+    # Presupuesto del cache de registros de overflow ya reensamblados y decodificados
+    DECODED_CACHE_BYTES = 16 * 1024 * 1024
+    
+    def __init__(self, records_per_page: Optional[int] = None, pool_size: int = 50, data_dir: str = "storage",
+                 use_wal: bool = False, checkpoint_bytes: int = CHECKPOINT_BYTES, buffer_policy: str = "lru",
+                 decoded_cache_bytes: int = DECODED_CACHE_BYTES, pool_bytes: Optional[int] = None,
+                 adaptive_pool: bool = False, catalog_dir: Optional[str] = None):
         """
         Args:
-            records_per_page: Número de registros por página (reducido a 10 para datos grandes)
+            records_per_page: Máximo opcional de registros por página (None = solo límite en bytes)
             pool_size: Tamaño del buffer pool en páginas
             data_dir: Directorio para archivos de datos
+            use_wal: Registrar INSERT/DELETE en storage/wal.log (metadata diferida al checkpoint)
+            checkpoint_bytes: Tamaño del log a partir del cual maybe_checkpoint() hace checkpoint
+            buffer_policy: Política de reemplazo del buffer pool ('lru', 'clock', '2q', 'lru-k', 'arc')
+            decoded_cache_bytes: Bytes para cachear registros de overflow ya decodificados
+            pool_bytes: Presupuesto del buffer pool en bytes (reemplaza a pool_size)
+            adaptive_pool: Cuotas por tabla ajustadas según hits fantasma (ver BufferPool)
+            catalog_dir: Directorio del catálogo (None = data_dir); un proceso que carga
+                tablas en paralelo usa uno propio y el padre las registra con attach_tables()
         """
         self.rpp = records_per_page
         self.disk_manager = DiskManager(data_dir)
-        self.buffer_pool = BufferPool(pool_size, self.disk_manager)
+        self.buffer_pool = BufferPool(pool_size, self.disk_manager, buffer_policy,
+                                      max_bytes=pool_bytes, adaptive=adaptive_pool)
+        self.decoded_cache = DecodedCache(decoded_cache_bytes)
         self.metrics = IOMetrics()
         self.data_dir = Path(data_dir)
-        self.metadata_file = self.data_dir / "catalog.json"
+        self.catalog = CatalogStore(catalog_dir or self.data_dir)
         
         # Metadata: cuántos registros tiene cada tabla, schema, index_type, etc.
         self._table_metadata: Dict[str, Dict[str, Any]] = {}
         
+        # Localizador clave -> páginas del heap (se construye con el primer DELETE)
+        self._key_pages: Dict[str, Dict[Any, Set[int]]] = {}
+        
+        # Métricas acumuladas del read-ahead de los scans
+        self.read_ahead_stats: Dict[str, int] = {"prefetched": 0, "prefetch_hits": 0, "prefetch_wasted": 0}
+        
+        # Write-ahead log: persistencias diferidas hasta el checkpoint (p. ej. guardar índices)
+        self.wal: Optional[WriteAheadLog] = None
+        self.checkpoint_bytes = checkpoint_bytes
+        self._checkpoint_hooks: Dict[str, Callable[[], None]] = {}
+        self.recovered_tables: Set[str] = set()
+        
+        # Mutaciones y checkpoints se serializan con el background writer
+        self.lock = threading.RLock()
+        self._mutation = threading.local()  # Profundidad de mutation() y último LSN del hilo
+        self._bulk_starts: Dict[str, int] = {}  # Tablas en bulk_load() -> primera página de la carga
+        self.bgwriter: Optional[BackgroundWriter] = None
+        self._closed = False
+        
         # Cargar metadata desde disco si existe
-        self._load_catalog()
+        stale = self._load_catalog()
+        
+        if use_wal:
+            self.wal = WriteAheadLog(self.data_dir / "wal.log")
+            # WAL antes que datos: una página dirty no llega a disco antes que su registro
+            self.buffer_pool.before_write = self._wal_before_data
+            self._recover()
+        else:
+            # Con WAL los contadores los restaura el log
+            for name in stale:
+                self._recount(name)
     
     def create_table(self, name: str) -> None:
         """Crea una tabla (archivo vacío)"""
-        if name not in self._table_metadata:
-            self._table_metadata[name] = {
-                "num_records": 0,
-                "num_pages": 0,
-                "schema": None,  # Se setea en load() o desde Catalog
-                "index_type": "sequential"  # Default
-            }
-            # Crear archivo vacío
-            self.disk_manager.get_table_file(name).touch()
-            self._save_catalog()
+        with self.lock:
+            if name not in self._table_metadata:
+                self._table_metadata[name] = {
+                    "num_records": 0,
+                    "num_pages": 0,
+                    "schema": None,  # Se setea en load() o desde Catalog
+                    "index_type": "sequential"  # Default
+                }
+                # Crear archivo vacío
+                self.disk_manager.get_table_file(name).touch()
+                self._catalog_put(name)
     
-    def _load_catalog(self) -> None:
-        """Carga metadata desde catalog.json"""
-        if self.metadata_file.exists():
-            try:
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    self._table_metadata = json.load(f)
-            except Exception as e:
-                print(f"Warning: No se pudo cargar catalog.json: {e}")
-                self._table_metadata = {}
-    
-    def _save_catalog(self) -> None:
-        """Guarda metadata en catalog.json"""
-        self.data_dir.mkdir(parents=True, exist_ok=True)
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(self._table_metadata, f, indent=2, ensure_ascii=False)
+    def _load_catalog(self) -> Set[str]:
+        """Carga metadata del catálogo; retorna las tablas con contadores sin persistir"""
+        stale: Set[str] = set()
+        try:
+            self._table_metadata, stale = self.catalog.load()
+        except Exception as e:
+            print(f"Warning: No se pudo cargar el catálogo: {e}")
+            self._table_metadata = {}
+        
+        for name, meta in self._table_metadata.items():
+            self._apply_table_meta(name, meta)
+        return stale
+    
+    def _apply_table_meta(self, name: str, meta: Dict[str, Any]) -> None:
+        """Aplica opciones de almacenamiento persistidas (mmap, etc.) y el codec del schema"""
+        if meta.get("options"):
+            self.disk_manager.configure_table(name, **meta["options"])
+        if meta.get("schema"):
+            self.disk_manager.set_codec(name, RecordCodec.from_schema_dict(meta["schema"]))
+    
+    def attach_tables(self, tables: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Registra tablas cuyos archivos escribió otro proceso (p. ej. una carga en
+        paralelo con su propio catalog_dir) y persiste el catálogo una sola vez.
+        """
+        with self.lock:
+            for name, meta in tables.items():
+                # Lo que haya en memoria de una versión anterior de la tabla ya no vale
+                self.buffer_pool.clear_table(name)
+                self._key_pages.pop(name, None)
+                self.decoded_cache.invalidate(name)
+                self.disk_manager.close_table(name)
+                self._table_metadata[name] = meta
+                self._apply_table_meta(name, meta)
+            self.catalog.snapshot(self._table_metadata)
+    
+    def _catalog_put(self, name: str) -> None:
+        """Persiste ya la metadata de una tabla (cambio estructural)"""
+        with self.lock:
+            self.catalog.put(name, self._table_metadata[name])
+    
+    def _counters_changed(self, name: str) -> None:
+        """Contadores modificados: se persisten en el checkpoint (con WAL ya están en el log)"""
+        self.catalog.mark_dirty(name, log=self.wal is None)
+    
+    def _recount(self, name: str) -> None:
+        """Recalcula num_pages/num_records desde el archivo (cierre sin checkpoint)"""
+        meta = self._table_metadata[name]
+        meta["num_pages"] = self.disk_manager.get_num_pages(name)
+        meta["num_records"] = sum(len(rows) for _, rows in self._scan_pages(name))
+        self._catalog_put(name)
     
     def set_table_metadata(self, name: str, schema: Optional[Dict] = None, index_type: Optional[str] = None) -> None:
         """Actualiza metadata de una tabla"""
-        if name not in self._table_metadata:
-            self.create_table(name)
-        
-        if schema is not None:
-            self._table_metadata[name]["schema"] = schema
-        if index_type is not None:
-            self._table_metadata[name]["index_type"] = index_type
+        with self.lock:
+            if name not in self._table_metadata:
+                self.create_table(name)
+            
+            if schema is not None:
+                self._table_metadata[name]["schema"] = schema
+                # Las páginas de la tabla se codifican en binario según el schema
+                self.disk_manager.set_codec(name, RecordCodec.from_schema_dict(schema))
+            if index_type is not None:
+                self._table_metadata[name]["index_type"] = index_type
+            
+            self._catalog_put(name)
+    
+    def set_table_options(self, name: str, **options: Any) -> None:
+        """
+        Actualiza opciones de almacenamiento de una tabla y las persiste en el catálogo.
         
-        self._save_catalog()
+        Opciones soportadas:
+            mmap: Leer páginas (y bloques de índice) vía mmap en vez de pread
+            page_size: Tamaño de página en bytes (solo con la tabla vacía)
+            compression: "zlib", "lzma" o None (páginas y bloques de índice nuevos)
+        """
+        with self.lock:
+            if name not in self._table_metadata:
+                self.create_table(name)
+            
+            page_size = options.get("page_size")
+            if (page_size is not None and page_size != self.disk_manager.page_size(name)
+                    and self._table_metadata[name]["num_pages"] > 0):
+                raise ValueError(f"Cannot change page_size of non-empty table '{name}'")
+            
+            # Validar en el DiskManager antes de persistir (p. ej. page_size inválido)
+            table_options = {**self._table_metadata[name].get("options", {}), **options}
+            self.disk_manager.configure_table(name, **table_options)
+            self._table_metadata[name]["options"] = table_options
+            self._catalog_put(name)
+    
+    def get_table_options(self, name: str) -> Dict[str, Any]:
+        """Retorna las opciones de almacenamiento de una tabla"""
+        meta = self._table_metadata.get(name) or {}
+        return dict(meta.get("options") or {})
     
     def get_table_metadata(self, name: str) -> Optional[Dict[str, Any]]:
         """Obtiene metadata de una tabla"""
@@ -89,35 +243,372 @@ class DiskStorage:
         """
         Carga registros en páginas y escribe a disco.
         Actualiza métricas de I/O.
-        """
-        self.create_table(name)
         
-        if not rows:
-            return
-        
-        # Dividir registros en páginas
-        pages_data = self._split_into_pages(rows)
-        
-        # Obtener el offset de páginas existentes
-        current_num_pages = self._table_metadata[name]["num_pages"]
-        
-        # Escribir cada página
-        for i, page_data in enumerate(pages_data):
-            page_id = current_num_pages + i
-            page = Page(page_id, page_data)
+        Un INSERT de una fila reutiliza primero el espacio libre registrado en el
+        free-space map (p. ej. liberado por DELETE). Si no hay, los registros se
+        agregan a la última página de datos de la tabla (tail page) mientras tenga
+        espacio; solo se asignan páginas nuevas cuando se llena.
+        """
+        with self.mutation():
+            self.create_table(name)
+            
+            if not rows:
+                return
             
-            # Escribir a través del buffer pool
-            self.buffer_pool.put_page(name, page, write_through=True)
+            meta = self._table_metadata[name]
+            num_pages = meta["num_pages"]
+            pages = self._pack_into_free_page(name, rows[0]) if len(rows) == 1 else None
+            if pages is None:
+                # Reabrir la tail page (si es de datos) y re-empaquetarla junto a las filas nuevas
+                first_page_id = num_pages
+                tail = self.buffer_pool.get_page(name, num_pages - 1) if num_pages else None
+                if tail is not None and tail.kind == Page.DATA:
+                    first_page_id = tail.page_id
+                    pages = self._pack_pages(name, tail.data + rows, first_page_id)
+                else:
+                    pages = self._pack_pages(name, rows, first_page_id)
+                if (self.wal is not None and len(pages) > 1 and len(rows) > 1
+                        and first_page_id < self._bulk_starts.get(name, num_pages)):
+                    # La carga masiva no pasa por el log: no reescribe la tail page (tiene
+                    # filas ya confirmadas) y empieza en una página nueva
+                    first_page_id = num_pages
+                    pages = self._pack_pages(name, rows, first_page_id)
+                num_pages = first_page_id + len(pages)
+            
+            if len(pages) == 1 or (self.wal is not None and len(rows) == 1):
+                # Append pequeño (INSERT): la tail page queda caliente en el pool. Sin WAL se
+                # escribe ya (write-through); con WAL el log la hace durable y queda dirty
+                self._log_pages(name, pages, meta["num_records"] + len(rows), num_pages)
+                for page in pages:
+                    self.buffer_pool.put_page(name, page, write_through=self.wal is None)
+            else:
+                # Carga masiva: pocas escrituras secuenciales grandes, sin pasar por el
+                # buffer pool (no se llena de páginas que quizás nunca se vuelvan a leer).
+                # No se registra en el WAL: se hace checkpoint antes y se persiste al final
+                # (dentro de bulk_load, una vez por carga y no por llamada).
+                if self.wal is not None and name not in self._bulk_starts:
+                    self.checkpoint()
+                self.buffer_pool.discard_pages(name, (page.page_id for page in pages))
+                self.disk_manager.write_pages(name, pages)
+            
+            meta["num_pages"] = num_pages
+            self._note_key_pages(name, pages)
+            self._forget_decoded(name, pages)
+            
+            # Actualizar metadata (una sola vez por carga)
+            meta["num_records"] += len(rows)
+            
+            # Free-space map actualizado (con WAL, en el checkpoint). Los contadores del
+            # catálogo se persisten en el checkpoint, salvo una carga masiva con WAL (no
+            # queda en el log)
+            if self.wal is not None and len(rows) > 1:
+                self._catalog_put(name)
+            else:
+                self._counters_changed(name)
+            if self.wal is None or len(rows) > 1:
+                self.disk_manager.save_free_space(name)
+            
+            # Actualizar métricas legacy (para compatibilidad)
+            self.metrics.write(len(pages))
+    
+    @contextmanager
+    def bulk_load(self, name: str) -> Iterator[None]:
+        """
+        Carga masiva en varias llamadas a load() (p. ej. LOAD en streaming): con WAL
+        hace checkpoint una vez antes y otra al final, en vez de uno por llamada.
+        Las páginas que escribe la carga no pasan por el log; entre llamadas se
+        pueden re-empaquetar, pero nunca la tail page que la tabla tenía antes.
+        """
+        with self.mutation():
+            self.create_table(name)
+            if self.wal is not None:
+                self.checkpoint()
+            self._bulk_starts[name] = self._table_metadata[name]["num_pages"]
+            try:
+                yield
+            finally:
+                del self._bulk_starts[name]
+                if self.wal is not None:
+                    self.checkpoint()
+    
+    def _pack_into_free_page(self, name: str, row: Dict[str, Any]) -> Optional[List[Page]]:
+        """Re-empaqueta la primera página con espacio según el FSM junto al registro (None si no cabe)"""
+        codec = self.disk_manager.get_codec(name)
+        # Margen: el contenedor del codec puede crecer 1 byte por columna (bitmaps de nulos)
+        needed = self._row_size(codec, row) + (len(codec.columns) if codec else 0)
+        page_id = self.disk_manager.find_free_page(name, needed)
+        if page_id is None or page_id >= self._table_metadata[name]["num_pages"]:
+            return None
         
-        # Actualizar metadata
-        self._table_metadata[name]["num_records"] += len(rows)
-        self._table_metadata[name]["num_pages"] += len(pages_data)
+        page = self.buffer_pool.get_page(name, page_id)
+        if page is None or page.kind != Page.DATA:
+            return None
+        pages = self._pack_pages(name, page.data + [row], page_id)
+        return pages if len(pages) == 1 else None
+    
+    def delete_records(self, name: str, column: str, value: Any) -> int:
+        """
+        Elimina del heap los registros con column == value.
         
-        # Guardar catálogo actualizado
-        self._save_catalog()
+        Las páginas afectadas se compactan y se reescriben; el espacio liberado
+        queda en el free-space map para futuros INSERT. Si `column` es la clave
+        del schema solo se leen las páginas que la contienen (localizador en RAM).
+        Retorna el número de registros eliminados.
+        """
+        with self.mutation():
+            if name not in self._table_metadata:
+                return 0
+            
+            key = self._table_key(name)
+            if key is not None and column == key:
+                page_ids = sorted(self._get_key_pages(name).pop(value, ()))
+            else:
+                page_ids = range(self._table_metadata[name]["num_pages"])
+            
+            deleted = 0
+            changed: List[Page] = []
+            for page_id in page_ids:
+                page = self.buffer_pool.get_page(name, page_id)
+                if page is None:
+                    continue
+                if page.kind == Page.DATA:
+                    kept = [row for row in page.data if row.get(column) != value]
+                    if len(kept) < len(page.data):
+                        deleted += len(page.data) - len(kept)
+                        changed.append(Page(page_id, kept))
+                elif page.kind == Page.OVERFLOW_HEAD:
+                    chain = set()
+                    rows = self._read_overflow_chain(name, page, chain)
+                    if any(row.get(column) == value for row in rows):
+                        # La cadena completa vuelve a ser espacio libre (páginas de datos vacías)
+                        deleted += len(rows)
+                        changed.extend(Page(chain_page_id, []) for chain_page_id in [page_id, *sorted(chain)])
+            
+            if deleted:
+                meta = self._table_metadata[name]
+                self._log_pages(name, changed, meta["num_records"] - deleted, meta["num_pages"])
+                for page in changed:
+                    self.buffer_pool.put_page(name, page, write_through=self.wal is None)
+                self._forget_decoded(name, changed)
+                meta["num_records"] -= deleted
+                self._counters_changed(name)
+                if self.wal is None:
+                    self.disk_manager.save_free_space(name)
+            return deleted
+    
+    @contextmanager
+    def mutation(self) -> Iterator[None]:
+        """
+        Lock de mutaciones (self.lock) que espera el fsync del WAL recién después
+        de soltarlo: los registros se agregan al log con el lock tomado y el commit
+        se hace afuera, así los INSERT concurrentes comparten fsync (group commit).
+        Es reentrante; el commit lo hace la mutación más externa del hilo, que
+        retorna con sus registros ya durables.
+        """
+        state = self._mutation
+        depth = getattr(state, "depth", 0)
+        with self.lock:
+            state.depth = depth + 1
+            try:
+                yield
+            finally:
+                state.depth = depth
+        if depth == 0:
+            lsn, state.lsn = getattr(state, "lsn", 0), 0
+            if lsn and self.wal is not None:
+                self.wal.commit(lsn)
+    
+    def _log_pages(self, name: str, pages: List[Page], num_records: int, num_pages: int) -> None:
+        """
+        Registra en el WAL las imágenes de páginas que se van a escribir y los
+        contadores resultantes de la tabla. Dentro de mutation() el fsync se espera
+        al salir (sin el lock); fuera, ya. Sin WAL no hace nada.
+        """
+        if self.wal is None:
+            return
+        images = [(page.page_id, page.kind, page.next_page, page.data) for page in pages]
+        payload = {"pages": images, "num_records": num_records, "num_pages": num_pages}
+        if getattr(self._mutation, "depth", 0):
+            self._mutation.lsn = self.wal.append("pages", name, payload)
+        else:
+            self.wal.log("pages", name, payload)
+    
+    def _wal_before_data(self) -> None:
+        """Hook del buffer pool antes de escribir una página dirty: fuerza el log escrito hasta ahora"""
+        self.wal.wait_durable(self.wal.last_lsn)
+    
+    def _recover(self) -> None:
+        """Reaplica el WAL sobre los archivos de datos y hace checkpoint"""
+        for _, op, name, payload in self.wal.records():
+            if op != "pages" or name not in self._table_metadata:
+                continue  # Tabla eliminada después del registro
+            for page_id, kind, next_page, data in payload["pages"]:
+                self.disk_manager.write_page(name, Page(page_id, data, kind=kind, next_page=next_page))
+            self._table_metadata[name]["num_records"] = payload["num_records"]
+            self._table_metadata[name]["num_pages"] = payload["num_pages"]
+            self.catalog.mark_dirty(name, log=False)
+            self.recovered_tables.add(name)
+        if self.recovered_tables:
+            self.checkpoint()
+    
+    def set_checkpoint_hook(self, name: str, hook: Optional[Callable[[], None]]) -> None:
+        """Registra lo que una tabla persiste en cada checkpoint (p. ej. sus índices)"""
+        if hook is None:
+            self._checkpoint_hooks.pop(name, None)
+        else:
+            self._checkpoint_hooks[name] = hook
+    
+    def checkpoint(self) -> None:
+        """
+        Persiste todo lo que el WAL dejó diferido (páginas dirty, catálogo, FSM e
+        índices vía hooks) y vacía el log.
+        """
+        with self.lock:
+            self.buffer_pool.flush_all()
+            self._persist_deferred()
+            if self.wal is not None:
+                self.wal.checkpoint()
+    
+    def fuzzy_checkpoint(self, batch_pages: int = 32) -> int:
+        """
+        Checkpoint sin frenar las mutaciones mientras se escriben las páginas.
         
-        # Actualizar métricas legacy (para compatibilidad)
-        self.metrics.write(len(pages_data))
+        Toma el LSN actual (redo point) y las páginas dirty en ese momento; las
+        escribe en tandas de batch_pages soltando el lock entre tandas (lo que se
+        modifique después ya está en registros del WAL posteriores al redo point).
+        Al final persiste catálogo, FSM e índices y trunca el log solo hasta el
+        redo point. Retorna el LSN del checkpoint (0 sin WAL).
+        """
+        with self.lock:
+            redo_lsn = self.wal.last_lsn if self.wal is not None else 0
+            dirty = self.buffer_pool.dirty_pages()
+        for i in range(0, len(dirty), batch_pages):
+            with self.lock:
+                for table_name, page_id in dirty[i:i + batch_pages]:
+                    self.buffer_pool.flush_page(table_name, page_id)
+        with self.lock:
+            self._persist_deferred()
+            if self.wal is not None:
+                self.wal.checkpoint(upto_lsn=redo_lsn)
+        return redo_lsn
+    
+    def _persist_deferred(self) -> None:
+        """Índices (hooks), contadores del catálogo y FSM: lo que se persiste recién en el checkpoint"""
+        for hook in list(self._checkpoint_hooks.values()):
+            hook()
+        self.catalog.flush(self._table_metadata)
+        for name in self._table_metadata:
+            self.disk_manager.save_free_space(name)
+    
+    def maybe_checkpoint(self) -> bool:
+        """Hace checkpoint si el log superó checkpoint_bytes (llamar con índices ya actualizados)"""
+        if self.wal is not None and self.wal.size_bytes() >= self.checkpoint_bytes:
+            self.checkpoint()
+            return True
+        return False
+    
+    def flush_dirty(self, max_pages: Optional[int] = None) -> int:
+        """Escribe hasta max_pages páginas dirty (ronda del background writer); retorna cuántas"""
+        with self.lock:
+            return self.buffer_pool.flush_dirty(max_pages)
+    
+    def start_background_writer(self, interval: float = 0.2, max_pages: int = 32,
+                                checkpoint_interval: Optional[float] = 30.0) -> BackgroundWriter:
+        """Arranca (una sola vez) el hilo que escribe páginas dirty y hace checkpoints fuzzy"""
+        if self.bgwriter is None:
+            self.bgwriter = BackgroundWriter(self, interval, max_pages, checkpoint_interval)
+        self.bgwriter.start()
+        return self.bgwriter
+    
+    def close(self) -> None:
+        """Detiene el background writer, checkpoint final y cierre del log y de los archivos (idempotente)"""
+        if self._closed:
+            return
+        if self.bgwriter is not None:
+            self.bgwriter.stop(flush=False)  # El checkpoint escribe todo lo dirty
+        self.checkpoint()
+        self.catalog.snapshot(self._table_metadata)
+        if self.wal is not None:
+            self.wal.close()
+        self.disk_manager.close_all()
+        self._closed = True
+    
+    def _table_key(self, name: str) -> Optional[str]:
+        schema = self._table_metadata.get(name, {}).get("schema")
+        return schema.get("key") if schema else None
+    
+    def _get_key_pages(self, name: str) -> Dict[Any, Set[int]]:
+        """Localizador clave -> páginas; se construye con un scan la primera vez"""
+        locator = self._key_pages.get(name)
+        if locator is None:
+            key = self._table_key(name)
+            locator = {}
+            for page_id, rows in self._scan_pages(name):
+                for row in rows:
+                    locator.setdefault(row.get(key), set()).add(page_id)
+            self._key_pages[name] = locator
+        return locator
+    
+    def _note_key_pages(self, name: str, pages: List[Page]) -> None:
+        """Registra en el localizador (si ya existe) dónde quedaron los registros escritos"""
+        locator = self._key_pages.get(name)
+        if locator is None:
+            return
+        key = self._table_key(name)
+        for page in pages:
+            if page.kind == Page.OVERFLOW_HEAD:
+                # El registro está fragmentado: reconstruir el localizador cuando se necesite
+                self._key_pages.pop(name, None)
+                return
+            if page.kind == Page.DATA:
+                for row in page.data:
+                    locator.setdefault(row.get(key), set()).add(page.page_id)
+    
+    def _forget_decoded(self, name: str, pages: List[Page]) -> None:
+        """Descarta del decoded cache las cadenas de overflow que empezaban en páginas reescritas"""
+        for page in pages:
+            self.decoded_cache.discard(name, page.page_id)
+    
+    def _scan_ring(self, num_pages: int) -> Optional[BufferRing]:
+        """Anillo privado para recorrer una tabla grande (> 1/4 del pool); None = usar el pool"""
+        if num_pages <= self.buffer_pool.pool_size // self.SCAN_RING_THRESHOLD:
+            return None
+        return BufferRing(min(self.SCAN_RING_PAGES, self.buffer_pool.pool_size))
+    
+    def _scan_pages(self, name: str) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Recorre el heap retornando (page_id, registros); las cadenas de overflow se reensamblan.
+        Las tablas grandes se leen a través de un BufferRing para no vaciar el pool compartido.
+        """
+        chained = set()  # Páginas de continuación ya leídas vía su cadena
+        num_pages = self._table_metadata[name]["num_pages"]
+        ring = self._scan_ring(num_pages)
+        reader = self.disk_manager.read_ahead(name, num_pages)
+        try:
+            for page_id in range(num_pages):
+                if page_id in chained:
+                    continue
+                # Las páginas que ya están en el pool no se leen (ni se cuentan como acceso)
+                data_bytes = None
+                if reader and not self.buffer_pool.contains(name, page_id):
+                    data_bytes = reader.get(page_id)
+                page = self.buffer_pool.get_page(name, page_id, data_bytes, ring)
+                if page is None:
+                    continue
+                if page.kind == Page.OVERFLOW_HEAD:
+                    yield page_id, self._read_overflow_chain(name, page, chained, ring)
+                elif page.kind == Page.DATA and page.data:
+                    yield page_id, page.data
+        finally:
+            if reader:
+                reader.close(self.read_ahead_stats)
+    
+    def scan(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Recorre los registros de una tabla página a página (sin armar la lista completa)"""
+        if name not in self._table_metadata:
+            return
+        for _, rows in self._scan_pages(name):
+            yield from rows
     
     def read_all(self, name: str) -> List[Dict[str, Any]]:
         """
@@ -131,10 +622,8 @@ class DiskStorage:
         all_records = []
         
         # Leer cada página
-        for page_id in range(num_pages):
-            page = self.buffer_pool.get_page(name, page_id)
-            if page and page.data:
-                all_records.extend(page.data)
+        for _, rows in self._scan_pages(name):
+            all_records.extend(rows)
         
         # Actualizar métricas legacy
         self.metrics.read(num_pages)
@@ -145,22 +634,126 @@ class DiskStorage:
         """Lee una página específica"""
         page = self.buffer_pool.get_page(name, page_id)
         self.metrics.read(1)
-        return page.data if page else []
+        if page is None or page.kind == Page.OVERFLOW:
+            return []
+        if page.kind == Page.OVERFLOW_HEAD:
+            return self._read_overflow_chain(name, page)
+        return page.data
+    
+    def _read_overflow_chain(self, name: str, head: Page, visited: Optional[set] = None,
+                             ring: Optional[BufferRing] = None) -> List[Dict[str, Any]]:
+        """
+        Reensambla el registro repartido en una cadena de páginas de overflow.
+        El resultado decodificado (y las páginas de la cadena) queda en el decoded
+        cache: las relecturas no vuelven a pedir la cadena ni a decodificarla.
+        """
+        visited = visited if visited is not None else set()
+        cached = self.decoded_cache.get(name, head.page_id)
+        if cached is not None:
+            rows, chain = cached
+            visited.update(chain)
+            return list(rows)
+        chain = []
+        chunks = [head.data]
+        next_page = head.next_page
+        while next_page >= 0 and next_page not in visited:
+            visited.add(next_page)
+            chain.append(next_page)
+            page = self.buffer_pool.get_page(name, next_page, ring=ring)
+            if page is None or page.kind != Page.OVERFLOW:
+                raise ValueError(f"Broken overflow chain in '{name}' at page {next_page}")
+            chunks.append(page.data)
+            next_page = page.next_page
+        rows = self.disk_manager.decode_payload(name, b''.join(chunks))
+        self.decoded_cache.put(name, head.page_id, (rows, chain), estimate_size(rows))
+        return list(rows)
     
     def write_page(self, name: str, page_id: int, records: List[Dict[str, Any]]) -> None:
-        """Escribe una página específica"""
+        """Escribe una página específica (queda dirty en el pool; la escribe el background writer)"""
         page = Page(page_id, records)
-        self.buffer_pool.put_page(name, page, write_through=False)
+        with self.lock:
+            meta = self._table_metadata.get(name)
+            if meta is not None:
+                self._log_pages(name, [page], meta["num_records"], meta["num_pages"])
+            self.buffer_pool.put_page(name, page, write_through=False)
+            self._forget_decoded(name, [page])
         self.metrics.write(1)
     
-    def _split_into_pages(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
-        """Divide registros en páginas según records_per_page"""
-        pages = []
-        for i in range(0, len(rows), self.rpp):
-            page_data = rows[i:i + self.rpp]
-            pages.append(page_data)
+    def _pack_pages(self, name: str, rows: List[Dict[str, Any]], first_page_id: int) -> List[Page]:
+        """
+        Empaqueta registros en páginas llenándolas por tamaño serializado.
+        
+        El tamaño de cada registro se estima con el codec de la tabla (o pickle)
+        y se verifica al cerrar la página; los registros que no caben solos en
+        una página se reparten en una cadena OVERFLOW_HEAD -> OVERFLOW -> ...
+        
+        Con compresión, el presupuesto sin comprimir se escala por la razón
+        observada en una muestra (con 10% de margen) y la verificación usa el
+        tamaño comprimido real.
+        """
+        codec = self.disk_manager.get_codec(name)
+        page_size = self.disk_manager.page_size(name)
+        budget = page_size
+        if self.disk_manager.get_compressor(name) is not None and rows:
+            sample = rows[:64]
+            raw_size = len(encode_rows(sample, codec))
+            stored_size = len(self.disk_manager.encode_payload(name, sample))
+            budget = int(page_size * max(1.0, 0.9 * raw_size / stored_size))
+        pages: List[Page] = []
+        current: List[Dict[str, Any]] = []
+        current_size = 0
+        
+        def overhead(count: int) -> int:
+            return codec.container_overhead(count) if codec else len(pickle.dumps([]))
+        
+        def flush() -> None:
+            nonlocal current, current_size
+            while current:
+                # La estimación puede fallar (p. ej. registros fuera del schema): recortar hasta que quepa
+                count = len(current)
+                encoded_size = len(self.disk_manager.encode_payload(name, current))
+                while count > 1 and encoded_size > page_size:
+                    count = max(1, min(count - 1, count * page_size // encoded_size))
+                    encoded_size = len(self.disk_manager.encode_payload(name, current[:count]))
+                if encoded_size > page_size:
+                    pages.extend(self._overflow_chain(name, current[0], first_page_id + len(pages), page_size))
+                else:
+                    pages.append(Page(first_page_id + len(pages), current[:count]))
+                current = current[count:]
+            current_size = 0
+        
+        for row in rows:
+            size = self._row_size(codec, row)
+            full = self.rpp is not None and len(current) >= self.rpp
+            if current and (full or current_size + size + overhead(len(current) + 1) > budget):
+                flush()
+            current.append(row)
+            current_size += size
+        flush()
+        
         return pages
     
+    @staticmethod
+    def _row_size(codec: Optional[RecordCodec], row: Dict[str, Any]) -> int:
+        """Estimación del tamaño serializado de un registro dentro de una página"""
+        if codec:
+            return codec.row_size(row)
+        # pickle memoiza los nombres de columna dentro de la página: ~2 bytes por clave repetida
+        return len(pickle.dumps(tuple(row.values()))) + 2 * len(row)
+    
+    def _overflow_chain(self, name: str, row: Dict[str, Any], first_page_id: int, page_size: int) -> List[Page]:
+        """Reparte un registro grande (ya comprimido si aplica) en páginas de overflow enlazadas"""
+        payload = self.disk_manager.encode_payload(name, [row])
+        capacity = Page.overflow_capacity(page_size)
+        chunks = [payload[i:i + capacity] for i in range(0, len(payload), capacity)]
+        
+        chain = []
+        for i, chunk in enumerate(chunks):
+            kind = Page.OVERFLOW_HEAD if i == 0 else Page.OVERFLOW
+            next_page = first_page_id + i + 1 if i + 1 < len(chunks) else -1
+            chain.append(Page(first_page_id + i, chunk, kind=kind, next_page=next_page))
+        return chain
+    
     def get_num_pages(self, name: str) -> int:
         """Retorna el número de páginas de una tabla"""
         if name in self._table_metadata:
@@ -177,22 +770,35 @@ class DiskStorage:
     
     def clear_table(self, name: str) -> None:
         """Vacía una tabla (borra datos pero mantiene metadata)"""
-        if name in self._table_metadata:
-            # Limpiar buffer pool
-            self.buffer_pool.clear_table(name)
-            # Recrear archivo vacío
-            self.disk_manager.get_table_file(name).write_bytes(b'')
-            # Resetear metadata de registros/páginas
-            self._table_metadata[name]["num_records"] = 0
-            self._table_metadata[name]["num_pages"] = 0
-            self._save_catalog()
+        with self.lock:
+            if name in self._table_metadata:
+                # Las imágenes del WAL no deben reaplicarse sobre la tabla vaciada
+                if self.wal is not None:
+                    self.checkpoint()
+                # Limpiar buffer pool y localizador de claves
+                self.buffer_pool.clear_table(name)
+                self._key_pages.pop(name, None)
+                self.decoded_cache.invalidate(name)
+                # Recrear archivo vacío (cierra el descriptor cacheado)
+                self.disk_manager.clear_table(name)
+                # Resetear metadata de registros/páginas
+                self._table_metadata[name]["num_records"] = 0
+                self._table_metadata[name]["num_pages"] = 0
+                self._catalog_put(name)
     
     def delete_table(self, name: str) -> None:
         """Elimina una tabla"""
-        if name in self._table_metadata:
-            self.buffer_pool.clear_table(name)
-            self.disk_manager.delete_table(name)
-            del self._table_metadata[name]
+        with self.lock:
+            if name in self._table_metadata:
+                self.buffer_pool.clear_table(name)
+                self._key_pages.pop(name, None)
+                self.decoded_cache.invalidate(name)
+                self.disk_manager.delete_table(name)
+                self._checkpoint_hooks.pop(name, None)
+                del self._table_metadata[name]
+                self.catalog.drop(name)
+                if self.wal is not None:
+                    self.checkpoint()
     
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estadísticas completas de I/O"""
@@ -203,10 +809,19 @@ class DiskStorage:
             **buffer_stats,
             **disk_stats,
             "records_per_page": self.rpp,
+            "wal": self.wal.get_stats() if self.wal is not None else None,
+            "bgwriter": self.bgwriter.get_stats() if self.bgwriter is not None else None,
+            "read_ahead": dict(self.read_ahead_stats),
+            "decoded_cache": self.decoded_cache.get_stats(),
+            "catalog": self.catalog.get_stats(),
             "tables": {
                 name: {
                     "records": meta["num_records"],
                     "pages": meta["num_pages"],
+                    "page_size": self.disk_manager.page_size(name),
+                    "free_bytes": sum(self.disk_manager.get_free_space(name)),
+                    "compression": self.get_table_options(name).get("compression"),
+                    "compression_ratio": self.disk_manager.compression_ratio(name),
                     "size_bytes": self.disk_manager.get_table_size(name)
                 }
                 for name, meta in self._table_metadata.items()
@@ -217,3 +832,4 @@ class DiskStorage:
         """Resetea contadores de I/O y cache"""
         self.metrics.reset()
         self.buffer_pool.reset_stats()
+        self.read_ahead_stats = dict.fromkeys(self.read_ahead_stats, 0)
@@ -0,0 +1,148 @@
+"""
+External Sort - Ordenamiento externo (runs en disco + merge k-way)
+Permite construir índices ordenados a partir de entradas que no entran en RAM.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import heapq
+import os
+import pickle
+import tempfile
+
+Row = Dict[str, Any]
+
+
+class ExternalSorter:
+    """
+    Ordena filas en memoria acotada.
+
+    add() acumula hasta run_rows filas, las ordena y las escribe a un archivo
+    temporal (un "run") como una secuencia de lotes pickle de BATCH_ROWS filas.
+    merged() mezcla los runs con heapq.merge leyendo un lote por run a la vez;
+    si hay más de MAX_FAN_IN runs, primero se mezclan por grupos en runs más
+    grandes (pasadas intermedias). El orden es estable: a igual clave, las filas
+    salen en el orden en que entraron. Si todo entró en un solo run, no se toca
+    el disco.
+
+    Uso:
+        with ExternalSorter(key=lambda r: r["id"]) as sorter:
+            sorter.add(rows)
+            for row in sorter.merged(): ...
+    """
+
+    # Filas por run (memoria máxima del sort ~ run_rows filas decodificadas)
+    RUN_ROWS = 100_000
+
+    # Filas por lote pickle dentro de un run (unidad de lectura del merge)
+    BATCH_ROWS = 1024
+
+    # Runs que se mezclan a la vez (uno abierto por run)
+    MAX_FAN_IN = 64
+
+    # Buffer de lectura/escritura de los archivos de runs
+    IO_BUFFER = 1024 * 1024
+
+    def __init__(self, key: Callable[[Row], Any], run_rows: int = RUN_ROWS, tmp_dir: Optional[str] = None):
+        """
+        Args:
+            key: Clave de ordenamiento
+            run_rows: Filas por run en memoria
+            tmp_dir: Directorio de los runs (None = directorio temporal del sistema)
+        """
+        if run_rows < 1:
+            raise ValueError("run_rows must be >= 1")
+        self.key = key
+        self.run_rows = run_rows
+        self.tmp_dir = tmp_dir
+        self._buffer: List[Row] = []
+        self._runs: List[str] = []
+
+        # Estadísticas
+        self.rows = 0
+        self.runs = 0
+        self.merge_passes = 0
+
+    def add(self, rows: Iterable[Row]) -> None:
+        """Agrega filas; cada run_rows filas se escribe un run ordenado"""
+        for row in rows:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.run_rows:
+                self._spill()
+
+    def _spill(self) -> None:
+        self._buffer.sort(key=self.key)
+        self._runs.append(self._write_run(self._buffer))
+        self.rows += len(self._buffer)
+        self._buffer = []
+
+    def _write_run(self, rows: Iterable[Row]) -> str:
+        if self.tmp_dir:
+            os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="sort_run_", suffix=".tmp", dir=self.tmp_dir)
+        with os.fdopen(fd, 'wb', buffering=self.IO_BUFFER) as f:
+            batch: List[Row] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.BATCH_ROWS:
+                    pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    batch = []
+            if batch:
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.runs += 1
+        return path
+
+    def _read_run(self, path: str) -> Iterator[Row]:
+        with open(path, 'rb', buffering=self.IO_BUFFER) as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def _merge(self, paths: List[str]) -> Iterator[Row]:
+        return heapq.merge(*(self._read_run(path) for path in paths), key=self.key)
+
+    def merged(self) -> Iterator[Row]:
+        """Todas las filas agregadas, ordenadas por key"""
+        if not self._runs:
+            self._buffer.sort(key=self.key)
+            self.rows += len(self._buffer)
+            rows, self._buffer = self._buffer, []
+            yield from rows
+            return
+        if self._buffer:
+            self._spill()
+
+        # Pasadas intermedias: mezclar de a MAX_FAN_IN runs hasta que entren en un merge
+        while len(self._runs) > self.MAX_FAN_IN:
+            runs, self._runs = self._runs, []
+            for i in range(0, len(runs), self.MAX_FAN_IN):
+                group = runs[i:i + self.MAX_FAN_IN]
+                self._runs.append(self._write_run(self._merge(group)))
+                self._remove(group)
+            self.merge_passes += 1
+
+        self.merge_passes += 1
+        yield from self._merge(self._runs)
+
+    def _remove(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        """Borra los runs (también si el merge no se consumió entero)"""
+        self._remove(self._runs)
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "runs": self.runs, "merge_passes": self.merge_passes}
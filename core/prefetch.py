@@ -0,0 +1,152 @@
+"""
+Prefetch - Read-ahead adaptativo para recorridos secuenciales
+Lee en un hilo de fondo las próximas páginas/bloques mientras el hilo principal
+decodifica y filtra el actual (pread libera el GIL, así que I/O y CPU se solapan).
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+# Pool compartido por todos los recorridos (los hilos solo hacen pread)
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+READ_AHEAD_WORKERS = 4
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=READ_AHEAD_WORKERS, thread_name_prefix="read-ahead")
+        return _EXECUTOR
+
+
+class ReadAhead:
+    """
+    Read-ahead sobre fetch(n) -> bytes de la página/bloque n.
+
+    Detecta acceso secuencial: mientras cada get(n) avanza dentro de la ventana
+    actual (n > anterior y n <= anterior + ventana + 1), la ventana se duplica
+    desde min_window hasta max_window y se mantienen en vuelo las lecturas
+    n+1 .. n+ventana, pedidas en corridas (fetch_run) de media ventana para que
+    cada tarea del hilo sea un pread grande. Un salto hacia atrás o fuera de la
+    ventana la reinicia a 0 y descarta lo prefetcheado.
+
+    Si las lecturas síncronas tardan menos que min_latency (el archivo ya está en
+    el page cache del SO) no se prefetchea: el traspaso entre hilos costaría más
+    que la lectura.
+    """
+
+    # Latencia mínima (s) de una lectura síncrona para activar el read-ahead
+    MIN_LATENCY = 50e-6
+
+    def __init__(self, fetch: Callable[[int], Any], end: int,
+                 fetch_run: Optional[Callable[[int, int], List[Any]]] = None,
+                 min_window: int = 4, max_window: int = 32, min_latency: Optional[float] = None,
+                 on_close: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            fetch: Lee el elemento n
+            end: Número de elementos (no se prefetchea más allá)
+            fetch_run: Lee `count` elementos consecutivos desde `start` (por defecto, fetch uno a uno);
+                se ejecuta en otro hilo
+            min_window: Ventana inicial al detectar acceso secuencial
+            max_window: Ventana máxima (elementos en vuelo)
+            min_latency: Umbral de latencia (None = MIN_LATENCY); 0 = prefetchear siempre
+            on_close: Se llama una vez en close(), ya sin lecturas en vuelo (p. ej. cerrar el descriptor)
+        """
+        self.fetch = fetch
+        self.fetch_run = fetch_run or (lambda start, count: [fetch(i) for i in range(start, start + count)])
+        self.end = end
+        self.min_window = min_window
+        self.max_window = max_window
+        self.min_latency = self.MIN_LATENCY if min_latency is None else min_latency
+        self.window = 0
+        self.latency: Optional[float] = None  # Promedio móvil de las lecturas síncronas
+        self._last: Optional[int] = None
+        self._next = 0  # Primer elemento aún no pedido al hilo
+        self._inflight: Dict[int, Tuple[Future, int]] = {}
+        self._on_close = on_close
+
+        # Estadísticas
+        self.issued = 0
+        self.hits = 0
+        self.wasted = 0
+
+    def get(self, n: int) -> Any:
+        """Retorna fetch(n), desde el read-ahead si ya estaba en vuelo"""
+        self._observe(n)
+        entry = self._inflight.pop(n, None)
+        if entry is not None:
+            future, position = entry
+            self.hits += 1
+            result = future.result()[position]
+        else:
+            start = time.perf_counter()
+            result = self.fetch(n)
+            elapsed = time.perf_counter() - start
+            self.latency = elapsed if self.latency is None else 0.75 * self.latency + 0.25 * elapsed
+        self._schedule(n)
+        return result
+
+    def _observe(self, n: int) -> None:
+        last = self._last
+        self._last = n
+        if last is not None and last < n <= last + self.window + 1:
+            if self.latency is not None and self.latency < self.min_latency:
+                return  # Lecturas desde el page cache: sin read-ahead
+            self.window = min(max(self.window * 2, self.min_window), self.max_window)
+        elif last is not None:
+            self.window = 0
+            self._discard(lambda i: True)
+
+    def _schedule(self, n: int) -> None:
+        # Lo que quedó atrás (p. ej. saltado por el llamador) ya no se va a pedir
+        self._discard(lambda i: i <= n)
+        self._next = max(self._next, n + 1)
+        if not self.window:
+            self._next = n + 1
+            return
+        target = min(n + 1 + self.window, self.end)
+        run = max(1, self.window // 2)
+        executor = _get_executor()
+        while self._next < target:
+            start, count = self._next, min(run, target - self._next)
+            future = executor.submit(self.fetch_run, start, count)
+            for position in range(count):
+                self._inflight[start + position] = (future, position)
+            self._next += count
+            self.issued += count
+
+    def _discard(self, predicate: Callable[[int], bool]) -> None:
+        dropped = [i for i in self._inflight if predicate(i)]
+        if not dropped:
+            return
+        futures = {self._inflight.pop(i)[0] for i in dropped}
+        alive = {future for future, _ in self._inflight.values()}
+        for future in futures - alive:
+            future.cancel()
+        self.wasted += len(dropped)
+
+    def close(self, stats: Optional[Dict[str, int]] = None) -> None:
+        """Cancela/espera las lecturas pendientes y acumula métricas en `stats`"""
+        futures = {future for future, _ in self._inflight.values()}
+        self.wasted += len(self._inflight)
+        self._inflight.clear()
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+        if stats is not None:
+            stats["prefetched"] = stats.get("prefetched", 0) + self.issued
+            stats["prefetch_hits"] = stats.get("prefetch_hits", 0) + self.hits
+            stats["prefetch_wasted"] = stats.get("prefetch_wasted", 0) + self.wasted
+
+    def __enter__(self) -> 'ReadAhead':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,209 @@
+"""
+Record Codec - Serialización binaria de registros guiada por el schema
+Reemplaza pickle (lista de dicts) en páginas de tabla y bloques de índice
+"""
+import pickle
+import struct
+import zlib
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Primer byte de un contenedor codificado (pickle siempre empieza con 0x80)
+CODEC_MAGIC = b'\xc5'
+CODEC_VERSION = 1
+
+# Tipos de columna soportados en el formato binario
+INT, FLOAT, BOOL, TEXT = "INT", "FLOAT", "BOOL", "TEXT"
+
+_TYPE_ALIASES = {
+    "INT": INT, "INTEGER": INT, "BIGINT": INT,
+    "FLOAT": FLOAT, "REAL": FLOAT, "DOUBLE": FLOAT,
+    "BOOL": BOOL, "BOOLEAN": BOOL,
+}
+
+# Formato struct y bytes por valor de los tipos de ancho fijo
+_FIXED_FORMATS = {INT: ('q', 8), FLOAT: ('d', 8), BOOL: ('?', 1)}
+
+
+# Tipo Python exacto aceptado por columna (bool no cuenta como INT ni int como FLOAT)
+_PYTHON_TYPES = {INT: {int}, FLOAT: {float}, BOOL: {bool}, TEXT: {str}}
+
+# Valor que ocupa el lugar de un NULL (marcado en el bitmap)
+_NULL_PLACEHOLDERS = {INT: 0, FLOAT: 0.0, BOOL: False, TEXT: ''}
+
+
+class CodecError(ValueError):
+    """El registro no se ajusta al schema o el buffer no corresponde al codec"""
+
+
+class RecordCodec:
+    """
+    Codec compacto de registros generado desde las columnas de un TableSchema.
+
+    Los registros de una página/bloque se guardan por columnas (layout PAX), así
+    los nombres de columna no se repiten y cada columna se (de)codifica con una
+    sola llamada en C:
+        INT    n valores int64 ('q')
+        FLOAT  n valores double ('d')
+        BOOL   n valores de 1 byte ('?')
+        TEXT   [longitud en bytes (uint32)][valores UTF-8 separados por \\x00]
+
+    Formato del contenedor:
+        [CODEC_MAGIC][versión][fingerprint del schema (uint32)][n registros (uint32)]
+        por cada columna: [flags (1 byte)][null bitmap si flags & HAS_NULLS][valores]
+    """
+
+    CONTAINER_HEADER = struct.Struct('<BII')
+    TEXT_HEADER = struct.Struct('<I')
+    HAS_NULLS = 0x01
+    TEXT_SEPARATOR = '\x00'
+
+    def __init__(self, columns: Sequence[Tuple[str, str]]):
+        """
+        Args:
+            columns: Lista de (nombre, tipo) en el orden del schema
+        """
+        self.columns = [(name, _TYPE_ALIASES.get(str(col_type).upper(), TEXT)) for name, col_type in columns]
+        self.names = [name for name, _ in self.columns]
+        self.kinds = [col_type for _, col_type in self.columns]
+        self.fingerprint = zlib.crc32(repr(self.columns).encode('utf-8'))
+
+        self._getters = [itemgetter(name) for name in self.names]
+
+        # Bytes fijos por registro: 8 por INT/FLOAT, 1 por BOOL, 1 separador por TEXT
+        self._fixed_row_size = sum(_FIXED_FORMATS[t][1] if t != TEXT else 1 for t in self.kinds)
+        self._text_names = [name for name, t in self.columns if t == TEXT]
+
+    @classmethod
+    def from_schema(cls, schema: Any) -> 'RecordCodec':
+        """Crea el codec desde un TableSchema"""
+        return cls([(col.name, col.type) for col in schema.columns])
+
+    @classmethod
+    def from_schema_dict(cls, schema: Dict[str, Any]) -> 'RecordCodec':
+        """Crea el codec desde el schema serializado en catalog.json"""
+        return cls([(col["name"], col["type"]) for col in schema["columns"]])
+
+    def spec(self) -> List[Tuple[str, str]]:
+        """Columnas (nombre, tipo) para persistir el codec junto a un índice"""
+        return list(self.columns)
+
+    def container_overhead(self, count: int) -> int:
+        """Bytes de cabeceras de un contenedor con `count` registros (cota superior)"""
+        per_column = 1 + (count + 7) // 8
+        return 1 + self.CONTAINER_HEADER.size + len(self.columns) * per_column + 4 * len(self._text_names)
+
+    def row_size(self, row: Dict[str, Any]) -> int:
+        """Bytes que aporta un registro a un contenedor (sin cabeceras)"""
+        size = self._fixed_row_size
+        for name in self._text_names:
+            value = row.get(name)
+            if type(value) is str:
+                size += len(value) if value.isascii() else len(value.encode('utf-8'))
+        return size
+
+    def encode_rows(self, rows: List[Dict[str, Any]]) -> bytes:
+        """Codifica una lista de registros; lanza CodecError si alguno no se ajusta al schema"""
+        count = len(rows)
+        if set(map(len, rows)) - {len(self.names)}:
+            raise CodecError("El registro no tiene exactamente las columnas del schema")
+
+        parts = [CODEC_MAGIC, self.CONTAINER_HEADER.pack(CODEC_VERSION, self.fingerprint, count)]
+        try:
+            for (name, kind), getter in zip(self.columns, self._getters):
+                values = list(map(getter, rows))
+                parts.extend(self._encode_column(name, kind, values))
+        except KeyError as e:
+            raise CodecError(f"Falta la columna {e}") from None
+        except struct.error as e:
+            # Entero fuera del rango de int64
+            raise CodecError(str(e)) from None
+        return b''.join(parts)
+
+    def _encode_column(self, name: str, kind: str, values: List[Any]) -> List[bytes]:
+        types = set(map(type, values))
+        nulls = 0
+        if type(None) in types:
+            types.discard(type(None))
+            for i, value in enumerate(values):
+                if value is None:
+                    nulls |= 1 << i
+            default = _NULL_PLACEHOLDERS[kind]
+            values = [default if value is None else value for value in values]
+
+        if types - _PYTHON_TYPES[kind]:
+            raise CodecError(f"Columna {name}: se esperaba {kind}")
+
+        parts = [bytes([self.HAS_NULLS if nulls else 0])]
+        if nulls:
+            parts.append(nulls.to_bytes((len(values) + 7) // 8, 'little'))
+
+        if kind == TEXT:
+            joined = self.TEXT_SEPARATOR.join(values)
+            if values and joined.count(self.TEXT_SEPARATOR) != len(values) - 1:
+                raise CodecError(f"Columna {name}: TEXT con caracteres NUL")
+            encoded = joined.encode('utf-8')
+            parts.append(self.TEXT_HEADER.pack(len(encoded)))
+            parts.append(encoded)
+        else:
+            parts.append(struct.pack(f"<{len(values)}{_FIXED_FORMATS[kind][0]}", *values))
+        return parts
+
+    def decode_rows(self, buf: Any) -> List[Dict[str, Any]]:
+        """Decodifica un contenedor (bytes o memoryview); ignora bytes de padding al final"""
+        version, fingerprint, count = self.CONTAINER_HEADER.unpack_from(buf, 1)
+        if version != CODEC_VERSION or fingerprint != self.fingerprint:
+            raise CodecError("El contenedor fue codificado con otro schema")
+
+        offset = 1 + self.CONTAINER_HEADER.size
+        bitmap_size = (count + 7) // 8
+        columns = []
+        for kind in self.kinds:
+            flags = buf[offset]
+            offset += 1
+            nulls = 0
+            if flags & self.HAS_NULLS:
+                nulls = int.from_bytes(buf[offset:offset + bitmap_size], 'little')
+                offset += bitmap_size
+
+            if kind == TEXT:
+                (size,) = self.TEXT_HEADER.unpack_from(buf, offset)
+                offset += self.TEXT_HEADER.size
+                values = str(buf[offset:offset + size], 'utf-8').split(self.TEXT_SEPARATOR) if count else []
+                offset += size
+            else:
+                fmt, width = _FIXED_FORMATS[kind]
+                values = struct.unpack_from(f"<{count}{fmt}", buf, offset)
+                offset += width * count
+
+            if nulls:
+                values = list(values)
+                for i in range(count):
+                    if nulls >> i & 1:
+                        values[i] = None
+            columns.append(values)
+
+        names = self.names
+        return [dict(zip(names, row_values)) for row_values in zip(*columns)] if count else []
+
+
+def encode_rows(rows: List[Dict[str, Any]], codec: Optional[RecordCodec] = None) -> bytes:
+    """
+    Serializa una lista de registros con el codec si todos se ajustan al schema;
+    si no (o no hay codec), usa pickle como respaldo.
+    """
+    if codec is not None:
+        try:
+            return codec.encode_rows(rows)
+        except CodecError:
+            pass
+    return pickle.dumps(rows)
+
+
+def decode_rows(buf: Any, codec: Optional[RecordCodec] = None) -> List[Dict[str, Any]]:
+    """Deserializa un contenedor del codec o un pickle (formato anterior)"""
+    if buf[:1] == CODEC_MAGIC:
+        if codec is None:
+            raise CodecError("Contenedor binario sin codec asociado")
+        return codec.decode_rows(buf)
+    return pickle.loads(buf)
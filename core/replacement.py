@@ -0,0 +1,295 @@
+"""
+Replacement - Políticas de reemplazo del buffer pool (LRU, CLOCK, 2Q, LRU-K, ARC)
+Cada política solo ordena claves (table, page_id); el BufferPool guarda las
+páginas, escribe las dirty y le pregunta a la política qué evictar.
+
+victim() recibe opcionalmente can_evict(key): las claves para las que retorna
+False (páginas pinned) se saltan; si ninguna se puede evictar retorna None.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Protocol, Type
+
+EvictFilter = Optional[Callable[[Hashable], bool]]
+
+
+class IReplacementPolicy(Protocol):
+    name: str
+
+    def hit(self, key: Hashable) -> None: ...
+    def admit(self, key: Hashable) -> None: ...
+    def victim(self, incoming: Optional[Hashable] = None, can_evict: EvictFilter = None) -> Optional[Hashable]: ...
+    def remove(self, key: Hashable) -> None: ...
+
+
+def _first(keys: Iterable[Hashable], can_evict: EvictFilter) -> Optional[Hashable]:
+    """Primera clave (en orden de evicción) que se puede evictar"""
+    return next((key for key in keys if can_evict is None or can_evict(key)), None)
+
+
+class LRUPolicy:
+    """Least Recently Used: evicta la página usada hace más tiempo"""
+    name = "lru"
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._order: OrderedDict = OrderedDict()
+
+    def hit(self, key: Hashable) -> None:
+        self._order.move_to_end(key)
+
+    def admit(self, key: Hashable) -> None:
+        self._order[key] = None
+
+    def victim(self, incoming: Optional[Hashable] = None, can_evict: EvictFilter = None) -> Optional[Hashable]:
+        key = _first(self._order, can_evict)
+        if key is not None:
+            del self._order[key]
+        return key
+
+    def remove(self, key: Hashable) -> None:
+        self._order.pop(key, None)
+
+
+class ClockPolicy:
+    """
+    CLOCK (segunda oportunidad): un bit de referencia por página; la aguja salta
+    las referenciadas (apagando el bit) y evicta la primera sin referencia.
+    Un hit solo enciende un bit (más barato que reordenar una lista).
+    """
+    name = "clock"
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # Orden del anillo: el primero es la posición de la aguja
+        self._ring: OrderedDict = OrderedDict()
+
+    def hit(self, key: Hashable) -> None:
+        self._ring[key] = True
+
+    def admit(self, key: Hashable) -> None:
+        self._ring[key] = False
+
+    def victim(self, incoming: Optional[Hashable] = None, can_evict: EvictFilter = None) -> Optional[Hashable]:
+        # Dos vueltas de la aguja bastan: en la primera se apagan todos los bits
+        for _ in range(2 * len(self._ring) + 1):
+            if not self._ring:
+                break
+            key, referenced = self._ring.popitem(last=False)
+            if not referenced and (can_evict is None or can_evict(key)):
+                return key
+            self._ring[key] = False  # Segunda oportunidad (o pinned): vuelve al final del anillo
+        return None
+
+    def remove(self, key: Hashable) -> None:
+        self._ring.pop(key, None)
+
+
+class TwoQueuePolicy:
+    """
+    2Q (Johnson & Shasha): las páginas nuevas entran a una FIFO A1in; si se
+    vuelven a pedir después de salir (están en la lista fantasma A1out) pasan a la
+    LRU principal Am. Un scan solo recorre A1in y no desplaza las páginas calientes.
+    """
+    name = "2q"
+
+    def __init__(self, capacity: int, kin: float = 0.25, kout: float = 0.5):
+        self.capacity = capacity
+        self.kin = max(1, int(capacity * kin))
+        self.kout = max(1, int(capacity * kout))
+        self._a1in: OrderedDict = OrderedDict()
+        self._a1out: OrderedDict = OrderedDict()  # Fantasmas: solo claves
+        self._am: OrderedDict = OrderedDict()
+
+    def hit(self, key: Hashable) -> None:
+        if key in self._am:
+            self._am.move_to_end(key)
+        # Hits en A1in no cambian nada (correlated references)
+
+    def admit(self, key: Hashable) -> None:
+        if key in self._a1out:
+            del self._a1out[key]
+            self._am[key] = None
+        else:
+            self._a1in[key] = None
+
+    def victim(self, incoming: Optional[Hashable] = None, can_evict: EvictFilter = None) -> Optional[Hashable]:
+        if self._a1in and (len(self._a1in) > self.kin or not self._am):
+            queues = (self._a1in, self._am)
+        else:
+            queues = (self._am, self._a1in)
+        for queue in queues:
+            key = _first(queue, can_evict)
+            if key is None:
+                continue
+            del queue[key]
+            if queue is self._a1in:
+                self._a1out[key] = None
+                if len(self._a1out) > self.kout:
+                    self._a1out.popitem(last=False)
+            return key
+        return None
+
+    def remove(self, key: Hashable) -> None:
+        self._a1in.pop(key, None)
+        self._am.pop(key, None)
+
+
+class LRUKPolicy:
+    """
+    LRU-K (O'Neil et al.): evicta la página con mayor distancia hacia atrás a su
+    K-ésimo acceso; las que tienen menos de K accesos (vistas una sola vez, como
+    las de un scan) van primero. El historial se conserva un tiempo tras evictar.
+    """
+    name = "lru-k"
+
+    def __init__(self, capacity: int, k: int = 2, history: Optional[int] = None):
+        self.capacity = capacity
+        self.k = k
+        self._clock = 0
+        self._resident: Dict[Hashable, None] = {}
+        # Últimos K tiempos de acceso por clave (residentes y recientes no residentes)
+        self._history: OrderedDict = OrderedDict()
+        self._history_limit = history if history is not None else 2 * capacity
+
+    def _touch(self, key: Hashable) -> None:
+        self._clock += 1
+        times = self._history.pop(key, [])
+        times.append(self._clock)
+        self._history[key] = times[-self.k:]
+        while len(self._history) > self._history_limit + len(self._resident):
+            old_key = next(iter(self._history))
+            if old_key in self._resident:
+                self._history.move_to_end(old_key)
+                continue
+            del self._history[old_key]
+
+    def hit(self, key: Hashable) -> None:
+        self._touch(key)
+
+    def admit(self, key: Hashable) -> None:
+        self._resident[key] = None
+        self._touch(key)
+
+    def victim(self, incoming: Optional[Hashable] = None, can_evict: EvictFilter = None) -> Optional[Hashable]:
+        def priority(key: Hashable):
+            times = self._history[key]
+            # Menos de K accesos = distancia infinita; desempate por el acceso más antiguo (LRU)
+            return (len(times) >= self.k, times[0] if len(times) >= self.k else times[-1])
+
+        candidates = [key for key in self._resident if can_evict is None or can_evict(key)]
+        if not candidates:
+            return None
+        key = min(candidates, key=priority)
+        del self._resident[key]
+        return key
+
+    def remove(self, key: Hashable) -> None:
+        self._resident.pop(key, None)
+        self._history.pop(key, None)
+
+
+class ARCPolicy:
+    """
+    ARC (Megiddo & Modha): T1 (vistas una vez) y T2 (vistas 2+ veces) con listas
+    fantasma B1/B2; el tamaño objetivo de T1 (p) se ajusta solo según en qué
+    fantasma aparecen los misses, así se adapta entre recencia y frecuencia.
+    """
+    name = "arc"
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.p = 0.0
+        self._t1: OrderedDict = OrderedDict()
+        self._t2: OrderedDict = OrderedDict()
+        self._b1: OrderedDict = OrderedDict()
+        self._b2: OrderedDict = OrderedDict()
+        self._adapted: Optional[Hashable] = None
+
+    def hit(self, key: Hashable) -> None:
+        if key in self._t1:
+            del self._t1[key]
+            self._t2[key] = None
+        elif key in self._t2:
+            self._t2.move_to_end(key)
+
+    def _adapt(self, key: Hashable) -> None:
+        if self._adapted == key:
+            return
+        self._adapted = key
+        if key in self._b1:
+            self.p = min(self.capacity, self.p + max(len(self._b2) / len(self._b1), 1))
+        elif key in self._b2:
+            self.p = max(0.0, self.p - max(len(self._b1) / len(self._b2), 1))
+
+    def victim(self, incoming: Optional[Hashable] = None, can_evict: EvictFilter = None) -> Optional[Hashable]:
+        if incoming is not None:
+            self._adapt(incoming)
+        if self._t1 and (len(self._t1) > self.p or (incoming in self._b2 and len(self._t1) == int(self.p))
+                         or not self._t2):
+            lists = ((self._t1, self._b1), (self._t2, self._b2))
+        else:
+            lists = ((self._t2, self._b2), (self._t1, self._b1))
+        for resident, ghost in lists:
+            key = _first(resident, can_evict)
+            if key is not None:
+                del resident[key]
+                ghost[key] = None
+                return key
+        return None
+
+    def admit(self, key: Hashable) -> None:
+        self._adapt(key)
+        self._adapted = None
+        if key in self._b1 or key in self._b2:
+            self._b1.pop(key, None)
+            self._b2.pop(key, None)
+            self._t2[key] = None
+        else:
+            self._t1[key] = None
+        # Fantasmas acotados: |T1| + |B1| <= c y el total <= 2c
+        while self._b1 and len(self._t1) + len(self._b1) > self.capacity:
+            self._b1.popitem(last=False)
+        while self._b2 and len(self._t1) + len(self._t2) + len(self._b1) + len(self._b2) > 2 * self.capacity:
+            self._b2.popitem(last=False)
+
+    def remove(self, key: Hashable) -> None:
+        self._t1.pop(key, None)
+        self._t2.pop(key, None)
+
+
+POLICIES: Dict[str, Type] = {
+    policy.name: policy for policy in (LRUPolicy, ClockPolicy, TwoQueuePolicy, LRUKPolicy, ARCPolicy)
+}
+
+
+def make_policy(name: str, capacity: int) -> IReplacementPolicy:
+    """Crea la política por nombre ('lru', 'clock', '2q', 'lru-k', 'arc')"""
+    try:
+        return POLICIES[str(name).lower()](capacity)
+    except KeyError:
+        raise ValueError(f"Unknown replacement policy '{name}' (available: {sorted(POLICIES)})") from None
+
+
+def simulate(name: str, capacity: int, trace: Iterable[Hashable]) -> Dict[str, Any]:
+    """Reproduce una traza de accesos con la política dada y retorna hits/misses/hit_rate"""
+    policy = make_policy(name, capacity)
+    resident = set()
+    hits = misses = 0
+    for key in trace:
+        if key in resident:
+            hits += 1
+            policy.hit(key)
+            continue
+        misses += 1
+        if len(resident) >= capacity:
+            resident.discard(policy.victim(key))
+        resident.add(key)
+        policy.admit(key)
+    total = hits + misses
+    return {"policy": name, "capacity": capacity, "hits": hits, "misses": misses,
+            "hit_rate": hits / total if total else 0.0}
+
+
+def compare(trace: List[Hashable], capacities: Iterable[int], policies: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """simulate() de cada política y capacidad sobre la misma traza"""
+    return [simulate(name, capacity, trace) for capacity in capacities for name in (policies or POLICIES)]
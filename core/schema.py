@@ -1,13 +1,87 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, List
+
+# Literales de BOOL en los CSV (sin distinguir mayúsculas)
+BOOL_LITERALS = {"yes": True, "no": False, "true": True, "false": False}
+
+
+def parse_bool(value: str) -> bool:
+    try:
+        return BOOL_LITERALS[value.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Invalid BOOL literal: {value!r}") from None
+
+
+# Conversión de un literal de texto al tipo declarado de la columna
+_PARSERS = {"INT": int, "FLOAT": float, "BOOL": parse_bool}
 
 @dataclass
 class Column:
     name: str
-    type: str  # "INT", "FLOAT", "TEXT", etc.
+    type: str  # "INT", "FLOAT", "BOOL", "TEXT", etc.
+    nullable: bool = True  # Metadata (p. ej. inferida de un CSV); solo se exige en la clave
+
+    def coerce(self, value: Any) -> Any:
+        """
+        Lleva un valor de una consulta/INSERT al tipo declarado (una vez por
+        valor, no por fila comparada). TEXT y los valores que no se pueden
+        convertir quedan como están.
+        """
+        parse = _PARSERS.get(self.type.upper())
+        if parse is None or value is None or isinstance(value, bool):
+            return value
+        if self.type.upper() == "FLOAT" and type(value) is int:
+            return float(value)
+        if type(value) is not str:
+            return value
+        try:
+            return parse(value)
+        except ValueError:
+            return value
 
 @dataclass
 class TableSchema:
     name: str
     columns: List[Column]
     key: str  # columna clave primaria
+
+    def column(self, name: str) -> Column:
+        for col in self.columns:
+            if col.name == name:
+                return col
+        raise KeyError(f"Unknown column: {name}")
+
+    def coerce(self, name: str, value: Any) -> Any:
+        """Valor de consulta convertido al tipo de la columna (columnas desconocidas: sin cambios)"""
+        try:
+            return self.column(name).coerce(value)
+        except KeyError:
+            return value
+
+    def coerce_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fila de INSERT con cada valor en el tipo declarado. Solo la clave se
+        exige no nula: la nullability de las demás columnas sale de los datos
+        vistos al inferir (ninguna celda vacía) y no restringe filas nuevas.
+        """
+        converted = dict(row)
+        for col in self.columns:
+            if col.name in converted:
+                converted[col.name] = col.coerce(converted[col.name])
+        if converted.get(self.key) is None:
+            raise ValueError(f"Column {self.key} is NOT NULL")
+        return converted
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Schema serializado para el catálogo"""
+        return {
+            "name": self.name,
+            "key": self.key,
+            "columns": [{"name": col.name, "type": col.type, "nullable": col.nullable} for col in self.columns]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TableSchema':
+        """Schema desde el catálogo (los de versiones anteriores no guardan nullable)"""
+        columns = [Column(col["name"], col["type"], col.get("nullable", True)) for col in data["columns"]]
+        return cls(name=data["name"], columns=columns, key=data["key"])
@@ -0,0 +1,148 @@
+"""
+Stats - Registro unificado de estadísticas de buffer e I/O por tabla y por índice
+Los contadores solo crecen: leerlos no resetea nada (las métricas por consulta se
+calculan como diferencia entre dos snapshots).
+"""
+from typing import Any, Dict, List, Optional
+import threading
+
+# Prefijo de los archivos de índice en el buffer pool (ver BufferPool.register_file)
+INDEX_PREFIX = "index:"
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias con buckets en potencias de 2 de microsegundos:
+    el bucket i cuenta las muestras en [2^(i-1), 2^i) µs (el 0, las de menos de 1 µs).
+    Los percentiles se reportan como el límite superior de su bucket.
+    """
+
+    BUCKETS = 32
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0  # Segundos acumulados
+
+    def record(self, seconds: float) -> None:
+        self.counts[min(self.BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q: float) -> Optional[int]:
+        """Límite superior (µs) del bucket que contiene el percentil q (0-100)"""
+        if not self.count:
+            return None
+        target = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return 1 << i
+        return 1 << (self.BUCKETS - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count * 1e6, 1) if self.count else None,
+            "p50_us": self.percentile(50),
+            "p95_us": self.percentile(95),
+            "p99_us": self.percentile(99),
+            "buckets_us": {1 << i: n for i, n in enumerate(self.counts) if n}
+        }
+
+
+class ObjectStats:
+    """
+    Contadores de una tabla o índice.
+
+    logical_reads: accesos a páginas/bloques (hits + misses)
+    cache_hits: accesos servidos sin I/O (buffer pool o decoded cache)
+    physical_reads / bytes_read: lecturas reales de disco
+    writes / bytes_written: escrituras reales de disco
+    evictions: páginas expulsadas del buffer pool
+    dirty_flushes: páginas dirty escritas por el pool (evicción, flush o background writer)
+    """
+
+    COUNTERS = ("logical_reads", "cache_hits", "physical_reads", "bytes_read",
+                "writes", "bytes_written", "evictions", "dirty_flushes")
+
+    __slots__ = COUNTERS + ("read_latency", "write_latency")
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.read_latency = LatencyHistogram()
+        self.write_latency = LatencyHistogram()
+
+    def read(self, nbytes: int, seconds: Optional[float] = None, blocks: int = 1) -> None:
+        """Lectura física (seconds=None si no se midió, p. ej. servida por el read-ahead)"""
+        self.physical_reads += blocks
+        self.bytes_read += nbytes
+        if seconds is not None:
+            self.read_latency.record(seconds)
+
+    def write(self, nbytes: int, seconds: Optional[float] = None, blocks: int = 1) -> None:
+        self.writes += blocks
+        self.bytes_written += nbytes
+        if seconds is not None:
+            self.write_latency.record(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {name: getattr(self, name) for name in self.COUNTERS}
+        stats["hit_rate"] = (f"{self.cache_hits / self.logical_reads * 100:.2f}%"
+                             if self.logical_reads else None)
+        stats["read_latency"] = self.read_latency.snapshot()
+        stats["write_latency"] = self.write_latency.snapshot()
+        return stats
+
+
+class StatsRegistry:
+    """
+    Registro de ObjectStats por nombre: tablas por su nombre e índices como
+    "index:<archivo .dat>" (el mismo nombre que usan en el buffer pool).
+    Los contadores se actualizan sin lock (como los del DiskManager); solo la
+    creación de entradas está protegida.
+    """
+
+    def __init__(self):
+        self._objects: Dict[str, ObjectStats] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ObjectStats:
+        stats = self._objects.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._objects.setdefault(name, ObjectStats())
+        return stats
+
+    def names(self) -> List[str]:
+        return list(self._objects)
+
+    def snapshot(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Snapshot sin efectos: {"tables": {...}, "indexes": {...}}, o solo la
+        tabla/índice `name` (los índices también por su archivo sin prefijo).
+        """
+        if name is not None:
+            stats = self._objects.get(name) or self._objects.get(INDEX_PREFIX + name)
+            return stats.snapshot() if stats is not None else {}
+        tables: Dict[str, Any] = {}
+        indexes: Dict[str, Any] = {}
+        for key, stats in list(self._objects.items()):
+            if key.startswith(INDEX_PREFIX):
+                indexes[key[len(INDEX_PREFIX):]] = stats.snapshot()
+            else:
+                tables[key] = stats.snapshot()
+        return {"tables": tables, "indexes": indexes}
+
+    def reset(self) -> None:
+        """Olvida todos los contadores (tests/benchmarks; la API nunca lo llama)"""
+        with self._lock:
+            self._objects = {}
+
+
+# Registro del proceso (compartido por DiskManager, BufferPool, BlockFile e índices)
+registry = StatsRegistry()
@@ -1,8 +1,11 @@
 from __future__ import annotations
+from contextlib import ExitStack, nullcontext
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
 import os
 from .schema import TableSchema
+from .record_codec import RecordCodec
+from .decoded_cache import shared_cache
 from indexes.base import IIndex
 from indexes.sequential import SequentialIndex
 from indexes.isam import ISAMIndex
@@ -21,23 +24,59 @@ class Table:
     name: str = ""
     index_type: str = "sequential"  # Tipo de índice a usar
     rebuild_indexes: bool = False  # Si debe reconstruir índices desde disco
+    _indexes_dirty: bool = field(default=False, init=False, repr=False)  # Cambios sin guardar (se guardan en el checkpoint)
 
     def __post_init__(self) -> None:
         self.name = self.schema.name
+        options = self._storage_options()
+        use_mmap = bool(options.get("mmap"))
+        compression = options.get("compression")
+        codec = RecordCodec.from_schema(self.schema)
         # Crear índice según el tipo especificado
         if self.schema.key not in self.indexes:
             if self.index_type == "isam":
-                self.indexes[self.schema.key] = ISAMIndex(key=self.schema.key, table_name=self.name)
+                self.indexes[self.schema.key] = ISAMIndex(key=self.schema.key, table_name=self.name,
+                                                          use_mmap=use_mmap, codec=codec,
+                                                          compression=compression)
             elif self.index_type == "ext_hash":
-                self.indexes[self.schema.key] = ExtendibleHashIndex(key=self.schema.key, table_name=self.name)
+                self.indexes[self.schema.key] = ExtendibleHashIndex(key=self.schema.key, table_name=self.name,
+                                                                    use_mmap=use_mmap, codec=codec,
+                                                                    compression=compression)
             elif self.index_type == "bplustree":
-                self.indexes[self.schema.key] = BPlusTreeIndex(key=self.schema.key, table_name=self.name)
+                self.indexes[self.schema.key] = BPlusTreeIndex(key=self.schema.key, table_name=self.name,
+                                                               use_mmap=use_mmap, codec=codec,
+                                                               compression=compression)
             else:  # default: sequential
-                self.indexes[self.schema.key] = SequentialIndex(key=self.schema.key, table_name=self.name)
+                self.indexes[self.schema.key] = SequentialIndex(key=self.schema.key, table_name=self.name,
+                                                                use_mmap=use_mmap, codec=codec,
+                                                                compression=compression)
         
         # Si se está restaurando desde disco, reconstruir índices
         if self.rebuild_indexes:
             self._rebuild_indexes_from_storage()
+        
+        # Los bloques de los índices se cachean (decodificados) en el buffer pool del storage;
+        # sin pool (Storage en memoria), en el decoded cache compartido
+        buffer_pool = getattr(self.storage, 'buffer_pool', None)
+        for idx in self.indexes.values():
+            idx.buffer_pool = buffer_pool
+            idx.decoded_cache = shared_cache if buffer_pool is None else None
+        
+        # Con WAL los índices se persisten en cada checkpoint, no en cada INSERT; solo si cambiaron en
+        # este proceso (una tabla restaurada sin rebuild_indexes tiene los índices vacíos en memoria)
+        if self._uses_wal():
+            self.storage.set_checkpoint_hook(self.name, self._checkpoint_indexes)
+            for idx in self.indexes.values():
+                idx.sync_overflow = False
+    
+    def _uses_wal(self) -> bool:
+        return getattr(self.storage, 'wal', None) is not None
+    
+    def _storage_options(self) -> Dict[str, Any]:
+        """Opciones de almacenamiento de la tabla (solo DiskStorage las soporta)"""
+        if hasattr(self.storage, 'get_table_options'):
+            return self.storage.get_table_options(self.name)
+        return {}
     
     def _rebuild_indexes_from_storage(self) -> None:
         """Restaura índices desde disco o los reconstruye si no existen"""
@@ -78,6 +117,12 @@ class Table:
                     # Para otros índices, pasar el path completo
                     load_path = str(index_path)
                     loaded_idx = type(idx).load(load_path)
+                    loaded_idx.use_mmap = getattr(idx, 'use_mmap', False)
+                    # Los bloques nuevos siguen la compresión actual de la tabla (los viejos se leen igual)
+                    loaded_idx.compression = getattr(idx, 'compression', None)
+                    # Índices sin codec persistido (formato anterior) adoptan el del schema
+                    if getattr(loaded_idx, 'codec', None) is None:
+                        loaded_idx.codec = getattr(idx, 'codec', None)
                     self.indexes[col_name] = loaded_idx
                     print(f"✅ Loaded {index_type} index from {load_path}")
                 except Exception as e:
@@ -104,26 +149,121 @@ class Table:
             index_filename = f"{self.name}_{index_type}"
             index_path = f"{self.storage.data_dir}/{index_filename}"
             idx.save(index_path)
+        self._indexes_dirty = False
+    
+    def _checkpoint_indexes(self) -> None:
+        """Hook de checkpoint: guarda los índices solo si un INSERT/DELETE los cambió desde el último guardado"""
+        if self._indexes_dirty:
+            self._save_indexes()
+
+    def _storage_lock(self):
+        """
+        Lock de mutaciones del storage (DiskStorage lo comparte con el background
+        writer); con mutation() el fsync del WAL se espera después de soltarlo.
+        """
+        mutation = getattr(self.storage, 'mutation', None)
+        if mutation is not None:
+            return mutation()
+        return getattr(self.storage, 'lock', None) or nullcontext()
 
     def load(self, rows: List[Dict[str, Any]]) -> None:
-        self.storage.load(self.name, rows)
+        with self._storage_lock():
+            self.storage.load(self.name, rows)
+            
+            # Usar build() si el índice lo soporta (más eficiente que add múltiples veces)
+            for idx in self.indexes.values():
+                if hasattr(idx, 'build'):
+                    idx.build(rows)
+                else:
+                    for r in rows:
+                        idx.add(r)
+            
+            # Guardar índices después de cargar datos
+            self._save_indexes()
+
+    def load_stream(self, chunks: Iterable[List[Dict[str, Any]]]) -> int:
+        """
+        Carga masiva en memoria acotada (tablas más grandes que la RAM).
         
-        # Usar build() si el índice lo soporta (más eficiente que add múltiples veces)
+        Cada chunk se agrega al heap y a los runs ordenados de cada índice ordenado
+        (ordenamiento externo: build_stream el principal, stream_sorter los
+        secundarios); recién después el merge de los runs escribe los bloques de
+        cada índice. Los demás (hash) se construyen con un scan paginado del heap,
+        sin cargar la tabla entera en una lista. Retorna las filas cargadas.
+        """
+        loaded = 0
+        tmp_dir = getattr(self.storage, 'data_dir', None)
+        tmp_dir = str(tmp_dir) if tmp_dir else None
+        main = self.indexes.get(self.schema.key)
+        if main is not None and not hasattr(main, 'build_stream'):
+            main = None
+        
+        bulk_load = getattr(self.storage, 'bulk_load', None)
+        with self._storage_lock(), (bulk_load(self.name) if bulk_load else nullcontext()), ExitStack() as stack:
+            sorters = {col: stack.enter_context(idx.stream_sorter(tmp_dir=tmp_dir))
+                       for col, idx in self.indexes.items() if idx is not main and hasattr(idx, 'stream_sorter')}
+            
+            def heap_rows():
+                nonlocal loaded
+                for chunk in chunks:
+                    self.storage.load(self.name, chunk)
+                    for sorter in sorters.values():
+                        sorter.add(chunk)
+                    loaded += len(chunk)
+                    yield from chunk
+            
+            if main is not None:
+                main.build_stream(heap_rows(), tmp_dir=tmp_dir)
+            else:
+                for _ in heap_rows():
+                    pass
+            for col, sorter in sorters.items():
+                self.indexes[col].build_sorted(sorter.merged())
+            
+            for col, idx in self.indexes.items():
+                if idx is main or col in sorters:
+                    continue
+                rows = self._scan_rows()
+                if hasattr(idx, 'build'):
+                    idx.build(rows)
+                else:
+                    for r in rows:
+                        idx.add(r)
+            
+            self._save_indexes()
+        return loaded
+    
+    def _scan_rows(self) -> Iterable[Dict[str, Any]]:
+        """Filas del heap con un scan paginado si el storage lo tiene (si no, read_all)"""
+        scan = getattr(self.storage, 'scan', None)
+        return scan(self.name) if scan is not None else self.storage.read_all(self.name)
+
+    def insert(self, row: Dict[str, Any]) -> None:
+        row = self.schema.coerce_row(row)
+        with self._storage_lock():
+            self.storage.load(self.name, [row])
+            for idx in self.indexes.values():
+                idx.add(row)
+            if self._uses_wal():
+                # El INSERT ya es durable en el WAL; los índices se guardan en el checkpoint
+                self._indexes_dirty = True
+                self.storage.maybe_checkpoint()
+            else:
+                # Guardar índices después de insertar
+                self._save_indexes()
+    
+    def reindex(self) -> None:
+        """Reconstruye los índices desde el heap (p. ej. tras recuperar el WAL) y los persiste"""
+        rows = self.storage.read_all(self.name)
         for idx in self.indexes.values():
+            if hasattr(idx, 'clear'):
+                idx.clear()
             if hasattr(idx, 'build'):
-                idx.build(rows)
+                if rows:
+                    idx.build(rows)
             else:
                 for r in rows:
                     idx.add(r)
-        
-        # Guardar índices después de cargar datos
-        self._save_indexes()
-
-    def insert(self, row: Dict[str, Any]) -> None:
-        self.storage.load(self.name, [row])
-        for idx in self.indexes.values():
-            idx.add(row)
-        # Guardar índices después de insertar
         self._save_indexes()
 
     def delete(self, key_value: Any) -> int:
@@ -131,34 +271,45 @@ class Table:
         Elimina registros con la clave dada usando index.remove()
         que elimina físicamente del disco.
         """
-        # Usar el índice principal para eliminar
-        idx = self.indexes.get(self.schema.key)
-        if idx and hasattr(idx, 'remove'):
-            # El índice se encarga de eliminar del disco
-            deleted = idx.remove(key_value)
+        key_value = self.schema.coerce(self.schema.key, key_value)
+        with self._storage_lock():
+            # Usar el índice principal para eliminar
+            idx = self.indexes.get(self.schema.key)
+            if idx and hasattr(idx, 'remove'):
+                # El índice se encarga de eliminar del disco
+                deleted = idx.remove(key_value)
+                # El heap libera el espacio (free-space map) para futuros INSERT
+                if hasattr(self.storage, 'delete_records'):
+                    self.storage.delete_records(self.name, self.schema.key, key_value)
+                if self._uses_wal():
+                    self._indexes_dirty = True
+                    self.storage.maybe_checkpoint()
+                return deleted
+            
+            # Fallback: sin índice
+            if hasattr(self.storage, 'delete_records'):
+                deleted = self.storage.delete_records(self.name, self.schema.key, key_value)
+                kept = self.storage.read_all(self.name)
+            else:
+                # Storage en memoria: reescribir la tabla completa
+                all_rows = self.storage.read_all(self.name)
+                kept = [r for r in all_rows if r[self.schema.key] != key_value]
+                deleted = len(all_rows) - len(kept)
+                self.storage._tables[self.name] = []
+                self.storage.load(self.name, kept)
+            
+            for k in list(self.indexes.keys()):
+                self.indexes[k].clear()
+            for r in kept:
+                for idx in self.indexes.values():
+                    idx.add(r)
+            self._indexes_dirty = True
+            
             return deleted
-        
-        # Fallback: implementación naive (solo si no hay índice)
-        all_rows = self.storage.read_all(self.name)
-        kept = [r for r in all_rows if r[self.schema.key] != key_value]
-        deleted = len(all_rows) - len(kept)
-        
-        if hasattr(self.storage, 'clear_table'):
-            self.storage.clear_table(self.name)
-        else:
-            self.storage._tables[self.name] = []
-        
-        self.storage.load(self.name, kept)
-        
-        for k in list(self.indexes.keys()):
-            self.indexes[k].clear()
-        for r in kept:
-            for idx in self.indexes.values():
-                idx.add(r)
-        
-        return deleted
 
     def select_eq(self, column: str, value: Any) -> List[Dict[str, Any]]:
+        # El literal se lleva al tipo de la columna una sola vez; las comparaciones son entre valores del mismo tipo
+        value = self.schema.coerce(column, value)
         idx = self.indexes.get(column)
         if idx:
             return idx.search(value)
@@ -172,6 +323,7 @@ class Table:
         return self.indexes.get(self.schema.key)
 
     def select_range(self, column: str, lo: Any, hi: Any) -> List[Dict[str, Any]]:
+        lo, hi = self.schema.coerce(column, lo), self.schema.coerce(column, hi)
         idx = self.indexes.get(column)
         if idx and hasattr(idx, "range_search"):
             return idx.range_search(lo, hi)
@@ -1,5 +1,8 @@
 import csv
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
+
+# Filas por chunk de iter_csv
+CSV_CHUNK_ROWS = 50_000
 
 def _convert_value(value: str) -> Any:
     """Intenta convertir un string al tipo apropiado"""
@@ -45,3 +48,16 @@ def load_csv(path: str) -> List[Dict[str, Any]]:
                 converted_row = {k: _convert_value(v) for k, v in row.items()}
                 rows.append(converted_row)
             return rows
+
+def iter_csv(path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    """Lee el CSV en chunks de hasta chunk_rows filas convertidas (memoria acotada).
+    Los bytes que no son UTF-8 válido se reemplazan por �, igual que load_csv."""
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append({k: _convert_value(v) for k, v in row.items()})
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
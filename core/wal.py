@@ -0,0 +1,221 @@
+"""
+Write-Ahead Log - Log append-only con LSN, group commit y checkpoints
+Un INSERT/DELETE solo paga un append (+ fsync compartido) en vez de reescribir
+catalog.json, el FSM y los índices; esos archivos se actualizan en el checkpoint.
+"""
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+
+class WriteAheadLog:
+    """
+    Log de registros (op, tabla, payload) etiquetados con un LSN creciente.
+
+    Formato del archivo:
+        [MAGIC][LSN base (uint64)]
+        por registro: [longitud (uint32)][crc32 (uint32)][LSN (uint64)][payload pickle]
+
+    Group commit: append() escribe el registro (sin fsync) y commit(lsn) espera a
+    que sea durable. Si otro hilo ya está haciendo fsync, se espera a que termine;
+    un solo fsync cubre todos los registros escritos hasta ese momento. Para que
+    los commits se agrupen, el llamador no debe tener tomado un lock que serialice
+    a los demás escritores mientras espera (ver DiskStorage.mutation).
+
+    checkpoint() vacía el log (escritura atómica) cuando los archivos de datos ya
+    reflejan todos los registros; el LSN base conserva la numeración.
+    checkpoint(upto_lsn) conserva los registros posteriores (checkpoint fuzzy).
+    """
+
+    MAGIC = b'WAL1'
+    FILE_HEADER = struct.Struct('<4sQ')
+    RECORD_HEADER = struct.Struct('<IIQ')
+
+    def __init__(self, path: Any, fsync: bool = True, commit_delay: float = 0.0):
+        """
+        Args:
+            path: Archivo del log
+            fsync: Forzar a disco en commit (False solo para tests/benchmarks)
+            commit_delay: Segundos que el líder espera antes del fsync para agrupar más commits
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        self.commit_delay = commit_delay
+
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._flushing = False
+
+        # Estadísticas
+        self.appends = 0
+        self.commits = 0
+        self.fsyncs = 0
+        self.checkpoints = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._base_lsn, self._next_lsn, valid_size = self._scan()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # Cola rota (crash a mitad de un append): se descarta
+        if os.fstat(self._fd).st_size != valid_size:
+            os.ftruncate(self._fd, valid_size)
+        self._size = valid_size
+        self._flushed_lsn = self._next_lsn - 1
+
+    def _scan(self) -> Tuple[int, int, int]:
+        """(LSN base, próximo LSN, bytes válidos) del log existente; crea uno vacío si no hay"""
+        if not self.path.exists() or self.path.stat().st_size < self.FILE_HEADER.size:
+            self._write_empty(1)
+            return 1, 1, self.FILE_HEADER.size
+
+        base_lsn = next_lsn = self._read_header()
+        valid_size = self.FILE_HEADER.size
+        for lsn, _, end in self._iter_raw():
+            next_lsn = lsn + 1
+            valid_size = end
+        return base_lsn, next_lsn, valid_size
+
+    def _read_header(self) -> int:
+        with open(self.path, 'rb') as f:
+            magic, base_lsn = self.FILE_HEADER.unpack(f.read(self.FILE_HEADER.size))
+        if magic != self.MAGIC:
+            raise ValueError(f"Not a WAL file: {self.path}")
+        return base_lsn
+
+    def _write_empty(self, base_lsn: int, records: bytes = b'') -> None:
+        """Reemplaza el log por uno vacío, o solo con `records` ya serializados (escritura atómica)"""
+        tmp_file = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(self.FILE_HEADER.pack(self.MAGIC, base_lsn) + records)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_file, self.path)
+
+    def _iter_raw(self) -> Iterator[Tuple[int, bytes, int]]:
+        """(LSN, payload, offset final) de cada registro íntegro; se detiene en la cola rota"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        offset = self.FILE_HEADER.size
+        while offset + self.RECORD_HEADER.size <= len(data):
+            length, crc, lsn = self.RECORD_HEADER.unpack_from(data, offset)
+            start = offset + self.RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) != length or zlib.crc32(payload, lsn & 0xFFFFFFFF) != crc:
+                break
+            offset = start + length
+            yield lsn, payload, offset
+
+    def append(self, op: str, table: str, payload: Any) -> int:
+        """Agrega un registro al log (sin esperar el fsync) y retorna su LSN"""
+        data = pickle.dumps((op, table, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            lsn = self._next_lsn
+            header = self.RECORD_HEADER.pack(len(data), zlib.crc32(data, lsn & 0xFFFFFFFF), lsn)
+            os.write(self._fd, header + data)
+            self._next_lsn += 1
+            self._size += len(header) + len(data)
+            self.appends += 1
+        return lsn
+
+    def commit(self, lsn: int) -> None:
+        """Espera a que el registro `lsn` (y todos los anteriores) sea durable"""
+        with self._flushed:
+            self.commits += 1
+            self._wait_durable(lsn)
+
+    def wait_durable(self, lsn: int) -> None:
+        """Como commit() pero sin contarlo (p. ej. WAL antes que datos al escribir una página)"""
+        with self._flushed:
+            self._wait_durable(lsn)
+
+    def _wait_durable(self, lsn: int) -> None:
+        """fsync compartido hasta cubrir `lsn`; requiere self._lock"""
+        while self._flushed_lsn < lsn:
+            if self._flushing:
+                # Otro hilo (el líder) ya está haciendo fsync: su flush nos puede cubrir
+                self._flushed.wait()
+                continue
+            self._flushing = True
+            self._lock.release()
+            try:
+                if self.commit_delay:
+                    time.sleep(self.commit_delay)
+                with_lsn = self._next_lsn - 1  # Todo lo escrito hasta aquí queda cubierto
+                if self.fsync:
+                    os.fsync(self._fd)
+            finally:
+                self._lock.acquire()
+                self._flushing = False
+            self.fsyncs += 1
+            self._flushed_lsn = max(self._flushed_lsn, with_lsn)
+            self._flushed.notify_all()
+
+    def log(self, op: str, table: str, payload: Any) -> int:
+        """append() + commit(): el registro es durable al retornar"""
+        lsn = self.append(op, table, payload)
+        self.commit(lsn)
+        return lsn
+
+    def records(self) -> Iterator[Tuple[int, str, str, Any]]:
+        """Registros (LSN, op, tabla, payload) desde el último checkpoint, en orden"""
+        for lsn, data, _ in self._iter_raw():
+            op, table, payload = pickle.loads(data)
+            yield lsn, op, table, payload
+
+    def checkpoint(self, upto_lsn: Optional[int] = None) -> int:
+        """
+        Vacía el log (los datos ya están en sus archivos); retorna el LSN del checkpoint.
+
+        Con upto_lsn (checkpoint fuzzy) solo se descartan los registros hasta ese
+        LSN: los posteriores se copian tal cual al log nuevo, que arranca en upto_lsn + 1.
+        """
+        with self._flushed:
+            while self._flushing:
+                self._flushed.wait()
+            checkpoint_lsn = self._next_lsn - 1 if upto_lsn is None else min(upto_lsn, self._next_lsn - 1)
+            retained = b''
+            if checkpoint_lsn < self._next_lsn - 1:
+                with open(self.path, 'rb') as f:
+                    data = f.read(self._size)
+                for lsn, payload, end in self._iter_raw():
+                    if lsn > checkpoint_lsn:
+                        retained = data[end - len(payload) - self.RECORD_HEADER.size:self._size]
+                        break
+            os.close(self._fd)
+            self._write_empty(checkpoint_lsn + 1, retained)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            self._base_lsn = checkpoint_lsn + 1
+            self._flushed_lsn = self._next_lsn - 1  # _write_empty también forzó lo retenido
+            self._size = self.FILE_HEADER.size + len(retained)
+            self.checkpoints += 1
+        return checkpoint_lsn
+
+    def size_bytes(self) -> int:
+        return self._size
+
+    @property
+    def last_lsn(self) -> int:
+        return self._next_lsn - 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    def get_stats(self) -> dict:
+        """Métricas del log (commits por fsync > 1 indica group commit efectivo)"""
+        return {
+            "last_lsn": self.last_lsn,
+            "log_bytes": self._size,
+            "appends": self.appends,
+            "commits": self.commits,
+            "fsyncs": self.fsyncs,
+            "commits_per_fsync": round(self.commits / self.fsyncs, 2) if self.fsyncs else None,
+            "checkpoints": self.checkpoints
+        }
@@ -0,0 +1,144 @@
+from typing import Any, Dict, Iterable, List, Optional
+from core.block_file import BlockFile
+from core.buffer_pool import BufferPool
+from core.compression import compress_payload, decompress_payload, get_compressor
+from core.decoded_cache import DecodedCache
+from core.disk_manager import Page
+from core.external_sort import ExternalSorter
+from core.prefetch import ReadAhead
+from core.record_codec import RecordCodec, decode_rows, encode_rows
+from core.stats import registry
+
+class BlockStore:
+    """
+    Bloques en disco de un índice (archivo .dat): serialización con codec y
+    compresión, lectura a través del buffer pool compartido o del decoded
+    cache, invalidación tras reescribir y contadores de I/O.
+    
+    Los índices la heredan y llaman a BlockStore.__init__ desde el suyo;
+    cada uno decide qué guarda en cada bloque (bloque, bucket u hoja).
+    """
+    
+    def __init__(self, use_mmap: bool = False, codec: Optional[RecordCodec] = None,
+                 compression: Optional[str] = None) -> None:
+        """
+        Args:
+            use_mmap: Leer bloques vía mmap (zero-copy) en vez de pread
+            codec: Codec binario de registros (del schema); None = pickle
+            compression: Compresión de bloques ("zlib", "lzma"); None = sin comprimir
+        """
+        # Archivo de datos en disco
+        self.data_file: Optional[str] = None
+        self._block_file: Optional[BlockFile] = None
+        self.use_mmap = use_mmap  # Opción de almacenamiento de la tabla
+        self.codec = codec  # Serialización de bloques (pickle si es None)
+        get_compressor(compression)  # Valida el nombre
+        self.compression = compression
+        self.sync_overflow = True  # False: el WAL de la tabla cubre add(); el overflow se persiste en save()
+        self.buffer_pool: Optional[BufferPool] = None  # Pool compartido (lo asigna Table); None = leer directo
+        self.decoded_cache: Optional[DecodedCache] = None  # Bloques decodificados cuando no hay buffer pool
+        
+        # Contador de I/O REAL
+        self._io_reads = 0
+        self._io_writes = 0
+        self._cache_hits = 0  # Bloques servidos por el buffer pool o el decoded cache (sin I/O)
+    
+    def _get_block_file(self) -> BlockFile:
+        """Retorna el BlockFile asociado a data_file (directorio de offsets en RAM)"""
+        if (self._block_file is None or self._block_file.path != self.data_file
+                or self._block_file.use_mmap != self.use_mmap):
+            self._block_file = BlockFile(self.data_file, use_mmap=self.use_mmap)
+        return self._block_file
+    
+    def _pool_file(self) -> str:
+        """Nombre del .dat en el buffer pool compartido"""
+        return f"index:{self.data_file}"
+    
+    def _load_block_page(self, block_no: int, data_bytes: Optional[bytes] = None) -> Page:
+        """Lee (si no vino del read-ahead) y decodifica un bloque; es el loader del buffer pool"""
+        block_bytes = data_bytes if data_bytes is not None else self._get_block_file().read_block(block_no)
+        self._io_reads += 1  # Contar I/O REAL
+        return Page(block_no, self._decode_block(block_bytes))
+    
+    def _read_cached_block(self, block_no: int, reader: Optional[ReadAhead] = None) -> List[Dict[str, Any]]:
+        """Bloque decodificado desde el buffer pool, el decoded cache (si hay uno asignado) o directo de disco"""
+        if self.buffer_pool is None:
+            return self._read_decoded_block(block_no, reader)
+        
+        name = self._pool_file()
+        self.buffer_pool.register_file(name, self._load_block_page)
+        data_bytes = None
+        if reader and not self.buffer_pool.contains(name, block_no):
+            data_bytes = reader.get(block_no)
+        reads = self._io_reads
+        page = self.buffer_pool.get_page(name, block_no, data_bytes)
+        if page is None:
+            # El loader de otro hilo falló o el bloque no existe: no hay página que devolver
+            raise EOFError(f"Cannot read block {block_no} of {self.data_file}")
+        if self._io_reads == reads:
+            self._cache_hits += 1
+        return list(page.data)  # Copia: los llamadores pueden modificar la lista
+    
+    def _read_decoded_block(self, block_no: int, reader: Optional[ReadAhead] = None) -> List[Dict[str, Any]]:
+        """Sin buffer pool: bloque desde el decoded cache (si hay uno asignado) o decodificado de disco"""
+        # Con buffer pool, los accesos lógicos los cuenta el pool
+        stats = registry.get(self._pool_file())
+        stats.logical_reads += 1
+        cache = self.decoded_cache
+        rows = cache.get(self.data_file, block_no) if cache is not None else None
+        if rows is not None:
+            self._cache_hits += 1
+            stats.cache_hits += 1
+            return list(rows)  # Copia: el bloque cacheado se comparte
+        rows = self._load_block_page(block_no, reader.get(block_no) if reader else None).data
+        if cache is None:
+            return rows
+        cache.put(self.data_file, block_no, rows)
+        return list(rows)
+    
+    def _discard_cached_blocks(self) -> None:
+        """Invalida los bloques cacheados tras reescribir o borrar el .dat"""
+        if self.buffer_pool is not None and self.data_file:
+            self.buffer_pool.discard_file(self._pool_file())
+        if self.decoded_cache is not None and self.data_file:
+            self.decoded_cache.invalidate(self.data_file)
+    
+    def _encode_block(self, rows: List[Dict[str, Any]]) -> bytes:
+        """Serializa un bloque con el codec y lo comprime si el índice usa compresión"""
+        return compress_payload(encode_rows(rows, self.codec), get_compressor(self.compression))
+    
+    def _decode_block(self, buf: Any) -> List[Dict[str, Any]]:
+        """Inverso de _encode_block (bloques sin cabecera de compresión se leen tal cual)"""
+        return decode_rows(decompress_payload(buf), self.codec)
+    
+    def get_io_stats(self) -> Dict[str, int]:
+        """Retorna estadísticas de I/O (disk_reads = lecturas físicas; cache_hits = bloques desde el pool)"""
+        return {
+            'disk_reads': self._io_reads,
+            'disk_writes': self._io_writes,
+            'cache_hits': self._cache_hits
+        }
+    
+    def reset_io_stats(self) -> None:
+        """Resetea contadores de I/O"""
+        self._io_reads = 0
+        self._io_writes = 0
+        self._cache_hits = 0
+
+
+class SortedBlockStore(BlockStore):
+    """
+    BlockStore de un índice ordenado por clave que se arma con build_sorted()
+    (sequential, ISAM, B+ tree): agrega la construcción por ordenamiento externo.
+    """
+    
+    def stream_sorter(self, run_rows: int = ExternalSorter.RUN_ROWS, tmp_dir: Optional[str] = None) -> ExternalSorter:
+        """Ordenamiento externo por la clave del índice: se alimenta por partes y termina en build_sorted(merged())"""
+        return ExternalSorter(self._get_key_value, run_rows, tmp_dir)
+    
+    def build_stream(self, rows: Iterable[Dict[str, Any]], run_rows: int = ExternalSorter.RUN_ROWS,
+                     tmp_dir: Optional[str] = None) -> None:
+        """build() para entradas que no entran en RAM: ordenamiento externo (runs en disco)"""
+        with self.stream_sorter(run_rows, tmp_dir) as sorter:
+            sorter.add(rows)
+            self.build_sorted(sorter.merged())
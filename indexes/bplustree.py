@@ -1,9 +1,12 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import pickle
 import os
+from core.prefetch import ReadAhead
+from core.record_codec import RecordCodec
 from .base import IIndex
+from .block_store import SortedBlockStore
 
-class BPlusTreeIndex(IIndex):
+class BPlusTreeIndex(SortedBlockStore, IIndex):
     """
     B+ Tree con I/O REAL
     
@@ -17,23 +20,28 @@ class BPlusTreeIndex(IIndex):
     Simplificación: Build estático desde datos ordenados (sin insert dinámico)
     """
     
-    def __init__(self, key: str, order: int = 20, table_name: Optional[str] = None) -> None:
+    def __init__(self, key: str, order: int = 20, table_name: Optional[str] = None,
+                 use_mmap: bool = False, codec: Optional[RecordCodec] = None,
+                 compression: Optional[str] = None) -> None:
         """
         Args:
             key: Nombre de la columna clave
             order: Orden del árbol (max claves por nodo)
             table_name: Nombre de tabla para nombres de archivo consistentes
+            use_mmap: Leer bloques vía mmap (zero-copy) en vez de pread
+            codec: Codec binario de registros (del schema); None = pickle
+            compression: Compresión de bloques ("zlib", "lzma"); None = sin comprimir
         """
         self.key = key
         self.order = order
         self.table_name = table_name
+        SortedBlockStore.__init__(self, use_mmap, codec, compression)
         
         # Nodos internos en RAM (árbol de navegación)
         # Cada nodo: {'keys': [...], 'children': [...]}
         self.root = None
         
         # Archivo de hojas en disco
-        self.data_file: Optional[str] = None
         self.num_leaves: int = 0
         
         # Índice de hojas en RAM: [(first_key, last_key), ...]
@@ -41,10 +49,6 @@ class BPlusTreeIndex(IIndex):
         
         # Overflow para inserciones (en RAM)
         self.overflow: List[Dict[str, Any]] = []
-        
-        # Contador de I/O REAL
-        self._io_reads = 0
-        self._io_writes = 0
     
     def _get_key_value(self, row: Dict[str, Any]) -> Any:
         """
@@ -77,16 +81,33 @@ class BPlusTreeIndex(IIndex):
         if not rows:
             return
         
-        # 1. Ordenar datos por clave
-        rows_sorted = sorted(rows, key=lambda r: self._get_key_value(r))
-        
-        # 2. Crear hojas (cada hoja tiene hasta 'order' registros)
-        leaves_temp = []
-        for i in range(0, len(rows_sorted), self.order):
-            leaf = rows_sorted[i:i+self.order]
-            leaves_temp.append(leaf)
+        # 1. Ordenar datos por clave (el resto en build_sorted)
+        self.build_sorted(sorted(rows, key=lambda r: self._get_key_value(r)))
+    
+    def build_sorted(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Construye el árbol desde filas ya ordenadas por clave, en streaming:
+        solo una hoja está en memoria a la vez (más el índice de hojas).
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
         
-        self.num_leaves = len(leaves_temp)
+        def leaves():
+            # 2. Crear hojas (cada hoja tiene hasta 'order' registros)
+            leaf = [first]
+            for row in rows:
+                if len(leaf) == self.order:
+                    yield leaf
+                    leaf = []
+                leaf.append(row)
+            yield leaf
+        
+        def encoded():
+            for leaf in leaves():
+                self.leaf_index.append((self._get_key_value(leaf[0]), self._get_key_value(leaf[-1])))
+                yield self._encode_block(leaf)
         
         # 3. ESCRIBIR hojas a disco (I/O REAL)
         if not self.data_file:
@@ -95,23 +116,12 @@ class BPlusTreeIndex(IIndex):
             else:
                 self.data_file = f"storage/bplustree_{id(self)}_leaves.dat"
         
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        
-        with open(self.data_file, 'wb') as f:
-            for leaf in leaves_temp:
-                leaf_bytes = pickle.dumps(leaf)
-                leaf_size = len(leaf_bytes)
-                # Escribir: tamaño (4 bytes) + datos
-                f.write(leaf_size.to_bytes(4, 'little'))
-                f.write(leaf_bytes)
-                self._io_writes += 1
-        
-        # 4. Construir índice de hojas en RAM (first_key, last_key)
+        # Escribir: tamaño (4 bytes) + datos, más el directorio de offsets.
+        # 4. El índice de hojas en RAM (first_key, last_key) se arma mientras tanto
         self.leaf_index = []
-        for leaf in leaves_temp:
-            first_key = self._get_key_value(leaf[0])
-            last_key = self._get_key_value(leaf[-1])
-            self.leaf_index.append((first_key, last_key))
+        self.num_leaves = self._get_block_file().write_blocks(encoded())
+        self._io_writes += self.num_leaves
+        self._discard_cached_blocks()
         
         # 5. Construir árbol interno en RAM (simplificado: solo 1 nivel)
         # Para un B+ Tree completo se necesitarían múltiples niveles
@@ -123,12 +133,13 @@ class BPlusTreeIndex(IIndex):
         # 6. Limpiar overflow
         self.overflow = []
     
-    def _read_leaf_from_disk(self, leaf_idx: int) -> List[Dict[str, Any]]:
+    def _read_leaf_from_disk(self, leaf_idx: int, reader: Optional[ReadAhead] = None) -> List[Dict[str, Any]]:
         """
-        Lee una hoja desde el archivo .dat en disco (I/O REAL).
+        Lee una hoja desde el archivo .dat en disco con un único pread (I/O REAL).
         
         Args:
             leaf_idx: Índice de la hoja (0-based)
+            reader: Read-ahead del recorrido en curso (opcional)
             
         Returns:
             Lista de registros en la hoja
@@ -136,26 +147,7 @@ class BPlusTreeIndex(IIndex):
         if not self.data_file or not os.path.exists(self.data_file):
             raise FileNotFoundError(f"Data file not found: {self.data_file}")
         
-        # I/O REAL: Abrir archivo y leer hoja específica
-        with open(self.data_file, 'rb') as f:
-            # Saltar hojas anteriores
-            for i in range(leaf_idx):
-                size_bytes = f.read(4)
-                if len(size_bytes) < 4:
-                    raise EOFError(f"Unexpected EOF while seeking leaf {leaf_idx}")
-                size = int.from_bytes(size_bytes, 'little')
-                f.seek(size, 1)  # Saltar datos de la hoja
-            
-            # Leer la hoja target
-            size_bytes = f.read(4)
-            if len(size_bytes) < 4:
-                raise EOFError(f"Cannot read leaf {leaf_idx}")
-            size = int.from_bytes(size_bytes, 'little')
-            leaf_bytes = f.read(size)
-            
-            self._io_reads += 1  # Contar I/O REAL
-            
-            return pickle.loads(leaf_bytes)
+        return self._read_cached_block(leaf_idx, reader)
     
     def _find_leaf_index(self, value: Any) -> int:
         """
@@ -226,21 +218,26 @@ class BPlusTreeIndex(IIndex):
         
         results = []
         
-        # Recorrer hojas relevantes
-        for leaf_idx in range(self.num_leaves):
-            first_key, last_key = self.leaf_index[leaf_idx]
-            
-            # Optimización: Saltar hojas fuera del rango
-            if last_key < lo:
-                continue  # Hoja completamente antes del rango
-            if first_key > hi:
-                break  # Hojas restantes están después del rango
-            
-            # Leer hoja desde DISCO
-            leaf = self._read_leaf_from_disk(leaf_idx)
-            
-            # Filtrar registros en rango
-            results.extend([r for r in leaf if lo <= self._get_key_value(r) <= hi])
+        # Recorrer hojas relevantes (las siguientes se leen por adelantado en segundo plano)
+        reader = self._get_block_file().read_ahead()
+        try:
+            for leaf_idx in range(self.num_leaves):
+                first_key, last_key = self.leaf_index[leaf_idx]
+                
+                # Optimización: Saltar hojas fuera del rango
+                if last_key < lo:
+                    continue  # Hoja completamente antes del rango
+                if first_key > hi:
+                    break  # Hojas restantes están después del rango
+                
+                # Leer hoja desde DISCO
+                leaf = self._read_leaf_from_disk(leaf_idx, reader)
+                
+                # Filtrar registros en rango
+                results.extend([r for r in leaf if lo <= self._get_key_value(r) <= hi])
+        finally:
+            if reader:
+                reader.close()
         
         # Agregar overflow
         results.extend([r for r in self.overflow if lo <= self._get_key_value(r) <= hi])
@@ -263,7 +260,7 @@ class BPlusTreeIndex(IIndex):
         """
         Escribe el overflow a un archivo separado en disco.
         """
-        if not self.data_file:
+        if not self.data_file or not self.sync_overflow:
             return
         
         overflow_file = self.data_file.replace('_leaves.dat', '_overflow.dat')
@@ -345,26 +342,11 @@ class BPlusTreeIndex(IIndex):
             else:
                 all_leaves.append(self._read_leaf_from_disk(i))
         
-        # Reescribir archivo completo
-        with open(self.data_file, 'wb') as f:
-            for leaf in all_leaves:
-                leaf_bytes = pickle.dumps(leaf)
-                leaf_size = len(leaf_bytes)
-                f.write(leaf_size.to_bytes(4, 'little'))
-                f.write(leaf_bytes)
-                self._io_writes += 1
-    
-    def get_io_stats(self) -> Dict[str, int]:
-        """Retorna estadísticas de I/O"""
-        return {
-            'disk_reads': self._io_reads,
-            'disk_writes': self._io_writes
-        }
-    
-    def reset_io_stats(self) -> None:
-        """Resetea contadores de I/O"""
-        self._io_reads = 0
-        self._io_writes = 0
+        # Reescribir archivo completo (y su directorio de offsets)
+        self._io_writes += self._get_block_file().write_blocks(
+            self._encode_block(leaf) for leaf in all_leaves
+        )
+        self._discard_cached_blocks()
     
     def clear(self) -> None:
         """Limpia el índice"""
@@ -372,8 +354,9 @@ class BPlusTreeIndex(IIndex):
         self.leaf_index.clear()
         self.overflow.clear()
         self.num_leaves = 0
-        if self.data_file and os.path.exists(self.data_file):
-            os.remove(self.data_file)
+        if self.data_file:
+            self._discard_cached_blocks()
+            self._get_block_file().delete()
         self.data_file = None
     
     def save(self, filepath: str) -> None:
@@ -386,7 +369,9 @@ class BPlusTreeIndex(IIndex):
             'leaf_index': self.leaf_index,
             'data_file': self.data_file,
             'num_leaves': self.num_leaves,
-            'overflow': self.overflow
+            'overflow': self.overflow,
+            'codec': self.codec.spec() if self.codec else None,
+            'compression': self.compression
         }
         
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -406,6 +391,8 @@ class BPlusTreeIndex(IIndex):
         self.data_file = data['data_file']
         self.num_leaves = data['num_leaves']
         self.overflow = data['overflow']
+        self.codec = RecordCodec(data['codec']) if data.get('codec') else None
+        self.compression = data.get('compression')
     
     @staticmethod
     def load_from(filepath: str) -> 'BPlusTreeIndex':
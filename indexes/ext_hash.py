@@ -1,9 +1,11 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 import pickle
 import os
+from core.record_codec import RecordCodec
 from .base import IIndex
+from .block_store import BlockStore
 
-class ExtendibleHashIndex(IIndex):
+class ExtendibleHashIndex(BlockStore, IIndex):
     """
     Extendible Hashing con I/O REAL
     
@@ -16,18 +18,24 @@ class ExtendibleHashIndex(IIndex):
     - Solo búsqueda por igualdad (no rangos)
     """
     
-    def __init__(self, key: str, global_depth: int = 2, bucket_size: int = 20, table_name: Optional[str] = None) -> None:
+    def __init__(self, key: str, global_depth: int = 2, bucket_size: int = 20, table_name: Optional[str] = None,
+                 use_mmap: bool = False, codec: Optional[RecordCodec] = None,
+                 compression: Optional[str] = None) -> None:
         """
         Args:
             key: Nombre de la columna clave
             global_depth: Profundidad inicial del directorio (bits de hash)
             bucket_size: Capacidad máxima de registros por bucket
             table_name: Nombre de tabla para nombres de archivo consistentes
+            use_mmap: Leer bloques vía mmap (zero-copy) en vez de pread
+            codec: Codec binario de registros (del schema); None = pickle
+            compression: Compresión de bloques ("zlib", "lzma"); None = sin comprimir
         """
         self.key = key
         self.global_depth = global_depth
         self.bucket_size = bucket_size
         self.table_name = table_name
+        BlockStore.__init__(self, use_mmap, codec, compression)
         
         # Directorio en RAM: índice → bucket_id
         # Varios índices pueden apuntar al mismo bucket (sharing)
@@ -37,7 +45,6 @@ class ExtendibleHashIndex(IIndex):
         self.local_depths: Dict[int, int] = {i: global_depth for i in range(2 ** global_depth)}
         
         # Archivo de datos en disco
-        self.data_file: Optional[str] = None
         self.num_buckets: int = 2 ** global_depth
         
         # Overflow para inserciones antes de reorganización (en RAM)
@@ -46,10 +53,6 @@ class ExtendibleHashIndex(IIndex):
         # Mapeo de bucket_id a posición en archivo (para lectura eficiente)
         # Se construye después de build() o remove()
         self._bucket_positions: Dict[int, int] = {}
-        
-        # Contador de I/O REAL
-        self._io_reads = 0
-        self._io_writes = 0
     
     def _get_key_value(self, row: Dict[str, Any]) -> Any:
         """
@@ -82,7 +85,7 @@ class ExtendibleHashIndex(IIndex):
         """
         return hash(value) & ((1 << depth) - 1)
     
-    def build(self, rows: List[Dict[str, Any]]) -> None:
+    def build(self, rows: Iterable[Dict[str, Any]]) -> None:
         """
         Construye el hash extensible con I/O REAL.
         
@@ -90,19 +93,22 @@ class ExtendibleHashIndex(IIndex):
         1. Distribuir datos en buckets según hash
         2. ESCRIBIR buckets a archivo .dat (I/O REAL)
         3. Manejar splits si buckets exceden capacidad
-        """
-        if not rows:
-            return
         
+        rows puede ser un iterador (p. ej. un scan paginado del heap): se recorre una vez.
+        """
         # Inicializar buckets temporales
         buckets_temp: Dict[int, List[Dict[str, Any]]] = {i: [] for i in range(2 ** self.global_depth)}
         
         # Distribuir datos por hash
+        count = 0
         for row in rows:
             key_value = self._get_key_value(row)
             hash_val = self._hash(key_value)
             bucket_id = self.directory[hash_val]
             buckets_temp[bucket_id].append(row)
+            count += 1
+        if not count:
+            return
         
         # Manejar splits si es necesario
         for bucket_id in list(buckets_temp.keys()):
@@ -137,8 +143,6 @@ class ExtendibleHashIndex(IIndex):
                 # Fallback a ID temporal (para tests)
                 self.data_file = f"storage/exthash_{id(self)}_buckets.dat"
         
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        
         # Crear mapeo de bucket_id a posición en archivo
         # IMPORTANTE: Solo escribir buckets que están realmente en uso (en el directorio)
         self._bucket_positions = {}
@@ -147,15 +151,12 @@ class ExtendibleHashIndex(IIndex):
         for position, bucket_id in enumerate(unique_bucket_ids):
             self._bucket_positions[bucket_id] = position
         
-        with open(self.data_file, 'wb') as f:
-            for bucket_id in unique_bucket_ids:
-                bucket = buckets_final.get(bucket_id, [])  # usar .get() por si acaso
-                bucket_bytes = pickle.dumps(bucket)
-                bucket_size = len(bucket_bytes)
-                # Escribir: tamaño (4 bytes) + datos
-                f.write(bucket_size.to_bytes(4, 'little'))
-                f.write(bucket_bytes)
-                self._io_writes += 1
+        # Escribir: tamaño (4 bytes) + datos, más el directorio de offsets
+        # (usar .get() por si acaso)
+        self._io_writes += self._get_block_file().write_blocks(
+            self._encode_block(buckets_final.get(bucket_id, [])) for bucket_id in unique_bucket_ids
+        )
+        self._discard_cached_blocks()
         
         self.num_buckets = len(unique_bucket_ids)
     
@@ -214,7 +215,7 @@ class ExtendibleHashIndex(IIndex):
     
     def _read_bucket_from_disk(self, bucket_id: int) -> List[Dict[str, Any]]:
         """
-        Lee un bucket desde el archivo .dat en disco (I/O REAL).
+        Lee un bucket desde el archivo .dat en disco con un único pread (I/O REAL).
         
         Args:
             bucket_id: Índice del bucket (0-based)
@@ -231,32 +232,14 @@ class ExtendibleHashIndex(IIndex):
         
         position = self._bucket_positions[bucket_id]
         
-        # I/O REAL: Abrir archivo y leer bucket específico
-        with open(self.data_file, 'rb') as f:
-            # Saltar buckets anteriores (por posición física, no por ID)
-            for i in range(position):
-                size_bytes = f.read(4)
-                if len(size_bytes) < 4:
-                    raise EOFError(f"Unexpected EOF while seeking bucket {bucket_id} at position {position}")
-                size = int.from_bytes(size_bytes, 'little')
-                f.seek(size, 1)  # Saltar datos del bucket
-            
-            # Leer el bucket target
-            size_bytes = f.read(4)
-            if len(size_bytes) < 4:
-                raise EOFError(f"Cannot read bucket {bucket_id}")
-            size = int.from_bytes(size_bytes, 'little')
-            bucket_bytes = f.read(size)
-            
-            self._io_reads += 1  # Contar I/O REAL
-            
-            return pickle.loads(bucket_bytes)
+        # I/O REAL: un pread en el offset de la posición física (no el ID), salvo que esté en el pool
+        return self._read_cached_block(position)
     
     def _write_overflow_to_disk(self) -> None:
         """
         Escribe el overflow a un archivo separado en disco.
         """
-        if not self.data_file:
+        if not self.data_file or not self.sync_overflow:
             return
         
         overflow_file = self.data_file.replace('_buckets.dat', '_overflow.dat')
@@ -383,37 +366,22 @@ class ExtendibleHashIndex(IIndex):
             for position, bucket_id in enumerate(unique_buckets):
                 self._bucket_positions[bucket_id] = position
             
-            with open(self.data_file, 'wb') as f:
-                for bucket_id in unique_buckets:
-                    bucket = all_buckets[bucket_id]
-                    bucket_bytes = pickle.dumps(bucket)
-                    bucket_size = len(bucket_bytes)
-                    f.write(bucket_size.to_bytes(4, 'little'))
-                    f.write(bucket_bytes)
-                    self._io_writes += 1
+            self._io_writes += self._get_block_file().write_blocks(
+                self._encode_block(all_buckets[bucket_id]) for bucket_id in unique_buckets
+            )
+            self._discard_cached_blocks()
         
         return deleted
     
-    def get_io_stats(self) -> Dict[str, int]:
-        """Retorna estadísticas de I/O"""
-        return {
-            'disk_reads': self._io_reads,
-            'disk_writes': self._io_writes
-        }
-    
-    def reset_io_stats(self) -> None:
-        """Resetea contadores de I/O"""
-        self._io_reads = 0
-        self._io_writes = 0
-    
     def clear(self) -> None:
         """Limpia el índice"""
         self.directory = list(range(2 ** self.global_depth))
         self.local_depths = {i: self.global_depth for i in range(2 ** self.global_depth)}
         self.overflow.clear()
         self.num_buckets = 2 ** self.global_depth
-        if self.data_file and os.path.exists(self.data_file):
-            os.remove(self.data_file)
+        if self.data_file:
+            self._discard_cached_blocks()
+            self._get_block_file().delete()
         self.data_file = None
     
     def save(self, filepath: str) -> None:
@@ -428,7 +396,9 @@ class ExtendibleHashIndex(IIndex):
             'num_buckets': self.num_buckets,
             'overflow': self.overflow,
             'table_name': self.table_name,
-            '_bucket_positions': self._bucket_positions
+            '_bucket_positions': self._bucket_positions,
+            'codec': self.codec.spec() if self.codec else None,
+            'compression': self.compression
         }
         
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -450,6 +420,8 @@ class ExtendibleHashIndex(IIndex):
         self.overflow = data['overflow']
         self.table_name = data.get('table_name')  # Compatible con versiones viejas
         self._bucket_positions = data.get('_bucket_positions', {})  # Compatible con versiones viejas
+        self.codec = RecordCodec(data['codec']) if data.get('codec') else None
+        self.compression = data.get('compression')
     
     @staticmethod
     def load_from(filepath: str) -> 'ExtendibleHashIndex':
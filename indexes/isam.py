@@ -1,10 +1,13 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from bisect import bisect_left, bisect_right
 import pickle
 import os
+from core.prefetch import ReadAhead
+from core.record_codec import RecordCodec
 from .base import IIndex
+from .block_store import SortedBlockStore
 
-class ISAMIndex(IIndex):
+class ISAMIndex(SortedBlockStore, IIndex):
     """
     ISAM (Indexed Sequential Access Method) - 3 niveles con I/O REAL
     
@@ -19,27 +22,25 @@ class ISAMIndex(IIndex):
     3. Leer bucket del DISCO con fopen/fseek/fread - 1 I/O READ real
     4. Buscar en bucket (RAM) - 0 I/O
     """
-    def __init__(self, key: str, fanout: int = 20, fanout_l2: int = 5, table_name: Optional[str] = None) -> None:
+    def __init__(self, key: str, fanout: int = 20, fanout_l2: int = 5, table_name: Optional[str] = None,
+                 use_mmap: bool = False, codec: Optional[RecordCodec] = None,
+                 compression: Optional[str] = None) -> None:
         self.key = key
         self.fanout = fanout
         self.fanout_l2 = fanout_l2
         self.table_name = table_name  # Nombre de tabla para generar nombres de archivo consistentes
+        SortedBlockStore.__init__(self, use_mmap, codec, compression)
         
         # Índices en RAM (solo claves, no datos completos)
         self.index_l1: List[Any] = []  # Primera clave de cada bucket
         self.index_l2: List[Any] = []  # Primera clave cada fanout_l2 buckets
         
         # Archivo de datos en disco (buckets)
-        self.data_file: Optional[str] = None
         self.num_buckets: int = 0
         
         # Overflow en RAM (inserciones post-build)
         self.overflow: Dict[int, List[Dict[str, Any]]] = {}
-        
-        # Contador de I/O REAL
-        self._io_reads = 0
-        self._io_writes = 0
-        
+    
     def build(self, rows: List[Dict[str, Any]]) -> None:
         """
         Construye el índice ISAM de 3 niveles con I/O REAL.
@@ -54,16 +55,33 @@ class ISAMIndex(IIndex):
         if not rows:
             return
             
-        # 1. Ordenar datos por clave
-        rows_sorted = sorted(rows, key=lambda r: self._get_key_value(r))
-        
-        # 2. Particionar en buckets
-        buckets_temp = []
-        for i in range(0, len(rows_sorted), self.fanout):
-            bucket = rows_sorted[i:i+self.fanout]
-            buckets_temp.append(bucket)
+        # 1. Ordenar datos por clave (el resto en build_sorted)
+        self.build_sorted(sorted(rows, key=lambda r: self._get_key_value(r)))
+    
+    def build_sorted(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Construye el ISAM desde filas ya ordenadas por clave, en streaming:
+        solo un bucket está en memoria a la vez (más L1/L2).
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
         
-        self.num_buckets = len(buckets_temp)
+        def buckets():
+            # 2. Particionar en buckets
+            bucket = [first]
+            for row in rows:
+                if len(bucket) == self.fanout:
+                    yield bucket
+                    bucket = []
+                bucket.append(row)
+            yield bucket
+        
+        def encoded():
+            for bucket in buckets():
+                self.index_l1.append(self._get_key_value(bucket[0]))
+                yield self._encode_block(bucket)
         
         # 3. ESCRIBIR buckets a disco (I/O REAL)
         if not self.data_file:
@@ -74,19 +92,12 @@ class ISAMIndex(IIndex):
                 # Fallback a ID temporal (para tests)
                 self.data_file = f"storage/isam_{id(self)}_buckets.dat"
         
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        
-        with open(self.data_file, 'wb') as f:
-            for bucket in buckets_temp:
-                bucket_bytes = pickle.dumps(bucket)
-                bucket_size = len(bucket_bytes)
-                # Escribir: tamaño (4 bytes) + datos
-                f.write(bucket_size.to_bytes(4, 'little'))
-                f.write(bucket_bytes)
-                self._io_writes += 1
-        
-        # 4. Construir L1: primera clave de cada bucket (EN RAM)
-        self.index_l1 = [self._get_key_value(bucket[0]) for bucket in buckets_temp]
+        # Escribir: tamaño (4 bytes) + datos, más el directorio de offsets.
+        # 4. L1 (primera clave de cada bucket, EN RAM) se arma mientras tanto
+        self.index_l1 = []
+        self.num_buckets = self._get_block_file().write_blocks(encoded())
+        self._io_writes += self.num_buckets
+        self._discard_cached_blocks()
         
         # 5. Construir L2: primera clave cada fanout_l2 buckets (EN RAM)
         self.index_l2 = []
@@ -132,36 +143,18 @@ class ISAMIndex(IIndex):
         
         return min(idx, self.num_buckets - 1)
     
-    def _read_bucket_from_disk(self, bucket_idx: int) -> List[Dict[str, Any]]:
+    def _read_bucket_from_disk(self, bucket_idx: int, reader: Optional[ReadAhead] = None) -> List[Dict[str, Any]]:
         """
-        LEE bucket desde DISCO con fopen/fseek/fread (I/O REAL).
+        LEE bucket desde DISCO con un único pread (I/O REAL).
         
         Formato del archivo:
-        [size_0 (4 bytes)][bucket_0 pickled][size_1 (4 bytes)][bucket_1 pickled]...
+        [size_0 (4 bytes)][bucket_0][size_1 (4 bytes)][bucket_1]...
+        El offset de cada bucket viene del directorio persistido (ver BlockFile).
         """
         if not self.data_file or not os.path.exists(self.data_file):
             raise FileNotFoundError(f"Data file not found: {self.data_file}")
         
-        # I/O REAL: Abrir archivo y leer bucket específico
-        with open(self.data_file, 'rb') as f:
-            # Saltar buckets anteriores para llegar al bucket_idx
-            for i in range(bucket_idx):
-                size_bytes = f.read(4)
-                if len(size_bytes) < 4:
-                    raise EOFError(f"Unexpected EOF while seeking bucket {bucket_idx}")
-                size = int.from_bytes(size_bytes, 'little')
-                f.seek(size, 1)  # Saltar los datos del bucket
-            
-            # Leer el bucket target
-            size_bytes = f.read(4)
-            if len(size_bytes) < 4:
-                raise EOFError(f"Cannot read bucket {bucket_idx}")
-            size = int.from_bytes(size_bytes, 'little')
-            bucket_bytes = f.read(size)
-            
-            self._io_reads += 1  # Contar I/O REAL
-            
-            return pickle.loads(bucket_bytes)
+        return self._read_cached_block(bucket_idx, reader)
     
     def _write_overflow_to_disk(self) -> None:
         """
@@ -169,7 +162,7 @@ class ISAMIndex(IIndex):
         
         Esto permite persistir las inserciones pendientes.
         """
-        if not self.data_file:
+        if not self.data_file or not self.sync_overflow:
             return
         
         overflow_file = self.data_file.replace('_buckets.dat', '_overflow.dat')
@@ -200,16 +193,6 @@ class ISAMIndex(IIndex):
         
         raise KeyError(f"Key '{self.key}' not found in row. Available keys: {list(row.keys())}")
     
-    def get_io_stats(self) -> Dict[str, int]:
-        """Retorna estadísticas de I/O REAL"""
-        stats = {
-            'disk_reads': self._io_reads,
-            'disk_writes': self._io_writes
-        }
-        self._io_reads = 0  # Reset después de leer
-        self._io_writes = 0
-        return stats
-    
     def search(self, value: Any) -> List[Dict[str, Any]]:
         """
         Búsqueda por igualdad con I/O REAL.
@@ -258,32 +241,37 @@ class ISAMIndex(IIndex):
         # 1. Encontrar bucket inicial
         start_bucket = self._find_bucket_index(lo)
         
-        # 2. Recorrer buckets desde start_bucket
-        for bucket_idx in range(start_bucket, self.num_buckets):
-            # OPTIMIZACIÓN: Verificar en L1 (RAM) ANTES de leer del disco
-            # Si la primera clave del bucket > hi, no hay necesidad de leer
-            if bucket_idx < len(self.index_l1) and self.index_l1[bucket_idx] > hi:
-                break  # ✅ Termina sin leer este bucket (ahorra 1 I/O)
-            
-            # Leer bucket del DISCO (I/O REAL)
-            bucket = self._read_bucket_from_disk(bucket_idx)
-            
-            # Buscar en el bucket
-            for record in bucket:
-                key_val = self._get_key_value(record)
-                if lo <= key_val <= hi:
-                    results.append(record)
-                elif key_val > hi:
-                    break
-            
-            # Buscar en overflow
-            if bucket_idx in self.overflow:
-                for record in self.overflow[bucket_idx]:
+        # 2. Recorrer buckets desde start_bucket (read-ahead de los siguientes en segundo plano)
+        reader = self._get_block_file().read_ahead()
+        try:
+            for bucket_idx in range(start_bucket, self.num_buckets):
+                # OPTIMIZACIÓN: Verificar en L1 (RAM) ANTES de leer del disco
+                # Si la primera clave del bucket > hi, no hay necesidad de leer
+                if bucket_idx < len(self.index_l1) and self.index_l1[bucket_idx] > hi:
+                    break  # ✅ Termina sin leer este bucket (ahorra 1 I/O)
+                
+                # Leer bucket del DISCO (I/O REAL)
+                bucket = self._read_bucket_from_disk(bucket_idx, reader)
+                
+                # Buscar en el bucket
+                for record in bucket:
                     key_val = self._get_key_value(record)
                     if lo <= key_val <= hi:
                         results.append(record)
                     elif key_val > hi:
                         break
+                
+                # Buscar en overflow
+                if bucket_idx in self.overflow:
+                    for record in self.overflow[bucket_idx]:
+                        key_val = self._get_key_value(record)
+                        if lo <= key_val <= hi:
+                            results.append(record)
+                        elif key_val > hi:
+                            break
+        finally:
+            if reader:
+                reader.close()
         
         return results
     
@@ -375,14 +363,11 @@ class ISAMIndex(IIndex):
             else:
                 all_buckets.append(self._read_bucket_from_disk(i))
         
-        # Reescribir archivo completo
-        with open(self.data_file, 'wb') as f:
-            for bucket in all_buckets:
-                bucket_bytes = pickle.dumps(bucket)
-                bucket_size = len(bucket_bytes)
-                f.write(bucket_size.to_bytes(4, 'little'))
-                f.write(bucket_bytes)
-                self._io_writes += 1
+        # Reescribir archivo completo (y su directorio de offsets)
+        self._io_writes += self._get_block_file().write_blocks(
+            self._encode_block(bucket) for bucket in all_buckets
+        )
+        self._discard_cached_blocks()
     
     def save(self, filepath: str) -> None:
         """
@@ -417,7 +402,9 @@ class ISAMIndex(IIndex):
             'data_file': self.data_file,
             'num_buckets': self.num_buckets,
             'overflow': self.overflow,
-            'fanout': self.fanout
+            'fanout': self.fanout,
+            'codec': self.codec.spec() if self.codec else None,
+            'compression': self.compression
         }
         with open(f"{base_path}_overflow.dat", 'wb') as f:
             pickle.dump(data, f)
@@ -456,21 +443,12 @@ class ISAMIndex(IIndex):
         idx.data_file = data['data_file']
         idx.num_buckets = data['num_buckets']
         idx.overflow = data['overflow']
+        if data.get('codec'):
+            idx.codec = RecordCodec(data['codec'])
+        idx.compression = data.get('compression')
         
         return idx
     
-    def get_io_stats(self) -> Dict[str, int]:
-        """Retorna estadísticas de I/O"""
-        return {
-            'disk_reads': self._io_reads,
-            'disk_writes': self._io_writes
-        }
-    
-    def reset_io_stats(self) -> None:
-        """Resetea contadores de I/O"""
-        self._io_reads = 0
-        self._io_writes = 0
-    
     def get_structure_info(self) -> dict:
         """Retorna información de la estructura del índice"""
         total_in_overflow = sum(len(ov) for ov in self.overflow.values())
@@ -1,10 +1,13 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Tuple, Optional
 import pickle
 import os
 from bisect import bisect_left, bisect_right
+from core.prefetch import ReadAhead
+from core.record_codec import RecordCodec
 from .base import IIndex
+from .block_store import SortedBlockStore
 
-class SequentialIndex(IIndex):
+class SequentialIndex(SortedBlockStore, IIndex):
     """
     Sequential File - Archivo secuencial ordenado con I/O REAL
     
@@ -16,31 +19,32 @@ class SequentialIndex(IIndex):
     - INSERT: Overflow primero, reorganiza si es necesario
     """
     
-    def __init__(self, key: str, block_size: int = 20, table_name: Optional[str] = None) -> None:
+    def __init__(self, key: str, block_size: int = 20, table_name: Optional[str] = None,
+                 use_mmap: bool = False, codec: Optional[RecordCodec] = None,
+                 compression: Optional[str] = None) -> None:
         """
         Args:
             key: Nombre de la columna clave
             block_size: Número de registros por bloque
             table_name: Nombre de tabla para nombres de archivo consistentes
+            use_mmap: Leer bloques vía mmap (zero-copy) en vez de pread
+            codec: Codec binario de registros (del schema); None = pickle
+            compression: Compresión de bloques ("zlib", "lzma"); None = sin comprimir
         """
         self.key = key
         self.block_size = block_size
         self.table_name = table_name
+        SortedBlockStore.__init__(self, use_mmap, codec, compression)
         
         # Índice de bloques en RAM: [(first_key, last_key), ...]
         self.block_index: List[Tuple[Any, Any]] = []
         
         # Archivo de datos en disco
-        self.data_file: Optional[str] = None
         self.num_blocks: int = 0
         
         # Overflow para inserciones (no ordenado, en RAM)
         self.overflow: List[Dict[str, Any]] = []
         
-        # Contador de I/O REAL
-        self._io_reads = 0
-        self._io_writes = 0
-        
         # Umbral para reorganización (cuando overflow > 10% del total)
         self.reorganize_threshold = 0.1
     
@@ -76,16 +80,33 @@ class SequentialIndex(IIndex):
         if not rows:
             return
         
-        # 1. Ordenar datos por clave
-        rows_sorted = sorted(rows, key=lambda r: self._get_key_value(r))
-        
-        # 2. Particionar en bloques
-        blocks_temp = []
-        for i in range(0, len(rows_sorted), self.block_size):
-            block = rows_sorted[i:i+self.block_size]
-            blocks_temp.append(block)
+        # 1. Ordenar datos por clave (el resto en build_sorted)
+        self.build_sorted(sorted(rows, key=lambda r: self._get_key_value(r)))
+    
+    def build_sorted(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Construye el archivo desde filas ya ordenadas por clave, en streaming:
+        solo un bloque está en memoria a la vez (más first/last key por bloque).
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
         
-        self.num_blocks = len(blocks_temp)
+        def blocks():
+            # 2. Particionar en bloques (el índice de claves se arma al escribir)
+            block = [first]
+            for row in rows:
+                if len(block) == self.block_size:
+                    yield block
+                    block = []
+                block.append(row)
+            yield block
+        
+        def encoded():
+            for block in blocks():
+                self.block_index.append((self._get_key_value(block[0]), self._get_key_value(block[-1])))
+                yield self._encode_block(block)
         
         # 3. ESCRIBIR bloques a disco (I/O REAL)
         if not self.data_file:
@@ -96,56 +117,27 @@ class SequentialIndex(IIndex):
                 # Fallback a ID temporal (para tests)
                 self.data_file = f"storage/sequential_{id(self)}_blocks.dat"
         
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        
-        with open(self.data_file, 'wb') as f:
-            for block in blocks_temp:
-                block_bytes = pickle.dumps(block)
-                block_size = len(block_bytes)
-                # Escribir: tamaño (4 bytes) + datos
-                f.write(block_size.to_bytes(4, 'little'))
-                f.write(block_bytes)
-                self._io_writes += 1
-        
-        # 4. Construir índice de claves en RAM
+        # Escribir: tamaño (4 bytes) + datos, más el directorio de offsets.
+        # 4. El índice de claves en RAM (first/last key por bloque) se arma mientras tanto
         self.block_index = []
-        for block in blocks_temp:
-            first_key = self._get_key_value(block[0])
-            last_key = self._get_key_value(block[-1])
-            self.block_index.append((first_key, last_key))
+        self.num_blocks = self._get_block_file().write_blocks(encoded())
+        self._io_writes += self.num_blocks
+        self._discard_cached_blocks()
         
         self.overflow = []
     
-    def _read_block(self, block_idx: int) -> List[Dict[str, Any]]:
+    def _read_block(self, block_idx: int, reader: Optional[ReadAhead] = None) -> List[Dict[str, Any]]:
         """
-        LEE bloque desde DISCO con fopen/fseek/fread (I/O REAL).
+        LEE bloque desde DISCO con un único pread (I/O REAL).
         
         Formato del archivo:
-        [size_0 (4 bytes)][block_0 pickled][size_1 (4 bytes)][block_1 pickled]...
+        [size_0 (4 bytes)][block_0][size_1 (4 bytes)][block_1]...
+        El offset de cada bloque viene del directorio persistido (ver BlockFile).
         """
         if not self.data_file or not os.path.exists(self.data_file):
             raise FileNotFoundError(f"Data file not found: {self.data_file}")
         
-        # I/O REAL: Abrir archivo y leer bloque específico
-        with open(self.data_file, 'rb') as f:
-            # Saltar bloques anteriores para llegar al block_idx
-            for i in range(block_idx):
-                size_bytes = f.read(4)
-                if len(size_bytes) < 4:
-                    raise EOFError(f"Unexpected EOF while seeking block {block_idx}")
-                size = int.from_bytes(size_bytes, 'little')
-                f.seek(size, 1)  # Saltar los datos del bloque
-            
-            # Leer el bloque target
-            size_bytes = f.read(4)
-            if len(size_bytes) < 4:
-                raise EOFError(f"Cannot read block {block_idx}")
-            size = int.from_bytes(size_bytes, 'little')
-            block_bytes = f.read(size)
-            
-            self._io_reads += 1  # Contar I/O REAL
-            
-            return pickle.loads(block_bytes)
+        return self._read_cached_block(block_idx, reader)
     
     def _write_overflow_to_disk(self) -> None:
         """
@@ -153,7 +145,7 @@ class SequentialIndex(IIndex):
         
         Esto permite persistir las inserciones pendientes.
         """
-        if not self.data_file:
+        if not self.data_file or not self.sync_overflow:
             return
         
         overflow_file = self.data_file.replace('_blocks.dat', '_overflow.dat')
@@ -191,13 +183,6 @@ class SequentialIndex(IIndex):
         
         return result_block
     
-    def get_io_stats(self) -> Dict[str, int]:
-        """Retorna y resetea estadísticas de I/O"""
-        stats = {'disk_reads': self._io_reads, 'disk_writes': self._io_writes}
-        self._io_reads = 0
-        self._io_writes = 0
-        return stats
-    
     def search(self, value: Any) -> List[Dict[str, Any]]:
         """
         Búsqueda por igualdad con I/O REAL.
@@ -241,22 +226,27 @@ class SequentialIndex(IIndex):
         # Encontrar bloque inicial (búsqueda binaria en índice, RAM)
         start_block = self._binary_search_block(lo)
         
-        # Leer bloques secuencialmente desde DISCO (I/O REAL)
-        for block_idx in range(start_block, self.num_blocks):
-            # Verificar con índice si el bloque puede contener datos
-            first_key, last_key = self.block_index[block_idx]
-            if first_key > hi:
-                break
-            
-            # Leer bloque desde DISCO (I/O REAL)
-            block = self._read_block(block_idx)
-            
-            for record in block:
-                key_val = self._get_key_value(record)
-                if lo <= key_val <= hi:
-                    results.append(record)
-                elif key_val > hi:
+        # Leer bloques secuencialmente desde DISCO (I/O REAL), con read-ahead de los siguientes
+        reader = self._get_block_file().read_ahead()
+        try:
+            for block_idx in range(start_block, self.num_blocks):
+                # Verificar con índice si el bloque puede contener datos
+                first_key, last_key = self.block_index[block_idx]
+                if first_key > hi:
                     break
+                
+                # Leer bloque desde DISCO (I/O REAL)
+                block = self._read_block(block_idx, reader)
+                
+                for record in block:
+                    key_val = self._get_key_value(record)
+                    if lo <= key_val <= hi:
+                        results.append(record)
+                    elif key_val > hi:
+                        break
+        finally:
+            if reader:
+                reader.close()
         
         # Buscar en overflow (RAM, 0 I/O)
         for record in self.overflow:
@@ -354,25 +344,14 @@ class SequentialIndex(IIndex):
         
         return deleted
     
-    def get_io_stats(self) -> Dict[str, int]:
-        """Retorna estadísticas de I/O"""
-        return {
-            'disk_reads': self._io_reads,
-            'disk_writes': self._io_writes
-        }
-    
-    def reset_io_stats(self) -> None:
-        """Resetea contadores de I/O"""
-        self._io_reads = 0
-        self._io_writes = 0
-    
     def clear(self) -> None:
         """Limpia el índice"""
         self.block_index.clear()
         self.overflow.clear()
         self.num_blocks = 0
-        if self.data_file and os.path.exists(self.data_file):
-            os.remove(self.data_file)
+        if self.data_file:
+            self._discard_cached_blocks()
+            self._get_block_file().delete()
         self.data_file = None
     
     def save(self, filepath: str) -> None:
@@ -384,7 +363,9 @@ class SequentialIndex(IIndex):
             'data_file': self.data_file,
             'num_blocks': self.num_blocks,
             'overflow': self.overflow,
-            'reorganize_threshold': self.reorganize_threshold
+            'reorganize_threshold': self.reorganize_threshold,
+            'codec': self.codec.spec() if self.codec else None,
+            'compression': self.compression
         }
         
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -407,5 +388,8 @@ class SequentialIndex(IIndex):
         instance.num_blocks = data.get('num_blocks', 0)
         instance.overflow = data['overflow']
         instance.reorganize_threshold = data.get('reorganize_threshold', 0.1)
+        if data.get('codec'):
+            instance.codec = RecordCodec(data['codec'])
+        instance.compression = data.get('compression')
         
         return instance
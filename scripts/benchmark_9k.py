@@ -3,12 +3,74 @@ Benchmark con el dataset de 9.5K registros YA CARGADO
 Usa las tablas existentes en storage (sin reconstruir)
 """
 
+import tempfile
 import time
+from core.block_file import BlockFile
+from core.disk_storage import DiskStorage
+from core.utils import load_csv
 from core.table import Table
 from sql.executor import Catalog
 from tabulate import tabulate
 import pandas as pd
 
+def _legacy_read_block(path: str, block_no: int) -> bytes:
+    """Lectura anterior: salta los prefijos de tamaño de todos los bloques previos"""
+    with open(path, 'rb') as f:
+        for _ in range(block_no):
+            size = int.from_bytes(f.read(4), 'little')
+            f.seek(size, 1)
+        size = int.from_bytes(f.read(4), 'little')
+        return f.read(size)
+
+def benchmark_block_lookup(data_file: str, repeats: int = 20):
+    """Compara leer el ÚLTIMO bloque saltando prefijos vs. pread con directorio de offsets"""
+    block_file = BlockFile(data_file)
+    last = block_file.num_blocks - 1
+    
+    start = time.perf_counter()
+    for _ in range(repeats):
+        _legacy_read_block(data_file, last)
+    scan_ms = (time.perf_counter() - start) * 1000 / repeats
+    
+    start = time.perf_counter()
+    for _ in range(repeats):
+        block_file.read_block(last)
+    pread_ms = (time.perf_counter() - start) * 1000 / repeats
+    
+    block_file.close()
+    return last + 1, scan_ms, pread_ms
+
+def benchmark_page_sizes(csv_path: str = "data/kaggle_Dataset .csv",
+                         page_sizes=(4096, 8192, 16384, 65536)):
+    """Carga el dataset con distintos page_size y mide un full scan en frío (páginas y bytes)"""
+    rows = load_csv(csv_path)
+    results = []
+    for page_size in page_sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            storage = DiskStorage(data_dir=data_dir)
+            storage.set_table_options("pages", page_size=page_size)
+            start = time.perf_counter()
+            storage.load("pages", rows)
+            load_ms = (time.perf_counter() - start) * 1000
+            storage.disk_manager.close_all()
+            
+            # Storage nuevo: buffer pool frío, el scan lee todo desde disco
+            cold = DiskStorage(data_dir=data_dir)
+            start = time.perf_counter()
+            cold.read_all("pages")
+            scan_ms = (time.perf_counter() - start) * 1000
+            io = cold.disk_manager.get_io_stats()
+            results.append({
+                'page_size': page_size,
+                'pages': cold.get_num_pages("pages"),
+                'load_ms': load_ms,
+                'scan_ms': scan_ms,
+                'scan_reads': io['disk_reads'],
+                'scan_bytes': io['bytes_read'],
+            })
+            cold.disk_manager.close_all()
+    return results
+
 def benchmark_index(table_name: str, index_name: str):
     """Benchmark de un índice usando tabla ya cargada"""
     
@@ -72,6 +134,18 @@ def benchmark_index(table_name: str, index_name: str):
     print(f"   ✓ Tiempo promedio: {results['select_eq_ms']:.2f} ms")
     print(f"   ✓ Lecturas promedio: {results['select_eq_reads']:.1f} I/O")
     
+    # 1b. Acceso directo al último bloque: salto de prefijos vs directorio de offsets
+    data_file = getattr(index, 'data_file', None)
+    if data_file:
+        num_blocks, scan_ms, pread_ms = benchmark_block_lookup(data_file)
+        results['last_block_scan_ms'] = round(scan_ms, 3)
+        results['last_block_pread_ms'] = round(pread_ms, 3)
+        print(f"   ✓ Último bloque ({num_blocks} bloques): "
+              f"salto secuencial {scan_ms:.3f} ms vs pread {pread_ms:.3f} ms")
+    else:
+        results['last_block_scan_ms'] = None
+        results['last_block_pread_ms'] = None
+    
     # 2. SELECT RANGE PEQUEÑO (10 registros)
     if hasattr(index, 'range_search'):
         print("\n2️⃣ SELECT RANGE PEQUEÑO (10 registros)...")
@@ -237,6 +311,11 @@ def print_comparison_table(all_results):
         best_range = min(range_results, key=lambda x: x['range_100_ms'])
         print(f"✅ RANGE más rápido: {best_range['index_type'].upper()} ({best_range['range_100_ms']:.2f} ms)")
     
+    lookup_results = [r for r in all_results if r.get('last_block_pread_ms')]
+    for r in lookup_results:
+        speedup = r['last_block_scan_ms'] / max(r['last_block_pread_ms'], 1e-6)
+        print(f"✅ {r['index_type'].upper()}: acceso al último bloque {speedup:.1f}x más rápido con directorio de offsets")
+    
     best_insert = min(all_results, key=lambda x: x['insert_ms'])
     print(f"✅ INSERT más rápido: {best_insert['index_type'].upper()} ({best_insert['insert_ms']:.2f} ms)")
     
@@ -279,6 +358,14 @@ def main():
         df.to_csv(output_file, index=False)
         print(f"\n💾 Resultados guardados en: {output_file}")
     
+    # Comparar tamaños de página (tablas temporales, no toca storage/)
+    print("\n📄 FULL SCAN POR TAMAÑO DE PÁGINA")
+    try:
+        page_results = benchmark_page_sizes()
+        print(tabulate(page_results, headers='keys', floatfmt='.2f'))
+    except FileNotFoundError as e:
+        print(f"❌ Dataset no encontrado: {e}")
+    
     print("\n" + "="*100)
     print("✅ BENCHMARK COMPLETADO")
     print("="*100)
@@ -12,12 +12,15 @@ def clean_storage():
     
     print("🧹 Limpiando storage completo...")
     
-    # 1. Limpiar catalog.json (dejar solo estructura vacía)
+    # 1. Limpiar catálogo (catalog.bin + catalog.log; catalog.json si es de una versión anterior)
     catalog_path = os.path.join(storage_dir, 'catalog.json')
     if os.path.exists(catalog_path):
         with open(catalog_path, 'w') as f:
             json.dump({}, f, indent=2)
-        print("   ✓ Catalog.json limpiado")
+    for file in ['catalog.bin', 'catalog.log']:
+        if os.path.exists(os.path.join(storage_dir, file)):
+            os.remove(os.path.join(storage_dir, file))
+    print("   ✓ Catálogo limpiado")
     
     # 2. Eliminar todos los archivos .dat
     deleted_dat = 0
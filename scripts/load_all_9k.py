@@ -1,118 +1,75 @@
 """
 Script para cargar las 4 tablas con el dataset completo (9.5K registros)
+El CSV se recorre dos veces (inferencia de tipos y parseo tipado, ambas en
+paralelo) y las filas convertidas se comparten entre las 4 tablas; cada tabla
+(heap + índice) se construye en su propio proceso (ProcessPoolExecutor con
+"spawn": el padre puede tener hilos vivos) y el catálogo se actualiza una sola
+vez al final.
 """
-import csv
+import multiprocessing
+import os
+import shutil
 import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from core.schema import TableSchema, Column
+from core.csv_ingest import infer_columns, iter_csv_parallel
+from core.disk_storage import DiskStorage
+from core.schema import TableSchema
 from core.table import Table
-from sql.executor import Catalog
-from indexes.sequential import SequentialIndex
-from indexes.isam import ISAMIndex
-from indexes.ext_hash import ExtendibleHashIndex
-from indexes.bplustree import BPlusTreeIndex
 
 CSV_PATH = Path("data") / "kaggle_Dataset .csv"
-
-def infer_type(value: str) -> str:
-    """Inferir tipo de dato"""
-    if not value or value == "":
-        return "TEXT"
-    try:
-        int(value)
-        return "INT"
-    except ValueError:
-        pass
-    try:
-        float(value)
-        return "FLOAT"
-    except ValueError:
-        pass
-    return "TEXT"
+STORAGE_PATH = Path("storage")
 
 def load_csv_data():
-    """Cargar CSV y crear schema"""
-    with open(CSV_PATH, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    """Inferir el schema (tipos y nullability sobre el archivo entero) y luego parsear el CSV con esos tipos"""
+    columns = infer_columns(str(CSV_PATH))
+    types = {col.name: col.type for col in columns}
+    rows = [row for chunk in iter_csv_parallel(str(CSV_PATH), types=types) for row in chunk]
     
     print(f"✓ CSV cargado: {len(rows)} registros")
     
     if not rows:
         raise ValueError("CSV vacío")
     
-    # Inferir schema
-    sample_row = rows[0]
-    columns = []
-    for col_name, val in sample_row.items():
-        col_type = infer_type(val)
-        columns.append(Column(name=col_name, type=col_type))
-    
     key_col = "Restaurant ID"
     schema = TableSchema(name="restaurants_temp", key=key_col, columns=columns)
     
     print(f"✓ Schema: {len(columns)} columnas, key={key_col}")
+    print("  " + ", ".join(f"{c.name}:{c.type}{'' if c.nullable else ' NOT NULL'}" for c in columns))
     
-    # Convertir tipos
-    converted_rows = []
-    for row in rows:
-        converted = {}
-        for col in schema.columns:
-            val = row.get(col.name, "")
-            if val == "" or val is None:
-                converted[col.name] = None
-            elif col.type == "INT":
-                converted[col.name] = int(val)
-            elif col.type == "FLOAT":
-                converted[col.name] = float(val)
-            else:
-                converted[col.name] = val
-        converted_rows.append(converted)
-    
-    return converted_rows, schema
+    return rows, schema
 
-def create_table_with_index(table_name: str, index_type: str, index_class, rows, schema):
-    """Crear una tabla con un índice específico"""
-    print(f"\n{'='*80}")
-    print(f"📦 Creando: {table_name} ({index_type})")
-    print(f"{'='*80}")
-    
-    # Crear catalog
-    catalog = Catalog()
-    
-    # Crear tabla en storage
-    catalog.storage.create_table(table_name)
+def create_table_with_index(table_name: str, index_type: str, rows, schema):
+    """
+    Crear una tabla con un índice específico (corre en un proceso del pool).
+    Cada proceso escribe solo los archivos de su tabla y usa un catálogo propio;
+    retorna la metadata para que el padre la registre (attach_tables).
+    """
+    catalog_dir = STORAGE_PATH / f".load_{table_name}"
+    storage = DiskStorage(data_dir=str(STORAGE_PATH), catalog_dir=str(catalog_dir))
     
     # Crear schema para esta tabla
     table_schema = TableSchema(name=table_name, key=schema.key, columns=schema.columns)
     
     # Guardar metadata
-    schema_dict = {
-        'name': table_schema.name,
-        'key': table_schema.key,
-        'columns': [{'name': c.name, 'type': c.type} for c in table_schema.columns]
-    }
-    catalog.storage.set_table_metadata(table_name, schema=schema_dict, index_type=index_type)
-    
-    # Crear tabla con índice
-    table = Table(schema=table_schema, storage=catalog.storage, index_type=index_type)
-    catalog.tables[table_name] = table
-    
-    # Cargar datos
-    print(f"📥 Cargando {len(rows)} registros...")
+    storage.set_table_metadata(table_name, schema=table_schema.to_dict(), index_type=index_type)
+    
+    # Crear tabla con índice y cargar datos
+    table = Table(schema=table_schema, storage=storage, index_type=index_type)
     start = time.time()
     table.load(rows)
     elapsed = time.time() - start
     
-    print(f"✓ Cargado en {elapsed:.2f}s ({len(rows)/elapsed:.0f} reg/s)")
-    
     # Obtener stats del índice
     idx = list(table.indexes.values())[0] if table.indexes else None
-    if idx:
-        io_stats = idx.get_io_stats()
-        print(f"  💾 I/O: {io_stats['disk_reads']}R / {io_stats['disk_writes']}W")
+    io_stats = idx.get_io_stats() if idx else None
     
-    return table
+    storage.flush_all()
+    storage.disk_manager.close_all()
+    meta = storage.get_table_metadata(table_name)
+    shutil.rmtree(catalog_dir, ignore_errors=True)
+    return table_name, meta, elapsed, io_stats
 
 def main():
     print("="*80)
@@ -121,41 +78,64 @@ def main():
     
     # Limpiar storage
     print("\n🧹 Limpiando storage...")
-    storage_path = Path("storage")
-    if storage_path.exists():
-        for file in storage_path.glob("*"):
-            if file.name != "catalog.json":  # Mantener catalog para no perder metadata
+    if STORAGE_PATH.exists():
+        for file in STORAGE_PATH.glob("*"):
+            if file.is_dir():
+                shutil.rmtree(file)  # Catálogos de una carga anterior interrumpida
+            elif file.name not in ("catalog.json", "catalog.bin", "catalog.log"):  # Mantener catalog para no perder metadata
                 file.unlink()
     else:
-        storage_path.mkdir(exist_ok=True)
+        STORAGE_PATH.mkdir(exist_ok=True)
     print("✓ Storage limpiado")
     
-    # Cargar datos
+    # Cargar datos (un solo parseo tipado para las 4 tablas)
     print("\n📂 Cargando CSV...")
     rows, schema = load_csv_data()
+    # Un solo sort: los índices ordenados reciben la entrada ya ordenada (timsort la recorre en O(n))
+    rows.sort(key=lambda r: r[schema.key])
     
     # Las 4 tablas a crear
     tables_config = [
-        ("restaurants_seq", "sequential", SequentialIndex),
-        ("restaurants_isam", "isam", ISAMIndex),
-        ("restaurants_hash", "extendiblehash", ExtendibleHashIndex),
-        ("restaurants_bplustree", "bplustree", BPlusTreeIndex),
+        ("restaurants_seq", "sequential"),
+        ("restaurants_isam", "isam"),
+        ("restaurants_hash", "ext_hash"),
+        ("restaurants_bplustree", "bplustree"),
     ]
     
     total_start = time.time()
     
-    for table_name, index_type, index_class in tables_config:
-        try:
-            create_table_with_index(table_name, index_type, index_class, rows, schema)
-        except Exception as e:
-            print(f"❌ Error creando {table_name}: {e}")
-            import traceback
-            traceback.print_exc()
+    workers = min(len(tables_config), os.cpu_count() or 1)
+    print(f"\n📦 Construyendo {len(tables_config)} tablas en {workers} procesos...")
+    created = {}
+    # spawn y no fork: un fork copiaría el estado de los hilos (bgwriter, read-ahead) sin los hilos
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(create_table_with_index, table_name, index_type, rows, schema): table_name
+            for table_name, index_type in tables_config
+        }
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                _, meta, elapsed, io_stats = future.result()
+            except Exception as e:
+                print(f"❌ Error creando {table_name}: {e}")
+                traceback.print_exc()
+                continue
+            created[table_name] = meta
+            print(f"✓ {table_name} ({meta['index_type']}): {len(rows)} registros en {elapsed:.2f}s "
+                  f"({len(rows)/elapsed:.0f} reg/s)")
+            if io_stats:
+                print(f"  💾 I/O: {io_stats['disk_reads']}R / {io_stats['disk_writes']}W")
+    
+    # Registrar las tablas en el catálogo (un solo snapshot)
+    storage = DiskStorage(data_dir=str(STORAGE_PATH))
+    storage.attach_tables(created)
+    storage.close()
     
     total_time = time.time() - total_start
     
     print("\n" + "="*80)
-    print(f"✅ 4 TABLAS CREADAS en {total_time:.2f}s")
+    print(f"✅ {len(created)} TABLAS CREADAS en {total_time:.2f}s")
     print("="*80)
     print("\n📊 Tablas disponibles:")
     print(f"   • restaurants_seq       → Sequential File (~{len(rows)} registros)")
@@ -0,0 +1,86 @@
+"""
+Replay de trazas del buffer pool: compara hit rates de LRU, CLOCK, 2Q, LRU-K y ARC
+sobre la misma secuencia de accesos (table, page_id).
+
+Uso:
+    python -m scripts.replay_buffer_trace                    # captura una carga mixta y la reproduce
+    python -m scripts.replay_buffer_trace traza.pkl 50 100   # traza guardada (pickle o CSV table,page_id)
+    python -m scripts.replay_buffer_trace --save traza.pkl   # solo captura y guarda la traza
+
+Una traza se captura con BufferPool.start_trace() / stop_trace().
+"""
+
+import csv
+import pickle
+import random
+import sys
+import tempfile
+from typing import List, Tuple
+from core.disk_storage import DiskStorage
+from core.replacement import POLICIES, compare
+from tabulate import tabulate
+
+
+def capture_mixed_trace(num_rows: int = 20000, lookups: int = 20000, scan_every: int = 2000,
+                        hot_fraction: float = 0.05, seed: int = 7) -> List[Tuple[str, int]]:
+    """
+    Carga una tabla temporal y registra una carga mixta: lecturas puntuales
+    (90% sobre un 5% de páginas calientes) intercaladas con read_all periódicos.
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = DiskStorage(pool_size=64, data_dir=tmp_dir)
+        storage.load("t", [{"id": i, "name": f"row-{i}", "v": "x" * 60} for i in range(num_rows)])
+        num_pages = storage.get_num_pages("t")
+        hot = max(1, int(num_pages * hot_fraction))
+
+        storage.buffer_pool.start_trace()
+        for i in range(lookups):
+            if i and i % scan_every == 0:
+                storage.read_all("t")
+            page_id = rng.randrange(hot) if rng.random() < 0.9 else rng.randrange(num_pages)
+            storage.read_page("t", page_id)
+        trace = storage.buffer_pool.stop_trace()
+        storage.close()
+    return trace
+
+
+def load_trace(path: str) -> List[Tuple[str, int]]:
+    """Lee una traza pickle (lista de (table, page_id)) o CSV con columnas table,page_id"""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            return [(row["table"], int(row["page_id"])) for row in csv.DictReader(f)]
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def replay(trace: List[Tuple[str, int]], capacities: List[int]) -> None:
+    results = compare(trace, capacities)
+    rows = []
+    for capacity in capacities:
+        by_policy = {r["policy"]: r["hit_rate"] for r in results if r["capacity"] == capacity}
+        rows.append([capacity] + [f"{by_policy[name] * 100:.1f}%" for name in POLICIES])
+    print(f"\n📊 Hit rate por política ({len(trace)} accesos, {len(set(trace))} páginas distintas)")
+    print(tabulate(rows, headers=["pool_size"] + list(POLICIES), tablefmt="grid"))
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--save"]:
+        trace = capture_mixed_trace()
+        with open(args[1], "wb") as f:
+            pickle.dump(trace, f)
+        print(f"💾 {len(trace)} accesos guardados en {args[1]}")
+        return
+
+    if args and not args[0].isdigit():
+        trace = load_trace(args[0])
+        args = args[1:]
+    else:
+        trace = capture_mixed_trace()
+    capacities = [int(a) for a in args] or [16, 32, 64, 128]
+    replay(trace, capacities)
+
+
+if __name__ == "__main__":
+    main()
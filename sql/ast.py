@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
 @dataclass
@@ -6,11 +6,13 @@ class CreateTable:
     name: str
     key: str
     columns: List[str]
+    options: Dict[str, Any] = field(default_factory=dict)  # WITH (page_size=..., mmap=...)
 
 @dataclass
 class CreateTableUsing:
     name: str
     index_type: str
+    options: Dict[str, Any] = field(default_factory=dict)
 
 @dataclass
 class LoadCSV:
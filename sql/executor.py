@@ -1,30 +1,33 @@
-from typing import Any, Dict, List
+import atexit
+import os
+from typing import Any, Dict, List, Optional
 from . import ast
 from core.schema import Column, TableSchema
 from core.table import Table
 from core.disk_storage import DiskStorage
-from core.utils import load_csv
+from core.csv_ingest import infer_columns, iter_csv_parallel
 
 class Catalog:
     def __init__(self) -> None:
-        self.storage = DiskStorage(data_dir="storage")
+        # INSERT/DELETE durables vía WAL (storage/wal.log); al abrir se reaplica el log.
+        # BUFFER_POOL_BYTES fija el presupuesto del buffer pool (p. ej. límite de memoria del contenedor)
+        pool_bytes = os.getenv("BUFFER_POOL_BYTES")
+        self.storage = DiskStorage(data_dir="storage", use_wal=True,
+                                   pool_bytes=int(pool_bytes) if pool_bytes else None,
+                                   adaptive_pool=os.getenv("BUFFER_POOL_ADAPTIVE") == "1")
         self.tables: Dict[str, Table] = {}
         # Restaurar tablas desde disco
         self._restore_tables()
+        # Checkpoint final al terminar el proceso (si no, el próximo arranque reaplica el log)
+        atexit.register(self.storage.close)
     
     def _restore_tables(self) -> None:
         """Restaura tablas desde el catálogo persistido"""
         for table_name in self.storage.list_tables():
             metadata = self.storage.get_table_metadata(table_name)
             if metadata and metadata.get("schema"):
-                # Reconstruir schema
-                schema_data = metadata["schema"]
-                columns = [Column(col["name"], col["type"]) for col in schema_data["columns"]]
-                schema = TableSchema(
-                    name=schema_data["name"],
-                    key=schema_data["key"],
-                    columns=columns
-                )
+                # Reconstruir schema (tipos y nullability)
+                schema = TableSchema.from_dict(metadata["schema"])
                 # Crear tabla con el índice especificado (sin cargar/reconstruir índices)
                 index_type = metadata.get("index_type", "sequential")
                 self.tables[table_name] = Table(
@@ -33,62 +36,91 @@ class Catalog:
                     index_type=index_type,
                     rebuild_indexes=False  # NO cargar/reconstruir - las tablas se cargan desde UI
                 )
+                # El WAL modificó el heap después del último checkpoint: los índices guardados están viejos
+                if table_name in self.storage.recovered_tables:
+                    self.tables[table_name].reindex()
 
-    def ensure(self, name: str, key: str, columns: List[str]) -> Table:
+    def ensure(self, name: str, key: str, columns: List[str], options: Optional[Dict[str, Any]] = None) -> Table:
         if name not in self.tables:
             schema = TableSchema(name=name, key=key, columns=[Column(c, "TEXT") for c in columns])
             self.storage.create_table(name)
+            if options:
+                # Opciones de almacenamiento (page_size, mmap) antes de crear los índices
+                self.storage.set_table_options(name, **options)
             self.tables[name] = Table(schema=schema, storage=self.storage)
         return self.tables[name]
 
+    def adopt_types(self, name: str, inferred: List[Column]) -> Table:
+        """
+        Recrea una tabla vacía con los tipos inferidos de un CSV en las columnas
+        declaradas (CREATE TABLE sin tipos las declara TEXT); el codec y los
+        índices se arman de nuevo con el schema tipado.
+        """
+        t = self.tables[name]
+        by_name = {col.name: col for col in inferred}
+        columns = [by_name.get(col.name, col) for col in t.schema.columns]
+        schema = TableSchema(name=name, columns=columns, key=t.schema.key)
+        self.storage.set_table_metadata(name, schema=schema.to_dict(), index_type=t.index_type)
+        self.tables[name] = Table(schema=schema, storage=self.storage, index_type=t.index_type)
+        return self.tables[name]
+
 catalog = Catalog()
 
 
 def execute(node: Any) -> Dict[str, Any]:
     if isinstance(node, ast.CreateTable):
-        t = catalog.ensure(node.name, node.key, node.columns)
-        return {"ok": True, "table": t.name}
+        t = catalog.ensure(node.name, node.key, node.columns, node.options)
+        return {"ok": True, "table": t.name, "options": catalog.storage.get_table_options(t.name)}
     
     if isinstance(node, ast.CreateTableUsing):
         # Crear tabla con tipo de índice especificado
         if node.name not in catalog.tables:
-            # Guardar el tipo de índice en metadata
+            # Guardar el tipo de índice y las opciones de almacenamiento en metadata
             catalog.storage.set_table_metadata(node.name, index_type=node.index_type)
-        return {"ok": True, "table": node.name, "index_type": node.index_type}
+            if node.options:
+                catalog.storage.set_table_options(node.name, **node.options)
+        return {"ok": True, "table": node.name, "index_type": node.index_type,
+                "options": catalog.storage.get_table_options(node.name)}
 
     if isinstance(node, ast.LoadCSV):
-        rows = load_csv(node.path)
-        # inferir key como primera columna si no existe tabla
+        # inferir schema (tipos y nullability sobre el archivo entero) si no existe tabla; key = primera columna
+        columns_list = None  # Inferencia = una pasada completa por el CSV: se hace a lo sumo una vez
         if node.table not in catalog.tables:
-            key = list(rows[0].keys())[0]
+            columns_list = infer_columns(node.path)
+            key = columns_list[0].name
             
             # Obtener el tipo de índice desde metadata
             metadata = catalog.storage.get_table_metadata(node.table)
             index_type = metadata.get("index_type", "sequential") if metadata else "sequential"
             
             # Crear schema (nota: orden correcto es name, columns, key)
-            columns_list = [Column(c, "TEXT") for c in rows[0].keys()]
             schema = TableSchema(name=node.table, columns=columns_list, key=key)
             
             # Guardar schema en metadata
-            schema_dict = {
-                "name": schema.name,
-                "key": schema.key,
-                "columns": [{"name": col.name, "type": col.type} for col in schema.columns]
-            }
-            catalog.storage.set_table_metadata(node.table, schema=schema_dict, index_type=index_type)
+            catalog.storage.set_table_metadata(node.table, schema=schema.to_dict(), index_type=index_type)
             
             # Crear tabla con el índice apropiado
             catalog.tables[node.table] = Table(schema=schema, storage=catalog.storage, index_type=index_type)
         
         t = catalog.tables[node.table]
         
+        # CREATE TABLE sin tipos declara todo TEXT: si la tabla sigue vacía, el schema adopta los tipos
+        # inferidos del archivo (codec y coerce de las consultas quedan en el mismo tipo que los valores).
+        # Un schema recién inferido ya tiene esos tipos aunque sean todos TEXT
+        if (columns_list is None and all(col.type == "TEXT" for col in t.schema.columns)
+                and next(catalog.storage.scan(node.table), None) is None):
+            t = catalog.adopt_types(node.table, infer_columns(node.path))
+        
+        # El CSV se parsea en paralelo por rangos (no se carga entero en memoria) con los tipos del schema
+        types = {col.name: col.type for col in t.schema.columns}
+        chunks = iter_csv_parallel(node.path, types=types)
+        
         # Resetear métricas de los índices antes de LOAD
         for idx in t.indexes.values():
             if hasattr(idx, 'reset_io_stats'):
                 idx.reset_io_stats()
         
-        t.load(rows)
+        loaded = t.load_stream(chunks)
         
         # Obtener estadísticas de I/O de los índices después de BUILD
         io_stats = {'disk_reads': 0, 'disk_writes': 0}
@@ -98,7 +130,7 @@ def execute(node: Any) -> Dict[str, Any]:
                 io_stats['disk_reads'] += index_io.get('disk_reads', 0)
                 io_stats['disk_writes'] += index_io.get('disk_writes', 0)
         
-        return {"ok": True, "loaded": len(rows), "io_stats": io_stats}
+        return {"ok": True, "loaded": loaded, "io_stats": io_stats}
 
     if isinstance(node, ast.InsertRow):
         t = catalog.tables[node.table]
@@ -7,9 +7,13 @@ _str = r'"([^"]+)"|\'([^\']+)\''
 _ident = r'[\w\s]+'  # Identificador que puede incluir espacios
 _col = r'"[^"]+"|\'[^\']+\'|[\w\s]+'  # Columna con o sin comillas (sin grupos de captura)
 
+# Opciones de almacenamiento: WITH (page_size=8192, mmap=true)
+_with = rf"(?:{_ws}WITH{_ws_opt}\(([^\)]*)\))?"
+TABLE_OPTIONS = ("page_size", "mmap", "compression")  # Las que entiende DiskStorage.set_table_options
+
 # CREATE TABLE con soporte para USING index_type
-CREATE = re.compile(rf"^CREATE{_ws}TABLE{_ws}(\w+){_ws_opt}\(([^\)]+)\){_ws_opt}KEY{_ws_opt}\((\w+)\){_ws_opt}$", re.I)
-CREATE_USING = re.compile(rf"^CREATE{_ws}TABLE{_ws}(\w+){_ws}USING{_ws}(\w+){_ws_opt}$", re.I)
+CREATE = re.compile(rf"^CREATE{_ws}TABLE{_ws}(\w+){_ws_opt}\(([^\)]+)\){_ws_opt}KEY{_ws_opt}\((\w+)\){_with}{_ws_opt}$", re.I)
+CREATE_USING = re.compile(rf"^CREATE{_ws}TABLE{_ws}(\w+){_ws}USING{_ws}(\w+){_with}{_ws_opt}$", re.I)
 
 # LOAD con soporte para FROM file
 LOAD = re.compile(rf"^CREATE{_ws}TABLE{_ws}(\w+){_ws}FROM{_ws}FILE{_ws}({_str})$", re.I)
@@ -33,21 +37,48 @@ def _clean_column_name(col: str) -> str:
     return col
 
 
+def _parse_options(s: str):
+    """Parsea 'page_size=16KB, mmap=true' -> {'page_size': 16384, 'mmap': True}"""
+    options = {}
+    if not s:
+        return options
+    for item in _split_csv(s):
+        if not item:
+            continue
+        if "=" not in item:
+            raise ValueError("Opción inválida en WITH: " + item)
+        name, value = (x.strip() for x in item.split("=", 1))
+        name = name.lower()
+        if name not in TABLE_OPTIONS:
+            raise ValueError(f"Opción desconocida en WITH: {name} (soportadas: {', '.join(TABLE_OPTIONS)})")
+        value = value.strip("\"'")
+        m = re.fullmatch(r"(\d+)\s*(KB?|MB?)?", value, re.I)
+        if m:
+            number, unit = m.groups()
+            multiplier = {"K": 1024, "M": 1024 * 1024}.get(unit[0].upper(), 1) if unit else 1
+            options[name] = int(number) * multiplier
+        elif value.lower() in ("true", "false", "on", "off"):
+            options[name] = value.lower() in ("true", "on")
+        else:
+            options[name] = value
+    return options
+
+
 def parse(sql: str):
     s = sql.strip().rstrip(";")
 
     # CREATE TABLE name USING index_type
     m = CREATE_USING.match(s)
     if m:
-        name, index_type = m.groups()
-        return ast.CreateTableUsing(name=name, index_type=index_type)
+        name, index_type, options = m.groups()
+        return ast.CreateTableUsing(name=name, index_type=index_type, options=_parse_options(options))
 
     # CREATE TABLE name (cols) KEY (key)
     m = CREATE.match(s)
     if m:
-        name, cols, key = m.groups()
+        name, cols, key, options = m.groups()
         columns = _split_csv(cols)
-        return ast.CreateTable(name=name, key=key, columns=columns)
+        return ast.CreateTable(name=name, key=key, columns=columns, options=_parse_options(options))
 
     # LOAD FROM 'file.csv' INTO table
     m = LOAD_FROM.match(s)
@@ -78,7 +109,7 @@ def parse(sql: str):
     m = INSERT.match(s)
     if m:
         table, cols, vals = m.groups()
-        cols_v = _split_csv(cols)
+        cols_v = [_clean_column_name(col) for col in _split_csv(cols)]
         vals_v = [eval(v) for v in _split_csv(vals)]
         return ast.InsertRow(table=table, values=dict(zip(cols_v, vals_v)))
 
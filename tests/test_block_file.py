@@ -0,0 +1,52 @@
+import pickle
+from core.block_file import BlockFile
+
+
+def test_block_file_offsets(tmp_path):
+    """Cada bloque se lee con el directorio de offsets, en cualquier orden"""
+    path = str(tmp_path / "t_blocks.dat")
+    blocks = [pickle.dumps([{"id": i, "name": "x" * i}]) for i in range(50)]
+
+    bf = BlockFile(path)
+    assert bf.write_blocks(blocks) == 50
+    assert bf.num_blocks == 50
+
+    for i in (49, 0, 17):
+        assert bf.read_block(i) == blocks[i]
+    bf.close()
+
+
+def test_block_file_legacy_without_sidecar(tmp_path):
+    """Archivos antiguos sin .off: el directorio se reconstruye y se persiste"""
+    path = tmp_path / "legacy_blocks.dat"
+    blocks = [pickle.dumps(list(range(i))) for i in range(10)]
+    with open(path, "wb") as f:
+        for b in blocks:
+            f.write(len(b).to_bytes(4, "little"))
+            f.write(b)
+
+    bf = BlockFile(str(path))
+    assert bf.num_blocks == 10
+    assert pickle.loads(bf.read_block(9)) == list(range(9))
+    assert (tmp_path / "legacy_blocks.dat.off").exists()
+
+    bf.delete()
+    assert not path.exists()
+
+
+def test_block_file_mmap(tmp_path):
+    """Modo mmap: read_block retorna un memoryview sin copiar"""
+    path = str(tmp_path / "m_blocks.dat")
+    blocks = [pickle.dumps({"block": i}) for i in range(5)]
+    bf = BlockFile(path, use_mmap=True)
+    bf.write_blocks(blocks)
+
+    view = bf.read_block(3)
+    assert isinstance(view, memoryview)
+    assert pickle.loads(view) == {"block": 3}
+    view.release()
+
+    # Reescritura: el mapeo anterior se descarta
+    bf.write_blocks(blocks + [pickle.dumps({"block": 5})])
+    assert pickle.loads(bf.read_block(5)) == {"block": 5}
+    bf.close()
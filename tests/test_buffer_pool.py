@@ -0,0 +1,175 @@
+import random
+import threading
+import pytest
+from core.buffer_pool import BufferPool, BufferPoolFullError
+from core.decoded_cache import estimate_size
+from core.disk_manager import DiskManager, Page
+from indexes.bplustree import BPlusTreeIndex
+from indexes.ext_hash import ExtendibleHashIndex
+
+
+def _pool(tmp_path, pool_size, num_pages, policy="lru"):
+    disk_manager = DiskManager(str(tmp_path))
+    for page_id in range(num_pages):
+        disk_manager.write_page("t", Page(page_id, [{"id": page_id, "v": 0}]))
+    return BufferPool(pool_size, disk_manager, policy=policy)
+
+
+def test_pinned_pages_are_not_evicted(tmp_path):
+    """La evicción salta las páginas pinned; si todas lo están, falla en vez de evictar una en uso"""
+    pool = _pool(tmp_path, 2, 4)
+    page = pool.get_page("t", 0, pin=True)
+    for page_id in (1, 2, 3):
+        pool.get_page("t", page_id)
+    assert pool.contains("t", 0) and pool.get_stats()["pinned_pages"] == 1
+
+    pool.get_page("t", 3, pin=True)
+    with pytest.raises(BufferPoolFullError):
+        pool.get_page("t", 1)
+    pool.unpin_page("t", 3)
+
+    page.data[0]["v"] = 7
+    pool.unpin_page("t", 0, is_dirty=True)
+    with pytest.raises(ValueError):
+        pool.unpin_page("t", 0)
+    pool.get_page("t", 1)
+    pool.get_page("t", 2)  # Evicta la página 0 (dirty): se escribe antes
+    assert pool.disk_manager.read_page("t", 0).data == [{"id": 0, "v": 7}]
+
+
+@pytest.mark.parametrize("policy", ["lru", "clock", "arc"])
+def test_concurrent_get_and_put(tmp_path, policy):
+    """Muchos hilos con get_page/put_page/pinned sobre un pool chico: ninguna escritura se pierde"""
+    num_threads, num_pages = 8, 64
+    pool = _pool(tmp_path, 12, num_pages, policy)
+    expected = [0] * num_pages
+    errors = []
+
+    def worker(tid: int):
+        rng = random.Random(tid)
+        own = [page_id for page_id in range(num_pages) if page_id % num_threads == tid]
+        try:
+            for i in range(300):
+                page_id = rng.choice(own)
+                if i % 2:
+                    with pool.pinned("t", page_id, write=True) as page:
+                        page.data[0]["v"] += 1
+                else:
+                    value = pool.get_page("t", page_id).data[0]["v"]
+                    pool.put_page("t", Page(page_id, [{"id": page_id, "v": value + 1}]))
+                expected[page_id] += 1
+                # Lecturas de páginas ajenas: siempre consistentes
+                other = rng.randrange(num_pages)
+                with pool.pinned("t", other) as page:
+                    assert page.data[0]["id"] == other
+        except Exception as e:  # pragma: no cover - se reporta abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(tid,)) for tid in range(num_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    stats = pool.get_stats()
+    assert stats["pages_in_cache"] <= 12 and stats["pinned_pages"] == 0
+    assert stats["cache_hits"] + stats["cache_misses"] == num_threads * 300 * 2
+    pool.flush_all()
+    assert [pool.disk_manager.read_page("t", i).data[0]["v"] for i in range(num_pages)] == expected
+
+
+def test_hits_and_writeback_outside_global_lock(tmp_path):
+    """Un hit no toma el lock global y las víctimas dirty se escriben sin tenerlo"""
+    pool = _pool(tmp_path, 2, 4)
+    pool.get_page("t", 0)
+    held, done = threading.Event(), threading.Event()
+
+    def holder():
+        with pool._lock:
+            held.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait(5)
+    try:
+        assert pool.get_page("t", 0).data[0]["id"] == 0  # No se bloquea
+    finally:
+        done.set()
+        thread.join()
+
+    owned = []
+    write_page = pool.disk_manager.write_page
+    pool.disk_manager.write_page = lambda name, page: (owned.append(pool._lock._is_owned()), write_page(name, page))
+    pool.put_page("t", Page(0, [{"id": 0, "v": 1}]))
+    pool.get_page("t", 1)
+    pool.get_page("t", 2)  # Evicta la página 0 (dirty)
+    assert owned == [False] and not pool.contains("t", 0)
+    assert pool.get_stats()["pinned_pages"] == 0
+
+
+@pytest.mark.parametrize("index_cls", [BPlusTreeIndex, ExtendibleHashIndex])
+def test_index_blocks_cached_in_shared_pool(tmp_path, index_cls):
+    """Lookups repetidos de una clave caliente salen del pool; reescribir el .dat invalida sus bloques"""
+    idx = index_cls(key="id")
+    idx.data_file = str(tmp_path / "idx_blocks.dat")
+    idx.build([{"id": i, "v": i} for i in range(500)])
+    idx.buffer_pool = BufferPool(8, DiskManager(str(tmp_path)))
+
+    for _ in range(5):
+        assert idx.search(42) == [{"id": 42, "v": 42}]
+    stats = idx.get_io_stats()
+    assert stats["disk_reads"] == 1 and stats["cache_hits"] == 4
+    # Cada bloque cuesta lo que ocupan sus filas decodificadas, no el page_size por defecto
+    blocks = list(idx.buffer_pool.cache.values())
+    assert idx.buffer_pool.get_cached_bytes() == sum(estimate_size(block.data) for block in blocks)
+
+    assert idx.remove(42) == 1
+    assert idx.search(42) == []
+    assert idx.search(43) == [{"id": 43, "v": 43}]
+
+
+def test_missing_index_block_raises_eof(tmp_path):
+    """Un bloque que el pool no puede entregar falla con EOFError (archivo y bloque), no con AttributeError"""
+    idx = BPlusTreeIndex(key="id")
+    idx.data_file = str(tmp_path / "idx_blocks.dat")
+    idx.build([{"id": i} for i in range(50)])
+    idx.buffer_pool = BufferPool(8, DiskManager(str(tmp_path)))
+    idx.buffer_pool.get_page = lambda *args, **kwargs: None
+    with pytest.raises(EOFError, match="block 0 of .*idx_blocks.dat"):
+        idx._read_cached_block(0)
+
+
+def test_byte_budget_resize_and_adaptive_quotas(tmp_path):
+    """Capacidad en bytes (páginas de 16 KB cuestan 4x), resize en caliente y cuotas que siguen a los hits fantasma"""
+    disk_manager = DiskManager(str(tmp_path))
+    disk_manager.configure_table("wide", page_size=16384)
+    for page_id in range(64):
+        disk_manager.write_page("hot", Page(page_id, [{"id": page_id}]))
+        disk_manager.write_page("cold", Page(page_id, [{"id": page_id}]))
+    for page_id in range(4):
+        disk_manager.write_page("wide", Page(page_id, [{"id": page_id}]))
+    pool = BufferPool(disk_manager=disk_manager, max_bytes=16 * 4096)
+
+    for page_id in range(4):
+        pool.get_page("wide", page_id)
+    assert pool.get_stats()["pages_in_cache"] == 4 and pool.get_cached_bytes() == 16 * 4096
+    pool.get_page("hot", 0)
+    assert pool.get_stats()["table_bytes"] == {"wide": 3 * 16384, "hot": 4096}
+
+    assert pool.resize(max_bytes=8 * 4096) == 2
+    assert pool.get_cached_bytes() <= 8 * 4096 and pool.pool_size == 8
+    with pytest.raises(ValueError):
+        pool.resize(pool_size=0)
+
+    # "hot" relee 12 páginas (no le alcanzan 8); "cold" recorre 64 sin reuso
+    pool.resize(max_bytes=16 * 4096, adaptive=True)
+    rng = random.Random(0)
+    for i in range(4000):
+        pool.get_page("hot", i % 12)
+        pool.get_page("cold", rng.randrange(64))
+    stats = pool.get_stats()
+    assert stats["rebalances"] > 0
+    assert stats["quotas"]["hot"] > stats["quotas"]["cold"]
+    assert stats["table_bytes"]["hot"] >= 12 * 4096
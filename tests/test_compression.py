@@ -0,0 +1,55 @@
+import pytest
+from core.compression import compress_payload, decompress_payload, get_compressor, is_compressed
+from core.disk_storage import DiskStorage
+from indexes.ext_hash import ExtendibleHashIndex
+
+
+def _rows(start, count):
+    return [{"id": i, "genre": "Action, Adventure, Sci-Fi", "title": f"Película {i % 7}"}
+            for i in range(start, start + count)]
+
+
+def test_compress_payload_header_and_fallback():
+    """Los payloads comprimidos llevan cabecera; si no conviene comprimir se guardan tal cual"""
+    data = b"abc" * 500
+    for name in ("zlib", "lzma"):
+        payload = compress_payload(data, get_compressor(name))
+        assert is_compressed(payload) and len(payload) < len(data)
+        assert decompress_payload(payload + b"\x00" * 10) == data
+    assert compress_payload(b"xy", get_compressor("zlib")) == b"xy"
+    assert decompress_payload(b"xy") == b"xy"
+    with pytest.raises(ValueError):
+        get_compressor("snappy")
+
+
+def test_mixed_compressed_and_plain_pages(tmp_path):
+    """Activar la compresión con datos existentes: el archivo mezcla páginas y se lee completo"""
+    storage = DiskStorage(pool_size=5, data_dir=str(tmp_path))
+    storage.create_table("t")
+    storage.load("t", _rows(0, 300))
+    plain_pages = storage.get_stats()["tables"]["t"]["pages"]
+
+    storage.set_table_options("t", compression="zlib")
+    storage.load("t", _rows(300, 300))
+    storage.flush_all()
+
+    reopened = DiskStorage(pool_size=5, data_dir=str(tmp_path))
+    assert reopened.read_all("t") == _rows(0, 600)
+    stats = reopened.get_stats()["tables"]["t"]
+    assert stats["compression"] == "zlib"
+    assert stats["compression_ratio"] > 2
+    assert stats["pages"] - plain_pages < plain_pages
+
+
+def test_index_blocks_compressed(tmp_path):
+    """Los bloques del índice se comprimen y la opción sobrevive save/load"""
+    rows = _rows(0, 200)
+    idx = ExtendibleHashIndex(key="id", compression="lzma")
+    idx.data_file = str(tmp_path / "t_hash.dat")
+    idx.build(rows)
+    assert is_compressed(idx._get_block_file().read_block(0))
+
+    idx.save(str(tmp_path / "t_hash.idx"))
+    loaded = ExtendibleHashIndex.load_from(str(tmp_path / "t_hash.idx"))
+    assert loaded.compression == "lzma"
+    assert loaded.search(123) == [rows[123]]
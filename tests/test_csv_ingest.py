@@ -0,0 +1,63 @@
+import csv
+from core.csv_ingest import batch_rows, infer_columns, infer_types, iter_csv_columns, split_ranges
+from core.schema import Column
+
+CSV_TEXT = (
+    "id,name,score,note\n"
+    + "".join(f'{i},"Resto {i}, ""el"" mejor",{i / 2},"línea 1\nlínea 2"\n' for i in range(200))
+    + "200,Sin nota,,\n"
+    + "x201,Tardío,1.5,ok\n"
+)
+
+
+def test_ranges_split_on_record_boundaries(tmp_path):
+    """Los rangos terminan en fin de registro aunque haya \\n dentro de campos entre comillas"""
+    path = tmp_path / "data.csv"
+    path.write_text(CSV_TEXT, encoding="utf-8")
+    header, ranges = split_ranges(str(path), chunk_bytes=256)
+    assert header == ["id", "name", "score", "note"] and len(ranges) > 10
+
+    data = path.read_bytes()
+    parsed = [row for start, end in ranges
+              for row in csv.reader(data[start:end].decode("utf-8").splitlines(keepends=True))]
+    assert parsed == list(csv.reader(CSV_TEXT.splitlines(keepends=True)))[1:]
+
+
+def test_typed_column_batches_in_parallel(tmp_path):
+    """Conversión por columna con vacíos -> None y respaldo para valores que no se ajustan al tipo dado"""
+    path = tmp_path / "data.csv"
+    path.write_text(CSV_TEXT, encoding="utf-8")
+    types = {"id": "INT", "name": "TEXT", "score": "FLOAT", "note": "TEXT"}
+
+    serial = list(iter_csv_columns(str(path), types, workers=1, chunk_bytes=512))
+    parallel = list(iter_csv_columns(str(path), types, workers=2, chunk_bytes=512))
+    assert serial == parallel
+
+    rows = [row for batch in serial for row in batch_rows(batch)]
+    assert len(rows) == 202
+    assert rows[3] == {"id": 3, "name": 'Resto 3, "el" mejor', "score": 1.5, "note": "línea 1\nlínea 2"}
+    assert rows[200] == {"id": 200, "name": "Sin nota", "score": None, "note": ""}
+    assert rows[201]["id"] == "x201"  # No es INT: se convierte como load_csv
+
+
+def test_infer_columns_over_whole_file(tmp_path):
+    """Los tipos salen del archivo entero (un valor al final amplía el tipo) con BOOL Yes/No y nullability"""
+    path = tmp_path / "data.csv"
+    path.write_text("id,open,price,code\n"
+                    + "".join(f"{i},{'Yes' if i % 2 else 'no'},{i},{i}\n" for i in range(300))
+                    + "300,,2.5,c300\n", encoding="utf-8")
+    columns = infer_columns(str(path), workers=2, chunk_bytes=256)
+    assert columns == [Column("id", "INT", False), Column("open", "BOOL", True),
+                       Column("price", "FLOAT", False), Column("code", "TEXT", False)]
+    assert infer_types(str(path)) == {c.name: c.type for c in columns}
+
+    rows = [row for batch in iter_csv_columns(str(path), workers=1, chunk_bytes=256) for row in batch_rows(batch)]
+    assert rows[1] == {"id": 1, "open": True, "price": 1.0, "code": "1"}
+    assert rows[300] == {"id": 300, "open": None, "price": 2.5, "code": "c300"}
+
+
+def test_infer_only_exact_numeric_literals(tmp_path):
+    """nan, inf, 1_000 o números con espacios no hacen FLOAT/INT a una columna: quedan TEXT"""
+    path = tmp_path / "data.csv"
+    path.write_text("id,a,b,c,d\n1,nan,1_000, 7,2.5\n2,inf,2000,8,-1e3\n3,1.5,3,9,.5\n", encoding="utf-8")
+    assert infer_types(str(path), workers=1) == {"id": "INT", "a": "TEXT", "b": "TEXT", "c": "TEXT", "d": "FLOAT"}
@@ -0,0 +1,85 @@
+import os
+import pytest
+from core.disk_manager import DiskManager, Page, PageOverflowError
+
+
+def test_fd_cache_reuses_descriptor(tmp_path):
+    """Lecturas/escrituras repetidas reutilizan el mismo descriptor"""
+    dm = DiskManager(str(tmp_path))
+    for i in range(5):
+        dm.write_page("t", Page(i, [{"id": i}]))
+    for i in range(5):
+        assert dm.read_page("t", i).data == [{"id": i}]
+
+    stats = dm.get_io_stats()
+    assert stats["fd_misses"] == 1
+    assert stats["fd_hits"] == 9
+    assert stats["open_files"] == 1
+
+
+def test_fd_cache_lru_and_close(tmp_path):
+    """El número de descriptores abiertos está acotado y delete/clear los cierran"""
+    dm = DiskManager(str(tmp_path), max_open_files=2)
+    for name in ("a", "b", "c"):
+        dm.write_page(name, Page(0, [name]))
+    assert dm.get_io_stats()["open_files"] == 2
+
+    # "a" fue evictado pero sigue legible (se reabre)
+    assert dm.read_page("a", 0).data == ["a"]
+
+    dm.clear_table("a")
+    assert dm.get_num_pages("a") == 0
+    dm.delete_table("b")
+    assert not dm.get_table_file("b").exists()
+    assert "a" not in dm._fds and "b" not in dm._fds
+    dm.close_all()
+
+
+def test_evicted_fd_stays_open_while_in_use(tmp_path):
+    """Un descriptor que sale del LRU (o de close_table) mientras otro hilo lo usa se cierra recién al soltarlo"""
+    dm = DiskManager(str(tmp_path), max_open_files=1)
+    dm.write_page("a", Page(0, ["a"]))
+    with dm._use_fd("a") as fd:
+        dm.write_page("b", Page(0, ["b"]))  # Evicta "a" del LRU
+        dm.close_all()
+        assert "a" not in dm._fds
+        assert dm.read_page("a", 0, os.pread(fd, Page.PAGE_SIZE, 0)).data == ["a"]
+    with pytest.raises(OSError):
+        os.fstat(fd)
+    assert dm.read_page("a", 0).data == ["a"]
+    dm.close_all()
+
+
+def test_mmap_read_and_remap(tmp_path):
+    """Modo mmap: lecturas desde el mapeo, que se rehace cuando el archivo crece"""
+    dm = DiskManager(str(tmp_path))
+    dm.configure_table("m", mmap=True)
+    dm.write_page("m", Page(0, [{"id": 0}]))
+    assert dm.read_page("m", 0).data == [{"id": 0}]
+
+    dm.write_page("m", Page(1, [{"id": 1}]))
+    assert dm.read_page("m", 1).data == [{"id": 1}]
+    assert dm.read_page("m", 2) is None
+    assert dm.get_io_stats()["remaps"] == 2
+
+    dm.delete_table("m")
+    assert dm.get_io_stats()["mapped_files"] == 0
+
+
+def test_write_page_rejects_oversized_page(tmp_path):
+    """Una página que no cabe en PAGE_SIZE lanza error en vez de truncarse"""
+    dm = DiskManager(str(tmp_path))
+    with pytest.raises(PageOverflowError):
+        dm.write_page("t", Page(0, [{"blob": "x" * Page.PAGE_SIZE}]))
+    assert dm.read_page("t", 0) is None
+
+
+def test_write_pages_bulk(tmp_path):
+    """write_pages escribe corridas consecutivas con pocos pwrite grandes"""
+    dm = DiskManager(str(tmp_path))
+    pages = [Page(i, [{"id": i}]) for i in range(10)] + [Page(12, [{"id": 12}])]
+    assert dm.write_pages("t", pages, max_write_bytes=4 * Page.PAGE_SIZE) == 4
+    assert dm.get_num_pages("t") == 13
+    assert dm.read_page("t", 9).data == [{"id": 9}]
+    assert dm.read_page("t", 12).data == [{"id": 12}]
+    assert dm.get_io_stats()["disk_writes"] == 11
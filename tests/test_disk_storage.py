@@ -2,6 +2,8 @@
 Test de persistencia en disco
 Verifica que DiskStorage funcione correctamente
 """
+import json
+import pytest
 from core.disk_storage import DiskStorage
 import time
 
@@ -135,6 +137,149 @@ def test_buffer_pool_lru():
     print("=" * 80)
 
 
+def test_byte_budgeted_pages_and_overflow_chain(tmp_path):
+    """Las páginas se llenan por bytes y un registro grande usa una cadena de overflow"""
+    storage = DiskStorage(pool_size=4, data_dir=str(tmp_path))
+    storage.create_table("packed")
+    small = [{"id": i, "value": i * 10} for i in range(300)]
+    big = {"id": 300, "value": "x" * 10000}
+    records = small[:150] + [big] + small[150:]
+    storage.load("packed", records)
+
+    # 300 registros pequeños caben en 2 páginas; el grande ocupa 3 de overflow
+    assert storage.get_num_pages("packed") == 5
+    # La carga masiva no pasa por el buffer pool
+    assert storage.buffer_pool.get_stats()["pages_in_cache"] == 0
+    reopened = DiskStorage(pool_size=2, data_dir=str(tmp_path))
+    assert reopened.read_all("packed") == records
+    head = next(i for i in range(5) if reopened.read_page("packed", i) == [big])
+    assert reopened.read_page("packed", head + 1) == []
+
+
+def test_page_size_per_table(tmp_path):
+    """page_size por tabla: se persiste en el catálogo y las métricas se miden en bytes"""
+    storage = DiskStorage(data_dir=str(tmp_path))
+    storage.set_table_options("wide", page_size=16384)
+    records = [{"id": i, "text": "y" * 200} for i in range(200)]
+    storage.load("wide", records)
+
+    reopened = DiskStorage(data_dir=str(tmp_path))
+    assert reopened.get_table_options("wide")["page_size"] == 16384
+    assert reopened.read_all("wide") == records
+    stats = reopened.disk_manager.get_io_stats()
+    assert stats["bytes_read"] == stats["disk_reads"] * 16384
+    assert reopened.disk_manager.get_table_size("wide") == reopened.get_num_pages("wide") * 16384
+
+    with pytest.raises(ValueError):
+        reopened.set_table_options("wide", page_size=8192)  # tabla con datos
+    with pytest.raises(ValueError):
+        reopened.set_table_options("other", page_size=5000)  # no es potencia de 2
+
+
+def test_single_row_inserts_fill_tail_page(tmp_path):
+    """Inserts de una fila se agregan a la tail page en vez de ocupar una página cada uno"""
+    storage = DiskStorage(data_dir=str(tmp_path))
+    for i in range(100):
+        storage.load("ins", [{"id": i, "value": i * 10}])
+
+    assert storage.get_num_pages("ins") == 1
+    assert storage.get_table_metadata("ins")["num_records"] == 100
+    reopened = DiskStorage(data_dir=str(tmp_path))
+    assert reopened.read_all("ins") == [{"id": i, "value": i * 10} for i in range(100)]
+
+
+def test_delete_frees_space_for_inserts(tmp_path):
+    """DELETE libera espacio en el FSM y los INSERT lo reutilizan: el archivo no crece"""
+    storage = DiskStorage(data_dir=str(tmp_path))
+    storage.set_table_metadata("churn", schema={
+        "name": "churn", "key": "id",
+        "columns": [{"name": "id", "type": "INT"}, {"name": "text", "type": "TEXT"}],
+    })
+    storage.load("churn", [{"id": i, "text": "z" * 100} for i in range(300)])
+    size = storage.disk_manager.get_table_size("churn")
+
+    for i in range(300, 600):
+        assert storage.delete_records("churn", "id", i - 300) == 1
+        storage.load("churn", [{"id": i, "text": "z" * 100}])
+
+    assert storage.disk_manager.get_table_size("churn") == size
+    assert storage.disk_manager.get_fsm_file("churn").exists()
+    reopened = DiskStorage(data_dir=str(tmp_path))
+    assert sorted(r["id"] for r in reopened.read_all("churn")) == list(range(300, 600))
+    assert reopened.get_table_metadata("churn")["num_records"] == 300
+    assert len(reopened.disk_manager.get_free_space("churn")) == reopened.get_num_pages("churn")
+
+
+def test_rebuilt_fsm_ignores_trailing_zeros(tmp_path):
+    """Sin el .fsm, el espacio libre se mide por el payload aunque termine en ceros"""
+    storage = DiskStorage(data_dir=str(tmp_path))
+    storage.set_table_metadata("zeros", schema={
+        "name": "zeros", "key": "id",
+        "columns": [{"name": "id", "type": "INT"}, {"name": "n", "type": "INT"}],
+    })
+    storage.load("zeros", [{"id": i, "n": 0} for i in range(1000)])
+    expected = list(storage.disk_manager.get_free_space("zeros"))
+    storage.close()
+    storage.disk_manager.get_fsm_file("zeros").unlink()
+
+    reopened = DiskStorage(data_dir=str(tmp_path))
+    assert list(reopened.disk_manager.get_free_space("zeros")) == expected
+
+
+def test_full_scan_uses_ring_buffer(tmp_path):
+    """El full scan de una tabla grande usa un anillo privado y no evicta las páginas calientes"""
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path))
+    storage.load("hot", [{"id": i} for i in range(10)])
+    big = [{"id": i, "v": "x" * 200} for i in range(2000)]
+    storage.load("big", big)
+    storage.read_page("hot", 0)
+
+    assert storage.read_all("big") == big
+    stats = storage.buffer_pool.get_stats()
+    assert stats["ring_reads"] == storage.get_num_pages("big")
+    assert stats["pages_in_cache"] == 1 and storage.buffer_pool.contains("hot", 0)
+
+
+def test_incremental_catalog_log_and_snapshot(tmp_path):
+    """Los INSERT no tocan el catálogo hasta el checkpoint; tras un crash se recuentan y close() compacta"""
+    (tmp_path / "catalog.json").write_text(json.dumps({"old": {
+        "num_records": 0, "num_pages": 0, "schema": None, "index_type": "isam"}}))
+    storage = DiskStorage(data_dir=str(tmp_path))
+    assert storage.get_table_metadata("old")["index_type"] == "isam"  # Migrado a catalog.bin
+
+    storage.load("t", [{"id": 0}])
+    log_size = (tmp_path / "catalog.log").stat().st_size
+    for i in range(1, 50):
+        storage.load("t", [{"id": i}])
+    assert (tmp_path / "catalog.log").stat().st_size == log_size
+    storage.delete_table("old")
+
+    # Crash sin checkpoint (con una cola rota en el log): los contadores se recuentan
+    with open(tmp_path / "catalog.log", "ab") as f:
+        f.write(b"\x40\x00\x00\x00basura")
+    reopened = DiskStorage(data_dir=str(tmp_path))
+    assert reopened.list_tables() == ["t"]
+    assert reopened.get_table_metadata("t")["num_records"] == 50
+
+    reopened.checkpoint()
+    assert reopened.catalog.get_stats()["dirty_tables"] == 0
+    reopened.close()
+    assert (tmp_path / "catalog.log").stat().st_size == 0
+    assert DiskStorage(data_dir=str(tmp_path)).get_table_metadata("t")["num_pages"] == 1
+
+
+def test_attach_tables_from_private_catalog(tmp_path):
+    """Un loader con catálogo propio escribe la tabla; el padre la registra con un solo snapshot"""
+    worker = DiskStorage(data_dir=str(tmp_path), catalog_dir=str(tmp_path / ".load_t"))
+    worker.load("t", [{"id": i} for i in range(100)])
+    assert not (tmp_path / "catalog.log").exists()
+
+    storage = DiskStorage(data_dir=str(tmp_path))
+    storage.attach_tables({"t": worker.get_table_metadata("t")})
+    assert storage.catalog.get_stats()["snapshots"] == 1
+    assert DiskStorage(data_dir=str(tmp_path)).read_all("t") == [{"id": i} for i in range(100)]
+
+
 if __name__ == "__main__":
     test_disk_persistence()
     test_buffer_pool_lru()
@@ -0,0 +1,57 @@
+import os
+import pytest
+from core.disk_manager import DiskManager, Page
+from core.disk_storage import DiskStorage
+from core.prefetch import ReadAhead
+from indexes.bplustree import BPlusTreeIndex
+
+
+def test_read_ahead_window_adapts():
+    """La ventana crece con acceso secuencial y se reinicia ante un salto"""
+    reader = ReadAhead(lambda n: n * 10, end=100, min_window=2, max_window=8, min_latency=0)
+    assert [reader.get(n) for n in range(6)] == [0, 10, 20, 30, 40, 50]
+    assert reader.window == 8 and reader.hits >= 3
+
+    assert reader.get(60) == 600
+    assert reader.window == 0
+    reader.close()
+    assert reader.hits + reader.wasted <= reader.issued
+
+    # Lecturas más rápidas que el umbral (page cache): sin read-ahead
+    cached = ReadAhead(lambda n: n, end=100, min_latency=1.0)
+    assert [cached.get(n) for n in range(10)] == list(range(10))
+    assert cached.issued == 0
+
+
+def test_scan_and_range_search_use_read_ahead(tmp_path, monkeypatch):
+    """read_all con el pool frío y range_search leen por adelantado y retornan lo mismo"""
+    monkeypatch.setattr(ReadAhead, "MIN_LATENCY", 0)
+    storage = DiskStorage(pool_size=4, data_dir=str(tmp_path))
+    rows = [{"id": i, "v": "x" * 100} for i in range(2000)]
+    storage.load("t", rows)
+    assert storage.read_all("t") == rows
+    stats = storage.get_stats()["read_ahead"]
+    assert stats["prefetch_hits"] > 0
+
+    idx = BPlusTreeIndex(key="id", order=10)
+    idx.data_file = str(tmp_path / "t_leaves.dat")
+    idx.build(rows)
+    assert idx.range_search(100, 1500) == rows[100:1501]
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc/self/fd")
+def test_read_ahead_owns_its_descriptor(tmp_path):
+    """El read-ahead no depende del cache de descriptores: sobrevive a su evicción y cierra el suyo"""
+    disk_manager = DiskManager(str(tmp_path), max_open_files=1)
+    for page_id in range(8):
+        disk_manager.write_page("a", Page(page_id, [{"id": page_id}]))
+    open_fds = len(os.listdir("/proc/self/fd"))
+    reader = disk_manager.read_ahead("a", 8)
+    disk_manager.write_page("b", Page(0, [{"id": 0}]))  # Evicta el descriptor cacheado de "a"
+    disk_manager.close_table("a")
+
+    pages = [disk_manager.read_page("a", n, bytes(raw)) for n, raw in enumerate(reader.fetch_run(0, 8))]
+    assert [page.data for page in pages] == [[{"id": n}] for n in range(8)]
+    reader.close()
+    reader.close()
+    assert len(os.listdir("/proc/self/fd")) == open_fds  # Cerrados el del reader y el de "a"; abierto el de "b"
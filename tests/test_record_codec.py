@@ -0,0 +1,89 @@
+import pickle
+import pytest
+from core.disk_storage import DiskStorage
+from core.record_codec import RecordCodec, decode_rows, encode_rows
+from core.schema import Column, TableSchema
+from core.table import Table
+from indexes.sequential import SequentialIndex
+
+
+SCHEMA = {
+    "columns": [
+        {"name": "id", "type": "INT"},
+        {"name": "name", "type": "TEXT"},
+        {"name": "rating", "type": "FLOAT"},
+    ],
+    "key": "id",
+}
+
+
+def test_codec_roundtrip_with_nulls():
+    """Los registros (con NULL y UTF-8) sobreviven la ida y vuelta y ocupan menos que pickle"""
+    codec = RecordCodec.from_schema_dict(SCHEMA)
+    rows = [{"id": i, "name": f"Café {i}" if i % 3 else None, "rating": i / 2 if i % 4 else None}
+            for i in range(40)]
+
+    data = codec.encode_rows(rows)
+    assert codec.decode_rows(data + b"\x00" * 100) == rows
+    assert len(data) < len(pickle.dumps(rows))
+    assert codec.decode_rows(codec.encode_rows([])) == []
+
+
+def test_codec_falls_back_to_pickle():
+    """Registros que no se ajustan al schema se guardan con pickle y se leen igual"""
+    codec = RecordCodec.from_schema_dict(SCHEMA)
+    rows = [{"id": "no-es-int", "name": "x", "rating": 1.0}]
+
+    data = encode_rows(rows, codec)
+    assert data[:1] == b"\x80"
+    assert decode_rows(data, codec) == rows
+    # Páginas antiguas (pickle) se leen aunque la tabla tenga codec
+    assert decode_rows(pickle.dumps([{"id": 1}]), codec) == [{"id": 1}]
+
+
+def test_disk_storage_and_index_use_codec(tmp_path):
+    """DiskStorage y los índices codifican con el schema y restauran el codec al cargar"""
+    storage = DiskStorage(records_per_page=10, pool_size=5, data_dir=str(tmp_path))
+    storage.create_table("t")
+    storage.set_table_metadata("t", schema=SCHEMA)
+    rows = [{"id": i, "name": f"n{i}", "rating": float(i)} for i in range(25)]
+    storage.load("t", rows)
+    storage.flush_all()
+
+    with open(storage.disk_manager.get_table_file("t"), "rb") as f:
+        assert f.read(1) == b"\xc5"
+    reopened = DiskStorage(records_per_page=10, pool_size=5, data_dir=str(tmp_path))
+    assert reopened.read_all("t") == rows
+
+    idx = SequentialIndex(key="id", block_size=10, codec=RecordCodec.from_schema_dict(SCHEMA))
+    idx.data_file = str(tmp_path / "t_sequential_blocks.dat")
+    idx.build(rows)
+    idx.save(str(tmp_path / "t_seq"))
+    loaded = SequentialIndex.load(str(tmp_path / "t_seq"))
+    assert loaded.codec.spec() == idx.codec.spec()
+    assert loaded.search(17) == [rows[17]]
+
+
+def test_typed_schema_bool_column_and_query_coercion(tmp_path, monkeypatch):
+    """BOOL se codifica en 1 byte; los literales de consulta se llevan al tipo de la columna"""
+    monkeypatch.chdir(tmp_path)  # Los .dat de los índices de Table van a storage/ relativo al cwd
+    schema = TableSchema(name="t", key="id", columns=[Column("id", "INT", False), Column("open", "BOOL"),
+                                                       Column("rating", "FLOAT")])
+    assert TableSchema.from_dict(schema.to_dict()) == schema
+    codec = RecordCodec.from_schema(schema)
+    rows = [{"id": i, "open": None if i % 5 == 0 else i % 2 == 1, "rating": i / 2} for i in range(40)]
+    data = codec.encode_rows(rows)
+    assert codec.decode_rows(data) == rows
+    assert len(data) < len(RecordCodec([("id", "INT"), ("open", "TEXT"), ("rating", "FLOAT")]).encode_rows(
+        [dict(r, open=str(r["open"])) for r in rows]))
+
+    storage = DiskStorage(records_per_page=10, pool_size=5, data_dir=str(tmp_path))
+    storage.create_table("t")
+    storage.set_table_metadata("t", schema=schema.to_dict(), index_type="isam")
+    table = Table(schema=schema, storage=storage, index_type="isam")
+    table.load(rows)
+    table.insert({"id": "40", "open": "Yes", "rating": 3})
+    assert table.select_eq("id", "40") == [{"id": 40, "open": True, "rating": 3.0}]
+    assert [r["id"] for r in table.select_range("id", "1", "3")] == [1, 2, 3]
+    with pytest.raises(ValueError):
+        table.insert({"id": None, "open": False, "rating": 1.0})
@@ -0,0 +1,54 @@
+import random
+import pytest
+from core.buffer_pool import BufferPool
+from core.disk_manager import DiskManager, Page
+from core.disk_storage import DiskStorage
+from core.replacement import POLICIES, make_policy, simulate
+
+
+def _hot_set_with_scans(hot=20, cold=400, rounds=30):
+    """Accesos repetidos a un conjunto caliente interrumpidos por scans de páginas frías"""
+    rng = random.Random(1)
+    trace = []
+    for r in range(rounds):
+        trace += [("t", rng.randrange(hot)) for _ in range(200)]
+        trace += [("t", hot + (r * 50 + i) % cold) for i in range(50)]
+    return trace
+
+
+@pytest.mark.parametrize("name", sorted(POLICIES))
+def test_policy_respects_capacity(name, tmp_path):
+    """Cada política mantiene el pool dentro de su capacidad y nunca evicta páginas ausentes"""
+    pool = BufferPool(8, DiskManager(str(tmp_path)), policy=name)
+    for page_id in range(40):
+        pool.disk_manager.write_page("t", Page(page_id, [{"id": page_id}]))
+    rng = random.Random(0)
+    for _ in range(500):
+        page_id = rng.randrange(40)
+        assert pool.get_page("t", page_id).data == [{"id": page_id}]
+        assert len(pool.cache) <= 8
+    pool.discard_pages("t", list(range(40)))
+    assert pool.cache == {} and pool.get_stats()["policy"] == name
+
+    with pytest.raises(ValueError):
+        make_policy("mru", 8)
+
+
+def test_scan_resistant_policies_beat_lru():
+    """Un scan no desplaza el conjunto caliente en 2Q, LRU-K y ARC como sí lo hace en LRU"""
+    trace = _hot_set_with_scans()
+    lru = simulate("lru", 40, trace)["hit_rate"]
+    for name in ("2q", "lru-k", "arc"):
+        assert simulate(name, 40, trace)["hit_rate"] > lru
+
+
+def test_disk_storage_with_policy_and_trace(tmp_path):
+    """DiskStorage acepta la política por instancia y el pool captura la traza de accesos"""
+    storage = DiskStorage(pool_size=4, data_dir=str(tmp_path), buffer_policy="arc")
+    rows = [{"id": i, "v": "x" * 200} for i in range(300)]
+    storage.load("t", rows)
+    storage.buffer_pool.start_trace()
+    assert storage.read_all("t") == rows
+    trace = storage.buffer_pool.stop_trace()
+    assert trace == [("t", page_id) for page_id in range(storage.get_num_pages("t"))]
+    assert storage.buffer_pool.trace is None
@@ -0,0 +1,49 @@
+import pytest
+from sql import parser
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    """Ejecutor con un catálogo propio en tmp_path (storage/ es relativo al cwd)"""
+    monkeypatch.chdir(tmp_path)
+    from sql import executor
+    executor.catalog.storage.close()  # El catálogo del import; la prueba usa uno propio en tmp_path
+    catalog = executor.Catalog()
+    monkeypatch.setattr(executor, "catalog", catalog)
+    yield executor
+    catalog.storage.close()
+
+
+def _execute(executor, sql):
+    return executor.execute(parser.parse(sql))
+
+
+def test_partial_quoted_insert_after_load(tmp_path, executor):
+    """INSERT con un subconjunto de columnas entre comillas sobre una tabla cargada: las columnas sin celdas vacías no son NOT NULL"""
+    (tmp_path / "r.csv").write_text("Restaurant ID,Restaurant Name,Country Code,Votes\n"
+                                    "1,Uno,162,10\n2,Dos,1,3\n", encoding="utf-8")
+    _execute(executor, "CREATE TABLE r_isam USING isam")
+    assert _execute(executor, "LOAD FROM r.csv INTO r_isam")["loaded"] == 2
+    _execute(executor, 'INSERT INTO r_isam ("Restaurant ID", "Restaurant Name") VALUES (3, "Tres")')
+    table = executor.catalog.tables["r_isam"]
+    assert table.select_eq("Restaurant ID", "3") == [{"Restaurant ID": 3, "Restaurant Name": "Tres"}]
+    assert table.select_eq("Restaurant ID", 1)[0]["Country Code"] == 162
+
+
+def test_load_infers_columns_once(tmp_path, executor, monkeypatch):
+    """LOAD sobre una tabla nueva con columnas todas TEXT recorre el CSV para inferir una sola vez"""
+    (tmp_path / "r.csv").write_text("code,name\na1,Uno\nb2,Dos\n", encoding="utf-8")
+    calls = []
+    infer_columns = executor.infer_columns
+    monkeypatch.setattr(executor, "infer_columns", lambda path: calls.append(path) or infer_columns(path))
+    assert _execute(executor, "LOAD FROM r.csv INTO r")["loaded"] == 2
+    assert calls == ["r.csv"]
+    assert executor.catalog.tables["r"].select_eq("code", "b2") == [{"code": "b2", "name": "Dos"}]
+
+
+def test_create_with_rejects_unknown_options():
+    """WITH acepta solo opciones de almacenamiento conocidas: un typo falla al parsear en vez de ignorarse"""
+    node = parser.parse("CREATE TABLE t USING isam WITH (page_size=8KB, MMAP=true, compression=zlib)")
+    assert node.options == {"page_size": 8192, "mmap": True, "compression": "zlib"}
+    with pytest.raises(ValueError, match="pagesize"):
+        parser.parse("CREATE TABLE t USING isam WITH (pagesize=8192)")
@@ -0,0 +1,56 @@
+from core.decoded_cache import DecodedCache
+from core.disk_storage import DiskStorage
+from core.stats import LatencyHistogram, registry
+from indexes.bplustree import BPlusTreeIndex
+from indexes.sequential import SequentialIndex
+
+
+def test_latency_histogram_percentiles():
+    """Los percentiles se reportan como el límite superior del bucket (potencias de 2 de µs)"""
+    hist = LatencyHistogram()
+    for _ in range(90):
+        hist.record(3e-6)
+    for _ in range(10):
+        hist.record(1e-3)
+    snap = hist.snapshot()
+    assert snap["count"] == 100 and snap["p50_us"] == 4 and snap["p99_us"] == 1024
+    assert sum(snap["buckets_us"].values()) == 100
+
+
+def test_table_and_index_stats_without_side_effects(tmp_path):
+    """Lecturas lógicas vs físicas por tabla e índice; consultar el registro no cambia nada"""
+    registry.reset()
+    storage = DiskStorage(pool_size=4, data_dir=str(tmp_path))
+    storage.load("hot", [{"id": i, "v": "x" * 100} for i in range(200)])
+    writes = registry.snapshot("hot")["writes"]
+    assert writes > 0 and registry.snapshot("hot")["write_latency"]["count"] > 0
+
+    for _ in range(3):
+        storage.buffer_pool.get_page("hot", 0)
+    hot = registry.snapshot("hot")
+    assert hot["logical_reads"] == 3 and hot["physical_reads"] == 1 and hot["cache_hits"] == 2
+    assert hot["hit_rate"] == "66.67%" and hot["read_latency"]["count"] == 1
+    for page_id in range(1, 6):
+        storage.buffer_pool.get_page("hot", page_id)
+    assert registry.snapshot("hot")["evictions"] >= 2
+
+    idx = SequentialIndex(key="id")
+    idx.data_file = str(tmp_path / "seq.dat")
+    idx.build([{"id": i} for i in range(500)])
+    idx.decoded_cache = DecodedCache()
+    for _ in range(4):
+        assert idx.search(7) == [{"id": 7}]
+    seq = registry.snapshot(idx.data_file)
+    assert seq["logical_reads"] == 4 and seq["cache_hits"] == 3 and seq["physical_reads"] == 1
+
+    tree = BPlusTreeIndex(key="id")
+    tree.data_file = str(tmp_path / "tree.dat")
+    tree.build([{"id": i} for i in range(500)])
+    tree.buffer_pool = storage.buffer_pool
+    tree.search(7)
+    tree.search(7)
+    assert registry.snapshot(tree.data_file)["cache_hits"] >= 1
+
+    first = registry.snapshot()
+    assert set(first["indexes"]) == {idx.data_file, tree.data_file}
+    assert first == registry.snapshot() and registry.snapshot("missing") == {}
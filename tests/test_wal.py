@@ -0,0 +1,172 @@
+import threading
+import pytest
+from core.disk_storage import DiskStorage
+from core.schema import Column, TableSchema
+from core.table import Table
+from core.wal import WriteAheadLog
+
+
+def test_wal_append_replay_and_torn_tail(tmp_path):
+    """Los registros se releen en orden; una cola rota se descarta y el checkpoint conserva los LSN"""
+    wal = WriteAheadLog(tmp_path / "wal.log", fsync=False)
+    assert [wal.log("pages", "t", {"i": i}) for i in range(3)] == [1, 2, 3]
+    wal.close()
+    with open(tmp_path / "wal.log", "ab") as f:
+        f.write(b"\x10\x00\x00\x00basura")
+
+    wal = WriteAheadLog(tmp_path / "wal.log", fsync=False)
+    assert [(lsn, payload["i"]) for lsn, _, _, payload in wal.records()] == [(1, 0), (2, 1), (3, 2)]
+    assert wal.checkpoint() == 3
+    assert list(wal.records()) == []
+    assert wal.log("pages", "t", {}) == 4
+
+
+def test_wal_group_commit(tmp_path):
+    """Commits concurrentes comparten fsync"""
+    wal = WriteAheadLog(tmp_path / "wal.log", commit_delay=0.005)
+
+    def writer():
+        for i in range(10):
+            wal.log("pages", "t", {"i": i})
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = wal.get_stats()
+    assert stats["commits"] == 80 and stats["last_lsn"] == 80
+    assert stats["fsyncs"] < stats["commits"]
+
+
+def test_concurrent_inserts_share_fsyncs(tmp_path, monkeypatch):
+    """INSERT concurrentes sobre una tabla: el fsync se espera fuera del lock, así varios commits comparten uno"""
+    monkeypatch.chdir(tmp_path)  # Los .dat de los índices de Table van a storage/ relativo al cwd
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path), use_wal=True)
+    storage.wal.commit_delay = 0.005
+    schema = TableSchema(name="t", columns=[Column("id", "INT"), Column("v", "INT")], key="id")
+    table = Table(schema=schema, storage=storage, index_type="bplustree")
+
+    def writer(tid: int):
+        for i in range(10):
+            table.insert({"id": tid * 10 + i, "v": i})
+
+    threads = [threading.Thread(target=writer, args=(tid,)) for tid in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = storage.wal.get_stats()
+    assert stats["commits"] == 80
+    assert stats["fsyncs"] < stats["commits"]
+    assert sorted(r["id"] for r in storage.read_all("t")) == list(range(80))
+    assert table.select_eq("id", 42) == [{"id": 42, "v": 2}]
+
+
+def test_disk_storage_recovers_from_wal(tmp_path):
+    """INSERT/DELETE no reescriben el catálogo; tras un crash el log restaura páginas y contadores"""
+    storage = DiskStorage(pool_size=5, data_dir=str(tmp_path), use_wal=True)
+    storage.create_table("t")
+    storage.load("t", [{"id": i, "v": "x" * 50} for i in range(200)])
+    data_file = storage.disk_manager.get_table_file("t")
+    checkpoint_data = data_file.read_bytes()
+    catalog = (tmp_path / "catalog.log").read_bytes()
+
+    for i in range(200, 260):
+        storage.load("t", [{"id": i, "v": "y" * 50}])
+    assert storage.delete_records("t", "id", 5) == 1
+    expected = storage.read_all("t")
+    assert (tmp_path / "catalog.log").read_bytes() == catalog
+
+    # Crash: los contadores en RAM se pierden y el SO no llegó a escribir las páginas
+    data_file.write_bytes(checkpoint_data)
+    recovered = DiskStorage(pool_size=5, data_dir=str(tmp_path), use_wal=True)
+    assert recovered.recovered_tables == {"t"}
+    assert recovered.read_all("t") == expected
+    assert recovered.get_table_metadata("t")["num_records"] == 259
+    assert recovered.get_stats()["wal"]["log_bytes"] == WriteAheadLog.FILE_HEADER.size
+
+
+def test_background_writer_and_fuzzy_checkpoint(tmp_path):
+    """Con WAL los INSERT quedan dirty; el writer los escribe y el checkpoint fuzzy conserva el log posterior"""
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path), use_wal=True)
+    for i in range(50):
+        storage.load("t", [{"id": i}])
+    assert storage.buffer_pool.get_stats()["dirty_pages"] == 1
+    assert storage.disk_manager.get_table_size("t") == 0
+
+    writer = storage.start_background_writer(interval=0.01)
+    writer.stop()
+    assert storage.buffer_pool.get_stats()["dirty_pages"] == 0
+    assert storage.disk_manager.read_page("t", 0).data == [{"id": i} for i in range(50)]
+
+    redo_lsn = storage.wal.last_lsn
+    storage.load("t", [{"id": 50}])
+    storage.wal.checkpoint(upto_lsn=redo_lsn)
+    assert [lsn for lsn, _, _, _ in storage.wal.records()] == [redo_lsn + 1]
+    assert storage.fuzzy_checkpoint() == redo_lsn + 1
+
+    # Crash sin flush: el log reaplica lo que quedó dirty; close() es idempotente
+    storage.load("t", [{"id": 51}])
+    recovered = DiskStorage(pool_size=8, data_dir=str(tmp_path), use_wal=True)
+    assert recovered.read_all("t") == [{"id": i} for i in range(52)]
+    recovered.close()
+    recovered.close()
+
+
+def test_commit_waits_outside_storage_lock(tmp_path):
+    """El fsync del INSERT se espera sin el lock del storage; una página dirty no se escribe antes que su log"""
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path), use_wal=True)
+    owned = []
+    commit = storage.wal.commit
+    storage.wal.commit = lambda lsn: (owned.append(storage.lock._is_owned()), commit(lsn))
+    with storage.mutation():
+        storage.load("t", [{"id": 0}])
+        storage.load("t", [{"id": 1}])
+        assert owned == [] and storage.wal.get_stats()["fsyncs"] == 0
+    assert owned == [False]
+    assert storage.wal.get_stats()["fsyncs"] == 1
+
+    storage.wal.commit = lambda lsn: None  # Registro escrito pero todavía no durable
+    storage.load("t", [{"id": 2}])
+    storage.flush_dirty()
+    assert storage.wal.get_stats()["fsyncs"] == 2
+
+
+def test_bulk_load_checkpoints_once_and_keeps_tail_page(tmp_path):
+    """Una carga en varios chunks hace checkpoint al empezar y al terminar; la tail page confirmada no se reescribe"""
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path), use_wal=True)
+    storage.load("t", [{"id": 0, "v": "x" * 50}])
+    storage.checkpoint()
+    tail = storage.disk_manager.get_table_file("t").read_bytes()
+    checkpoints = storage.wal.get_stats()["checkpoints"]
+
+    with storage.bulk_load("t"):
+        for start in range(1, 1001, 200):
+            storage.load("t", [{"id": i, "v": "x" * 50} for i in range(start, start + 200)])
+    assert storage.wal.get_stats()["checkpoints"] == checkpoints + 2
+    assert storage.disk_manager.get_table_file("t").read_bytes()[:len(tail)] == tail
+    assert [r["id"] for r in storage.read_all("t")] == list(range(1001))
+
+    storage.load("t", [{"id": i, "v": "x" * 50} for i in range(1001, 1201)])
+    assert storage.wal.get_stats()["checkpoints"] == checkpoints + 3
+
+
+@pytest.mark.parametrize("index_type", ["sequential", "isam", "ext_hash", "bplustree"])
+def test_restart_without_rebuild_keeps_index_files(tmp_path, monkeypatch, index_type):
+    """Una tabla restaurada sin rebuild_indexes no pisa los índices guardados en el checkpoint al cerrar"""
+    monkeypatch.chdir(tmp_path)  # Los .dat de los índices de Table van a storage/ relativo al cwd
+    schema = TableSchema(name="t", columns=[Column("id", "INT"), Column("v", "INT")], key="id")
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path / "db"), use_wal=True)
+    storage.set_table_metadata("t", schema=schema.to_dict(), index_type=index_type)
+    Table(schema=schema, storage=storage, index_type=index_type).load([{"id": i, "v": i} for i in range(100)])
+    storage.close()
+    saved = {path.name: path.read_bytes() for path in (tmp_path / "db").glob("t_*")}
+    assert saved
+
+    storage = DiskStorage(pool_size=8, data_dir=str(tmp_path / "db"), use_wal=True)
+    Table(schema=schema, storage=storage, index_type=index_type, rebuild_indexes=False)
+    storage.close()
+    assert {path.name: path.read_bytes() for path in (tmp_path / "db").glob("t_*")} == saved